@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the Git/AI Digest Ignore Manager
+Generates a reproducible synthetic repository and times the scan, match and
+select hot paths, headless where possible; the GUI paths run when a display
+is available. Results are printed as JSON and can be compared to a baseline.
+
+    python benchmark.py --preset medium --output bench.json
+    python benchmark.py --preset medium --baseline bench.json --fail-threshold 0.2
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+from pathlib import Path
+from typing import List, Dict, Optional, Callable
+
+from ignore_core import (IgnoreFileCache, IgnoreMatcher, DirectoryWalker, FileIndex, minimize_patterns,
+                         update_ignore_files)
+
+PRESETS = {
+    'small': {'depth': 3, 'fanout': 4, 'files': 8, 'hidden': 1, 'patterns': 10},
+    'medium': {'depth': 4, 'fanout': 5, 'files': 10, 'hidden': 1, 'patterns': 500},
+    'large': {'depth': 5, 'fanout': 6, 'files': 12, 'hidden': 2, 'patterns': 5000},
+}
+
+DIR_NAMES = ('src', 'lib', 'app', 'core', 'utils', 'docs', 'tests', 'assets', 'build', 'node_modules',
+             'vendor', '__pycache__')
+HIDDEN_NAMES = ('.cache', '.venv', '.idea', '.config')
+EXTENSIONS = ('.py', '.js', '.ts', '.json', '.md', '.txt', '.log', '.pyc', '.tmp', '.css')
+
+
+def generate_tree(root: Path, depth: int, fanout: int, files: int, hidden: int, patterns: int,
+                  seed: int = 0) -> Dict[str, int]:
+    """Create a synthetic repository under root; the same arguments always give the same tree"""
+    rng = random.Random(seed)
+    file_paths = []
+    dir_paths = []
+
+    # Breadth first, so numbering does not depend on recursion order
+    level = [""]
+    for current_depth in range(depth + 1):
+        next_level = []
+        for rel_dir in level:
+            directory = root / rel_dir
+            directory.mkdir(parents=True, exist_ok=True)
+            for i in range(files):
+                name = f"file{i}{rng.choice(EXTENSIONS)}"
+                (directory / name).write_bytes(b'x' * rng.randrange(2048))
+                file_paths.append(f"{rel_dir}{name}")
+            if current_depth == depth:
+                continue
+            names = [f"{DIR_NAMES[(i + rng.randrange(len(DIR_NAMES))) % len(DIR_NAMES)]}{i}" for i in range(fanout)]
+            names += [f"{HIDDEN_NAMES[i % len(HIDDEN_NAMES)]}{i}" for i in range(hidden)]
+            for name in names:
+                dir_paths.append(f"{rel_dir}{name}/")
+                next_level.append(f"{rel_dir}{name}/")
+        level = next_level
+
+    # Root rules: a few common ones, then a mix of literals, globs and negations up to the requested count
+    lines = ["*.log", "node_modules*/", "__pycache__*/"]
+    while len(lines) < patterns:
+        k = len(lines)
+        kind = rng.random()
+        if kind < 0.4:
+            lines.append("/" + rng.choice(file_paths))
+        elif kind < 0.6:
+            lines.append(f"missing{k}/data{k}.dat")
+        elif kind < 0.75:
+            lines.append(f"**/generated{k}/")
+        elif kind < 0.85:
+            lines.append(f"*.x{k}")
+        elif kind < 0.95:
+            lines.append("/" + rng.choice(dir_paths))
+        else:
+            lines.append(f"!keep{k}.log")
+    (root / ".gitignore").write_text("\n".join(lines[:patterns]) + "\n", encoding='utf-8')
+    (root / ".aidigestignore").write_text("*.md\n", encoding='utf-8')
+
+    # Nested rules one level down
+    for rel_dir in dir_paths:
+        if rel_dir.count('/') == 1:
+            (root / rel_dir / ".gitignore").write_text("*.tmp\n!file0.tmp\n/local/\n", encoding='utf-8')
+
+    return {'dirs': len(dir_paths), 'files': len(file_paths), 'patterns': min(len(lines), patterns)}
+
+
+def all_paths(root: Path) -> List[tuple]:
+    """Get (relative path, is_dir) of everything below root except .git"""
+    paths = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        rel_dir = os.path.relpath(dirpath, root).replace(os.sep, '/')
+        prefix = "" if rel_dir == '.' else rel_dir + "/"
+        dirnames[:] = [name for name in dirnames if name != '.git']
+        paths.extend((prefix + name, True) for name in dirnames)
+        paths.extend((prefix + name, False) for name in filenames)
+    return paths
+
+
+def measure(function: Callable[[], Optional[int]], repeat: int,
+            setup: Optional[Callable[[], None]] = None) -> dict:
+    """Run function repeat times (after setup, untimed) and summarize the wall times"""
+    runs = []
+    items = None
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        items = function()
+        runs.append(time.perf_counter() - start)
+    result = {'runs': [round(run, 6) for run in runs], 'median': round(statistics.median(runs), 6),
+              'min': round(min(runs), 6)}
+    if items is not None:
+        result['items'] = items
+    return result
+
+
+def core_benchmarks(root: Path, repeat: int, workers: int) -> Dict[str, dict]:
+    """Time the headless building blocks"""
+    results = {}
+    paths = all_paths(root)
+    gitignore = root / ".gitignore"
+
+    results['get_existing_patterns'] = measure(lambda: len(IgnoreFileCache().get_patterns(gitignore)), repeat)
+
+    def match_all():
+        matcher = IgnoreMatcher(root, IgnoreFileCache())
+        for path, is_dir in paths:
+            matcher.is_ignored(path, is_dir)
+        return len(paths)
+
+    results['is_ignored'] = measure(match_all, repeat)
+
+    def walk(count):
+        walker = DirectoryWalker(IgnoreMatcher(root, IgnoreFileCache()))
+        return sum(1 for _ in walker.walk(str(root), "", [], count))
+
+    results['walk'] = measure(lambda: walk(1), repeat)
+    if workers > 1:
+        results[f'walk_{workers}_workers'] = measure(lambda: walk(workers), repeat)
+
+    # Select every third file of the visible tree
+    entries = list(DirectoryWalker(IgnoreMatcher(root, IgnoreFileCache())).walk(str(root)))
+    selected = [entry.rel_path for entry in entries if not entry.is_dir][::3]
+    results['minimize_patterns'] = measure(lambda: len(minimize_patterns(entries, selected)), repeat)
+    results['file_index'] = measure(lambda: len(FileIndex(entries)), repeat)
+    index = FileIndex(entries)
+    results['larger_than'] = measure(lambda: len(index.larger_than(1024)), repeat)
+
+    # Writes go to copies so the tree itself keeps its rules
+    scratch = Path(tempfile.mkdtemp(prefix='ignore-bench-'))
+    targets = [scratch / ".gitignore", scratch / ".aidigestignore"]
+    original = gitignore.read_bytes()
+    patterns = minimize_patterns(entries, selected)
+
+    def restore():
+        for target in targets:
+            target.write_bytes(original)
+
+    try:
+        results['update_ignore_files'] = measure(
+            lambda: sum(len(change.added) for change in update_ignore_files(targets, patterns)), repeat, restore)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    return results
+
+
+class HeadlessDialogs:
+    """Stands in for tkinter.messagebox so timed GUI actions never block on a dialog"""
+
+    @staticmethod
+    def showinfo(*args, **kwargs):
+        return 'ok'
+
+    showwarning = showerror = showinfo
+
+    @staticmethod
+    def askyesno(*args, **kwargs):
+        return True
+
+
+def gui_benchmarks(window, root: Path, repeat: int) -> Dict[str, dict]:
+    """Time the GUI paths on a hidden window, which is destroyed afterwards"""
+    import ignore_gui
+
+    window.withdraw()
+    dialogs = ignore_gui.messagebox
+    ignore_gui.messagebox = HeadlessDialogs
+    original = (root / ".gitignore").read_bytes()
+    cwd = os.getcwd()
+    results = {}
+
+    try:
+        os.chdir(root)  # The GUI starts on the working directory
+        app = ignore_gui.IgnoreManagerTreeGUI(window, use_cache=False)  # Leave the user's scan cache alone
+        app.watch_var.set(False)
+
+        def settle(sizes: bool = True):
+            """Run the main loop until scans, indexing, expanding (and directory sizes) are done"""
+            while (app.pending_scans > 0 or app.index_progress is not None or app.tree_walk is not None
+                   or (sizes and app.pending_sizes > 0) or not app.scan_results.empty()):
+                window.update()
+                time.sleep(0.001)
+
+        def refresh():
+            app.search_var.set("")
+            app.apply_filter()
+            app.refresh_tree()
+            settle(sizes=False)
+            return len(app.nodes)
+
+        def populate():
+            app.expand_all()
+            settle(sizes=False)
+            return len(app.nodes)
+
+        def loaded():
+            refresh()
+            populate()
+            settle()
+
+        results['refresh_tree'] = measure(refresh, repeat, settle)
+        results['populate_tree'] = measure(populate, repeat, lambda: (refresh(), settle()))
+
+        loaded()
+
+        def filter_tree():
+            app.search_var.set("file1")
+            app.apply_filter()
+            settle(sizes=False)
+            return len(app.filter_matches or ())
+
+        results['filter_tree'] = measure(filter_tree, repeat, lambda: (app.search_var.set(""), app.apply_filter()))
+        app.search_var.set("")
+        app.apply_filter()
+
+        def check_all():
+            app.check_all()
+            return app.nodes.checked_count
+
+        results['check_all'] = measure(check_all, repeat, app.uncheck_all)
+
+        def select_some():
+            (root / ".gitignore").write_bytes(original)
+            loaded()
+            for number, item_id in enumerate(app.nodes):
+                if number % 3 == 0 and not app.nodes.is_dir(item_id):
+                    app.set_checked(item_id, True)
+
+        def add():
+            count = len(app.get_selected_files())
+            app.add_to_ignore_files()
+            settle(sizes=False)
+            return count
+
+        results['add_to_ignore_files'] = measure(add, repeat, select_some)
+    finally:
+        (root / ".gitignore").write_bytes(original)
+        os.chdir(cwd)
+        ignore_gui.messagebox = dialogs
+        window.destroy()
+    return results
+
+
+def compare(results: Dict[str, dict], baseline: dict, threshold: float) -> Dict[str, dict]:
+    """Compare medians with a previous run; changes within threshold count as unchanged"""
+    comparison = {}
+    for name, result in results.items():
+        previous = baseline.get('results', {}).get(name)
+        if not previous or 'median' not in result or not previous.get('median'):
+            continue
+        change = result['median'] / previous['median'] - 1
+        status = 'slower' if change > threshold else 'faster' if change < -threshold else 'unchanged'
+        comparison[name] = {'baseline': previous['median'], 'median': result['median'],
+                            'change': round(change, 4), 'status': status}
+    return comparison
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the Git/AI Digest Ignore Manager")
+    parser.add_argument('--preset', choices=sorted(PRESETS), default='medium')
+    for option in ('depth', 'fanout', 'files', 'hidden', 'patterns'):
+        parser.add_argument(f'--{option}', type=int, help=f"Override the preset's {option}")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the synthetic tree")
+    parser.add_argument('-r', '--repeat', type=int, default=5, help="Timed runs per benchmark")
+    parser.add_argument('-j', '--workers', type=int, default=min(4, os.cpu_count() or 1),
+                        help="Worker threads for the parallel walk")
+    parser.add_argument('--no-gui', action='store_true', help="Only run the headless benchmarks")
+    parser.add_argument('--tree', help="Generate into (and keep) this directory instead of a temporary one")
+    parser.add_argument('-o', '--output', help="Also write the JSON results to this file")
+    parser.add_argument('--baseline', help="JSON results of an earlier run to compare with")
+    parser.add_argument('--fail-threshold', type=float, default=None,
+                        help="Exit with 1 if a benchmark is slower than the baseline by more than this fraction")
+    args = parser.parse_args(argv)
+
+    config = dict(PRESETS[args.preset])
+    for option in config:
+        if getattr(args, option) is not None:
+            config[option] = getattr(args, option)
+    config['seed'] = args.seed
+
+    root = Path(args.tree) if args.tree else Path(tempfile.mkdtemp(prefix='ignore-bench-tree-'))
+    if args.tree and root.exists() and any(root.iterdir()):
+        print(f"Tree directory is not empty: {root}", file=sys.stderr)
+        return 2
+
+    report = {'config': config, 'repeat': args.repeat, 'python': platform.python_version(),
+              'platform': platform.platform(), 'created': time.strftime('%Y-%m-%dT%H:%M:%S')}
+    try:
+        report['tree'] = generate_tree(root, **config)
+        results = core_benchmarks(root, args.repeat, args.workers)
+        if not args.no_gui:
+            try:
+                import tkinter as tk
+            except ImportError as e:
+                report['gui_skipped'] = str(e)  # Python built without Tk
+            else:
+                try:
+                    window = tk.Tk()
+                except tk.TclError as e:
+                    report['gui_skipped'] = str(e)  # No display
+                else:
+                    results.update(gui_benchmarks(window, root, args.repeat))
+        report['results'] = results
+    finally:
+        if not args.tree:
+            shutil.rmtree(root, ignore_errors=True)
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        threshold = args.fail_threshold if args.fail_threshold is not None else 0.1
+        report['baseline'] = {'file': args.baseline, 'config_matches': baseline.get('config') == config,
+                              'threshold': threshold,
+                              'comparison': compare(report['results'], baseline, threshold)}
+        if args.fail_threshold is not None and any(
+                entry['status'] == 'slower' for entry in report['baseline']['comparison'].values()):
+            exit_code = 1
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
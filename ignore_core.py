@@ -0,0 +1,2356 @@
+"""
+Headless scan and ignore engine for the Git/AI Digest Ignore Manager
+gitignore-compatible matching, directory walking, scan caching and change
+watching, usable without Tk from the GUI, the command line or other scripts
+"""
+
+import os
+import re
+import sys
+import mmap
+import json
+import hashlib
+import time
+import queue
+import ctypes
+import ctypes.util
+import select
+import struct
+import sqlite3
+import tempfile
+import threading
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+from itertools import compress
+from contextlib import nullcontext
+from concurrent.futures import Executor, ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Set, Tuple, Dict, Optional, FrozenSet, Iterator, Iterable, Pattern
+
+
+class PhaseTimer:
+    """Adds the wall time of a with block to one phase of HotPathStats"""
+
+    __slots__ = ('stats', 'name', 'started')
+
+    def __init__(self, stats: 'HotPathStats', name: str):
+        self.stats = stats
+        self.name = name
+        self.started = 0.0
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stats.add_time(self.name, time.perf_counter() - self.started)
+
+
+class HotPathStats:
+    """Counters and wall time per phase of the scan hot paths
+
+    Collection is off by default. Hot paths test `enabled` before touching a
+    counter, once per directory or call rather than per entry, so a disabled
+    instance costs an attribute lookup there. Scanner threads update it too.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.counters = {}  # name -> count
+        self.phases = {}  # name -> [calls, seconds]
+        self.started = time.time()
+
+    def count(self, name: str, amount: int = 1):
+        """Add amount to a counter"""
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def add_time(self, name: str, seconds: float, calls: int = 1):
+        """Add wall time spent in a phase"""
+        with self.lock:
+            phase = self.phases.setdefault(name, [0, 0.0])
+            phase[0] += calls
+            phase[1] += seconds
+
+    def timer(self, name: str):
+        """Get a context manager timing its block as a phase, a no-op while disabled"""
+        return PhaseTimer(self, name) if self.enabled else nullcontext()
+
+    def reset(self):
+        """Drop everything collected so far"""
+        with self.lock:
+            self.counters.clear()
+            self.phases.clear()
+            self.started = time.time()
+
+    def snapshot(self) -> dict:
+        """Get counters and phases as plain data, e.g. for JSON export"""
+        with self.lock:
+            return {'enabled': self.enabled,
+                    'elapsed': round(time.time() - self.started, 3),
+                    'counters': dict(sorted(self.counters.items())),
+                    'phases': {name: {'calls': calls, 'seconds': round(seconds, 6)}
+                               for name, (calls, seconds) in sorted(self.phases.items())}}
+
+    def report(self) -> str:
+        """Format counters and phases as an aligned text table"""
+        snapshot = self.snapshot()
+        lines = [f"Collected over {snapshot['elapsed']:.1f}s"
+                 f"{'' if snapshot['enabled'] else ' (collection is off)'}", "", "Counters"]
+        for name, value in snapshot['counters'].items():
+            lines.append(f"  {name:<28}{value:>14,}")
+        lines += ["", f"  {'Phase':<26}{'calls':>10}{'seconds':>12}{'ms/call':>10}"]
+        for name, phase in snapshot['phases'].items():
+            per_call = phase['seconds'] * 1000 / phase['calls'] if phase['calls'] else 0.0
+            lines.append(f"  {name:<26}{phase['calls']:>10,}{phase['seconds']:>12.3f}{per_call:>10.3f}")
+        return "\n".join(lines)
+
+    def summary(self) -> str:
+        """One line for a status bar: main counters and the slowest phases"""
+        snapshot = self.snapshot()
+        counters = snapshot['counters']
+        parts = [f"{counters[name]:,} {label}" for name, label in
+                 (('dirs_listed', "dirs listed"), ('stat_calls', "stats"), ('paths_matched', "paths matched"),
+                  ('scan_cache_hits', "cache hits"), ('canvas_calls', "Tk calls")) if name in counters]
+        slowest = sorted(snapshot['phases'].items(), key=lambda item: -item[1]['seconds'])[:3]
+        parts += [f"{name} {phase['seconds']:.2f}s" for name, phase in slowest]
+        return ", ".join(parts)
+
+    def write(self, path: str):
+        """Write the snapshot as JSON"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, indent=2)
+            f.write('\n')
+
+
+STATS = HotPathStats()  # Shared by the walker, the matcher and the GUI
+
+
+NEVER_MATCHES = re.compile('(?!)')
+
+
+class IgnoreRule:
+    """One parsed line of an ignore file"""
+
+    __slots__ = ('pattern', 'source', 'line_no', 'negated', 'dir_only', 'anchored', 'body', '_regex')
+
+    def __init__(self, pattern: str, source: str, line_no: int, negated: bool, dir_only: bool,
+                 anchored: bool, body: str):
+        self.pattern = pattern  # Line as written in the file
+        self.source = source  # Ignore file the rule comes from
+        self.line_no = line_no
+        self.negated = negated  # "!pattern" re-includes matching paths
+        self.dir_only = dir_only  # "pattern/" only matches directories
+        self.anchored = anchored  # Pattern contains a "/" and matches relative to its ignore file
+        self.body = body  # Pattern without "!", leading "/" and trailing "/"
+        self._regex = None
+
+    @property
+    def regex(self) -> Pattern:
+        """Compiled glob, built on first use; a glob that is not valid matches nothing"""
+        if self._regex is None:
+            try:
+                self._regex = re.compile(translate_glob(self.body))
+            except re.error:
+                self._regex = NEVER_MATCHES
+        return self._regex
+
+    def __repr__(self):
+        return f"IgnoreRule({self.pattern!r}, {self.source!r}:{self.line_no})"
+
+
+def parse_ignore_line(line: str, source: str = "", line_no: int = 0) -> Optional[IgnoreRule]:
+    """Parse a line of a .gitignore-style file, returning None for blanks and comments"""
+    line = line.rstrip('\n\r')
+    if not line or line.startswith('#'):
+        return None
+
+    # Trailing spaces are ignored unless escaped with a backslash
+    stripped = line.rstrip(' ')
+    if stripped.endswith('\\') and len(stripped) < len(line):
+        stripped += ' '
+    line = stripped
+    if not line:
+        return None
+
+    body = line
+    negated = body.startswith('!')
+    if negated:
+        body = body[1:]
+    elif body.startswith('\\!') or body.startswith('\\#'):
+        body = body[1:]
+
+    dir_only = body.endswith('/')
+    body = body.rstrip('/')
+    anchored = '/' in body
+    body = body.lstrip('/')
+    if not body:
+        return None
+
+    return IgnoreRule(line, source, line_no, negated, dir_only, anchored, body)
+
+
+def pattern_key(pattern: str) -> Optional[tuple]:
+    """Key under which two ignore lines mean the same rule, None for blanks and comments
+
+    "a/b" and "/a/b" are the same rule, but "foo" matches at any depth and
+    "/foo" only at the root, so they are not.
+    """
+    rule = parse_ignore_line(pattern)
+    return None if rule is None else (rule.negated, rule.dir_only, rule.anchored, rule.body)
+
+
+def translate_glob(pattern: str) -> str:
+    """Translate a gitignore glob into a regular expression
+
+    "*", "?" and "[...]" never match "/". A "**" component matches any number
+    of directories: "**/x" at any depth, "x/**" everything inside x and
+    "a/**/b" zero or more directories in between.
+    """
+    i, n = 0, len(pattern)
+    out = []
+    while i < n:
+        c = pattern[i]
+        if c == '*':
+            j = i
+            while j < n and pattern[j] == '*':
+                j += 1
+            at_start = i == 0 or pattern[i - 1] == '/'
+            if j - i >= 2 and at_start and j == n:
+                out.append('.*')
+            elif j - i >= 2 and at_start and pattern[j] == '/':
+                out.append('(?:.*/)?')
+                j += 1
+            else:
+                out.append('[^/]*')
+            i = j
+        elif c == '?':
+            out.append('[^/]')
+            i += 1
+        elif c == '[':
+            j = i + 1
+            if j < n and pattern[j] in '!^':
+                j += 1
+            if j < n and pattern[j] == ']':
+                j += 1
+            while j < n and pattern[j] != ']':
+                j += 1
+            if j >= n:
+                out.append('\\[')
+                i += 1
+            else:
+                chars = pattern[i + 1:j].replace('\\', '\\\\')
+                if chars[0] in '!^':
+                    chars = '^' + chars[1:]
+                out.append(f'[{chars}]')
+                i = j + 1
+        elif c == '\\' and i + 1 < n:
+            out.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            out.append(re.escape(c))
+            i += 1
+    return '(?s:' + ''.join(out) + r')\Z'
+
+
+class IgnoreRuleSet:
+    """Rules of one ignore file, compiled for matching paths relative to its directory
+
+    Within a file the last matching rule wins. Literal names, "*.ext" globs and
+    literal anchored paths are resolved with dict lookups; the remaining globs
+    are joined, newest first, into one regex for paths and one for names, and
+    only tried while they could still beat the best lookup hit.
+    """
+
+    def __init__(self, rules: List[IgnoreRule]):
+        self.rules = rules
+        # Tables for files skip directory-only rules
+        self.tables = (self.compile([r for r in enumerate(rules) if not r[1].dir_only]),
+                       self.compile(list(enumerate(rules))))
+        self.all_tables = None  # Like tables but keeping every index per key, built by match_before
+        self.joined = [None, None]  # Joined glob regexes per table, built on first match
+
+    @classmethod
+    def from_lines(cls, lines: List[str], source: str = "") -> 'IgnoreRuleSet':
+        """Parse the lines of an ignore file"""
+        rules = []
+        for line_no, line in enumerate(lines, 1):
+            rule = parse_ignore_line(line, source, line_no)
+            if rule is not None:
+                rules.append(rule)
+        return cls(rules)
+
+    @staticmethod
+    def compile(indexed_rules: List[Tuple[int, IgnoreRule]]) -> tuple:
+        """Split rules into lookup tables: (names, suffixes, paths, globs)"""
+        names, suffixes, paths, globs = {}, {}, {}, []
+        for index, rule in indexed_rules:
+            body = rule.body
+            if not any(c in body for c in '*?[\\'):
+                (paths if rule.anchored else names)[body] = index
+            elif (not rule.anchored and body.startswith('*.')
+                  and not any(c in body[1:] for c in '*?[\\')):
+                suffixes[body[1:]] = index
+            else:
+                globs.append((index, rule))
+        globs.reverse()
+        return names, suffixes, paths, globs
+
+    def match(self, rel_path: str, name: str, is_dir: bool) -> Optional[IgnoreRule]:
+        """Get the deciding rule for a path relative to this file's directory, if any"""
+        names, suffixes, paths, globs = self.tables[is_dir]
+        best = names.get(name, -1)
+
+        if suffixes:
+            dot = name.find('.')
+            while dot != -1:
+                best = max(best, suffixes.get(name[dot:], -1))
+                dot = name.find('.', dot + 1)
+
+        if paths:
+            best = max(best, paths.get(rel_path, -1))
+
+        if globs and globs[0][0] > best:
+            joined = self.joined[is_dir] or self.join_globs(is_dir)
+            for regex, indices, subject in ((joined[0], joined[1], rel_path), (joined[2], joined[3], name)):
+                if regex is not None and indices[0] > best:
+                    m = regex.match(subject)
+                    if m is not None:
+                        best = max(best, indices[m.lastindex - 1])
+
+        return self.rules[best] if best >= 0 else None
+
+    def join_globs(self, is_dir: bool) -> tuple:
+        """Build (path regex, rule indices, name regex, rule indices) from the globs of one table
+
+        The globs form an alternation ordered newest first, so the first
+        alternative that matches is the last rule in the file. Each one ends in
+        an empty group whose number, lastindex, says which rule it was; groups
+        at the start would stop re from skipping branches by their first
+        character.
+        """
+        joined = []
+        for anchored in (True, False):
+            globs = [(index, rule) for index, rule in self.tables[is_dir][3] if rule.anchored == anchored]
+            try:
+                regex = re.compile('|'.join(f'{translate_glob(rule.body)}()' for index, rule in globs))
+            except re.error:
+                # Leave out globs that are not valid, which match nothing on their own
+                globs = [(index, rule) for index, rule in globs if rule.regex is not NEVER_MATCHES]
+                regex = re.compile('|'.join(f'{translate_glob(rule.body)}()' for index, rule in globs))
+            joined += [regex if globs else None, [index for index, rule in globs]]
+        self.joined[is_dir] = joined = tuple(joined)
+        return joined
+
+    def match_before(self, rel_path: str, name: str, is_dir: bool, limit: int) -> Optional[IgnoreRule]:
+        """Get the rule that would decide a path if only the rules before index limit existed"""
+        if self.all_tables is None:
+            self.all_tables = tuple(self.compile_all(self.compile(indexed_rules), indexed_rules)
+                                    for indexed_rules in ([r for r in enumerate(self.rules) if not r[1].dir_only],
+                                                          list(enumerate(self.rules))))
+        names, suffixes, paths, globs = self.all_tables[is_dir]
+
+        def latest(indices: List[int]) -> int:
+            position = bisect_left(indices, limit)
+            return indices[position - 1] if position else -1
+
+        best = latest(names.get(name, ()))
+        dot = name.find('.')
+        while dot != -1 and suffixes:
+            best = max(best, latest(suffixes.get(name[dot:], ())))
+            dot = name.find('.', dot + 1)
+        if paths:
+            best = max(best, latest(paths.get(rel_path, ())))
+
+        for index, rule in globs:
+            if index >= limit:
+                continue
+            if index <= best:
+                break
+            if rule.regex.match(rel_path if rule.anchored else name):
+                best = index
+                break
+
+        return self.rules[best] if best >= 0 else None
+
+    @staticmethod
+    def compile_all(tables: tuple, indexed_rules: List[Tuple[int, IgnoreRule]]) -> tuple:
+        """Turn compiled lookup tables into ones listing every rule index per key, ascending"""
+        names, suffixes, paths, globs = {}, {}, {}, tables[3]
+        glob_indices = {index for index, rule in globs}
+        for index, rule in indexed_rules:
+            if index in glob_indices:
+                continue
+            body = rule.body
+            if not any(c in body for c in '*?[\\'):
+                insort((paths if rule.anchored else names).setdefault(body, []), index)
+            else:
+                insort(suffixes.setdefault(body[1:], []), index)
+        return names, suffixes, paths, globs
+
+
+class IgnoreFileCache:
+    """Parsed ignore files keyed by path and (st_mtime_ns, st_size)
+
+    A file is only re-read when its stat stamp changes, so every caller can ask
+    for patterns freely without paying for a reopen and parse.
+    """
+
+    def __init__(self):
+        self.entries = {}  # path -> (stamp, text, patterns, rule set)
+        self.errors: Dict[str, OSError] = {}  # path -> why an existing file could not be read
+
+    def load(self, ignore_file: Path) -> tuple:
+        """Get (stamp, text, patterns, rule set) for ignore file; text is None if the file does not exist
+
+        A file that exists but cannot be read counts as having no rules; the
+        error is kept in errors until the file reads again. Bytes that are not
+        UTF-8 are kept as surrogate escapes, like os.listdir does for names.
+        """
+        key = str(ignore_file)
+        if STATS.enabled:
+            STATS.count('stat_calls')
+        try:
+            st = ignore_file.stat()
+        except (FileNotFoundError, NotADirectoryError):
+            self.entries.pop(key, None)
+            self.errors.pop(key, None)
+            return None, None, frozenset(), None
+        except OSError as e:
+            return self.unreadable(key, e)
+
+        stamp = (st.st_mtime_ns, st.st_size)
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] == stamp:
+            if STATS.enabled:
+                STATS.count('ignore_file_cache_hits')
+            return entry
+
+        if STATS.enabled:
+            STATS.count('ignore_files_parsed')
+        try:
+            with open(ignore_file, 'r', encoding='utf-8', errors='surrogateescape') as f:
+                text = f.read()
+        except OSError as e:
+            return self.unreadable(key, e)
+        self.errors.pop(key, None)
+
+        patterns = set()
+        for line in text.splitlines():
+            line = line.strip()
+            if line and not line.startswith('#'):
+                patterns.add(line)
+
+        rule_set = IgnoreRuleSet.from_lines(text.splitlines(), str(ignore_file))
+        entry = (stamp, text, frozenset(patterns), rule_set if rule_set.rules else None)
+        self.entries[key] = entry
+        return entry
+
+    def unreadable(self, key: str, error: OSError) -> tuple:
+        """Record why an ignore file could not be read and treat it as empty"""
+        self.entries.pop(key, None)
+        self.errors[key] = error
+        return None, "", frozenset(), None
+
+    def get_patterns(self, ignore_file: Path) -> FrozenSet[str]:
+        """Get patterns from ignore file"""
+        return self.load(ignore_file)[2]
+
+    def get_text(self, ignore_file: Path) -> Optional[str]:
+        """Get raw text of ignore file, or None if it does not exist; raises OSError if it cannot be read"""
+        text = self.load(ignore_file)[1]
+        error = self.errors.get(str(ignore_file))
+        if error is not None:
+            raise error
+        return text
+
+    def get_rule_set(self, ignore_file: Path) -> Optional[IgnoreRuleSet]:
+        """Get compiled rules of ignore file, or None if it does not exist or has no rules"""
+        return self.load(ignore_file)[3]
+
+    def invalidate(self, ignore_file: Path):
+        """Forget cached contents of ignore file"""
+        self.entries.pop(str(ignore_file), None)
+
+
+class IgnoreMatcher:
+    """Hierarchical .gitignore semantics for one working directory
+
+    Every directory gets a rule stack: its parent's stack plus the ignore files
+    found in the directory itself, with .git/info/exclude at the bottom. Deeper
+    files take precedence and "!" rules re-include paths, but nothing below an
+    ignored directory can be re-included, so callers prune ignored directories
+    instead of descending into them.
+    """
+
+    IGNORE_FILES = ('.gitignore', '.aidigestignore')
+
+    def __init__(self, root: Path, file_cache: IgnoreFileCache, ignore_files: Tuple[str, ...] = IGNORE_FILES):
+        self.root = Path(root)
+        self.file_cache = file_cache
+        self.ignore_files = ignore_files  # Names read in every directory, lowest precedence first
+        self.stacks = {}  # directory ("" or "src/") -> tuple of (directory, IgnoreRuleSet)
+        self.dir_decisions = {}  # directory path ("src/gen") -> ignored
+
+    def stack_for(self, directory: str, present: Optional[Set[str]] = None) -> tuple:
+        """Get the rule stack for a directory, loading its own ignore files on first use
+
+        present lists the ignore file names known to exist in the directory
+        (e.g. from a listing that was read anyway); without it they are probed.
+        """
+        stack = self.stacks.get(directory)
+        if stack is not None:
+            return stack
+
+        if directory:
+            parent = directory[:directory.rstrip('/').rfind('/') + 1]
+            stack = self.stack_for(parent)
+        else:
+            stack = ()
+            exclude = self.file_cache.get_rule_set(self.root / '.git' / 'info' / 'exclude')
+            if exclude is not None:
+                stack = (("", exclude),)
+
+        for name in self.ignore_files:
+            if present is not None and name not in present:
+                continue
+            rule_set = self.file_cache.get_rule_set(self.root / directory / name)
+            if rule_set is not None:
+                stack += ((directory, rule_set),)
+
+        self.stacks[directory] = stack
+        return stack
+
+    def invalidate(self, directory: str = ""):
+        """Forget rule stacks and decisions at and below a directory whose ignore files changed"""
+        for key in [key for key in self.stacks if key.startswith(directory)]:
+            self.stacks.pop(key, None)
+        for key in [key for key in self.dir_decisions if (key + '/').startswith(directory)]:
+            self.dir_decisions.pop(key, None)
+
+    @staticmethod
+    def match_stack(stack: tuple, path: str, name: str, is_dir: bool) -> bool:
+        """Decide a single entry against a rule stack, ignoring its parents"""
+        for directory, rule_set in reversed(stack):
+            rule = rule_set.match(path[len(directory):], name, is_dir)
+            if rule is not None:
+                return not rule.negated
+        return False
+
+    @staticmethod
+    def match_stack_rule(stack: tuple, path: str, name: str, is_dir: bool) -> Optional[IgnoreRule]:
+        """Get the rule deciding a single entry against a rule stack, if any"""
+        for directory, rule_set in reversed(stack):
+            rule = rule_set.match(path[len(directory):], name, is_dir)
+            if rule is not None:
+                return rule
+        return None
+
+    def explain(self, path: str, is_dir: bool) -> Tuple[bool, Optional[IgnoreRule]]:
+        """Get (ignored, deciding rule) for a path, where the rule may belong to an ignored parent"""
+        parts = path.strip('/').split('/')
+        directory = ""
+        for part in parts[:-1]:
+            dir_path = directory + part
+            rule = self.match_stack_rule(self.stack_for(directory), dir_path, part, True)
+            if rule is not None and not rule.negated:
+                return True, rule
+            directory = dir_path + '/'
+
+        rule = self.match_stack_rule(self.stack_for(directory), directory + parts[-1], parts[-1], is_dir)
+        return (rule is not None and not rule.negated), rule
+
+    def is_ignored(self, path: str, is_dir: bool) -> bool:
+        """Check if a path relative to the root is ignored, directly or through a parent directory"""
+        if STATS.enabled:
+            STATS.count('is_ignored_calls')
+            with STATS.timer('is_ignored'):
+                return self.check_ignored(path, is_dir)
+        return self.check_ignored(path, is_dir)
+
+    def check_ignored(self, path: str, is_dir: bool) -> bool:
+        """is_ignored without instrumentation"""
+        parts = path.strip('/').split('/')
+        directory = ""
+        for part in parts[:-1]:
+            dir_path = directory + part
+            ignored = self.dir_decisions.get(dir_path)
+            if ignored is None:
+                ignored = self.match_stack(self.stack_for(directory), dir_path, part, True)
+                self.dir_decisions[dir_path] = ignored
+            if ignored:
+                return True
+            directory = dir_path + '/'
+
+        return self.match_stack(self.stack_for(directory), directory + parts[-1], parts[-1], is_dir)
+
+
+class IgnoreFileChange:
+    """Outcome of adding patterns to (or removing rules from) one ignore file"""
+
+    __slots__ = ('path', 'added', 'existing', 'old_text', 'new_text', 'removed')
+
+    def __init__(self, path: Path, added: List[str], existing: List[str], old_text: Optional[str],
+                 new_text: Optional[str], removed: Optional[List[str]] = None):
+        self.path = path
+        self.added = added  # Patterns written, in order
+        self.existing = existing  # Requested patterns the file already had
+        self.old_text = old_text  # None if the file did not exist
+        self.new_text = new_text  # None if nothing was written
+        self.removed = removed or []  # Lines taken out, in order
+
+
+def update_ignore_files(targets: List[Path], patterns: List[str],
+                        file_cache: Optional[IgnoreFileCache] = None) -> List[IgnoreFileChange]:
+    """Add patterns to several ignore files as one transaction
+
+    Each file is read once. New contents go to temporary files next to the
+    targets and only then replace them with os.replace, so readers see the
+    old or the new file, never a partial one; if a replace fails, files
+    already replaced are restored. Existing lines, comments and line endings
+    are kept. Raises OSError, in which case no file has changed.
+    """
+    file_cache = file_cache or IgnoreFileCache()
+    plans = []  # (change, real path, old bytes or None, new bytes or None)
+    try:
+        for target in targets:
+            real = Path(os.path.realpath(target))  # Write through a symlinked ignore file
+            try:
+                with open(real, 'rb') as f:
+                    old_data = f.read()
+            except FileNotFoundError:
+                old_data = None
+            text = old_data.decode('utf-8', 'surrogateescape') if old_data is not None else None
+
+            existing = {pattern_key(line) for line in (text or "").splitlines()}
+            added = [p for p in dict.fromkeys(patterns) if pattern_key(p) not in existing]
+            change = IgnoreFileChange(target, added, [p for p in patterns if pattern_key(p) in existing], text, None)
+
+            new_data = None
+            if added:
+                newline = '\r\n' if text and '\r\n' in text else '\n'
+                new_text = text or ""
+                if new_text and not new_text.endswith('\n'):
+                    new_text += newline  # Add newline if file doesn't end with one
+                new_text += newline + '# Added by ignore manager' + newline
+                new_text += ''.join(pattern + newline for pattern in added)
+                change.new_text = new_text
+                new_data = new_text.encode('utf-8', 'surrogateescape')
+            plans.append((change, real, old_data, new_data))
+
+        replace_files([plan[1:] for plan in plans])
+    finally:
+        for target in targets:
+            file_cache.invalidate(target)
+
+    return [plan[0] for plan in plans]
+
+
+def replace_files(writes: List[Tuple[Path, Optional[bytes], Optional[bytes]]]):
+    """Give several files new contents, all or none of them
+
+    writes holds (path, old bytes or None if missing, new bytes or None to
+    leave alone). New contents go to temporary files next to the targets and
+    only then replace them, restoring files already replaced if one fails.
+    Raises OSError, in which case no file has changed.
+    """
+    # Phase 1: write every new file next to its target
+    temps = []
+    try:
+        for real, old_data, new_data in writes:
+            if new_data is not None:
+                temps.append((real, write_temp_file(real, new_data)))
+    except OSError:
+        for real, temp in temps:
+            os.unlink(temp)
+        raise
+
+    # Phase 2: move them into place, undoing earlier moves if one fails
+    replaced = []
+    for index, (real, temp) in enumerate(temps):
+        try:
+            os.replace(temp, real)
+        except OSError:
+            for _, rest in temps[index:]:
+                os.unlink(rest)
+            old = {write[0]: write[1] for write in writes}
+            for done in reversed(replaced):
+                if old[done] is None:
+                    os.unlink(done)
+                else:
+                    os.replace(write_temp_file(done, old[done]), done)
+            raise
+        replaced.append(real)
+
+
+def remove_ignore_lines(removals: Dict[Path, Dict[int, str]],
+                        file_cache: Optional[IgnoreFileCache] = None) -> List[IgnoreFileChange]:
+    """Delete rules from several ignore files as one transaction
+
+    removals maps each file to {line number: pattern} as reported by
+    rule_statistics. Raises ValueError if a line no longer holds its pattern
+    (the file was edited in the meantime) and OSError if writing fails; in
+    both cases no file has changed.
+    """
+    file_cache = file_cache or IgnoreFileCache()
+    changes, writes = [], []
+    try:
+        for target, lines in removals.items():
+            real = Path(os.path.realpath(target))
+            with open(real, 'rb') as f:
+                old_data = f.read()
+            text = old_data.decode('utf-8', 'surrogateescape')
+
+            kept, removed = [], []
+            for line_no, line in enumerate(text.splitlines(keepends=True), 1):
+                if line_no not in lines:
+                    kept.append(line)
+                    continue
+                rule = parse_ignore_line(line)
+                if rule is None or rule.pattern != lines[line_no]:
+                    raise ValueError(f"{target}:{line_no} changed since the analysis, expected {lines[line_no]!r}")
+                removed.append(rule.pattern)
+
+            new_text = "".join(kept)
+            changes.append(IgnoreFileChange(target, [], [], text, new_text, removed))
+            writes.append((real, old_data, new_text.encode('utf-8', 'surrogateescape')))
+
+        replace_files(writes)
+    finally:
+        for target in removals:
+            file_cache.invalidate(target)
+    return changes
+
+
+def write_temp_file(target: Path, data: bytes) -> str:
+    """Write data to a new temporary file beside target, with target's permissions"""
+    fd, temp = tempfile.mkstemp(prefix=f'.{target.name}.', suffix='.tmp', dir=str(target.parent))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            os.chmod(temp, target.stat().st_mode & 0o7777)
+        except FileNotFoundError:
+            os.chmod(temp, 0o644)
+    except OSError:
+        os.unlink(temp)
+        raise
+    return temp
+
+
+def match_entries(stack: tuple, relative_path: str, items: List[Tuple[str, bool]]) -> List[bool]:
+    """Decide (name, is_dir) entries of one directory against a rule stack
+
+    Module-level so it can run in a process pool.
+    """
+    match = IgnoreMatcher.match_stack
+    return [match(stack, relative_path + name, name, is_dir) for name, is_dir in items]
+
+
+def escape_pattern(path: str) -> str:
+    """Escape a literal path so that, as an ignore pattern, it only matches itself"""
+    escaped = re.sub(r'([\\*?\[\]])', r'\\\1', path)
+    if escaped.startswith(('#', '!')):
+        escaped = '\\' + escaped
+    if escaped.endswith(' '):
+        escaped = escaped[:-1] + '\\ '  # Trailing spaces would be stripped otherwise
+    return escaped
+
+
+def minimize_patterns(entries: Iterable['ScanEntry'], selected: Iterable[str]) -> List[str]:
+    """Collapse selected paths into few ignore patterns that ignore exactly the same files
+
+    entries must hold every not yet ignored entry of the tree, hidden files
+    included; selected holds relative paths, directories ending with "/".
+    A directory whose files are all selected becomes "dir/", a directory name
+    that is fully selected wherever it occurs becomes "name/", an extension
+    selected in every file that has it becomes "*.ext" and everything else
+    stays a literal path anchored to the root. The result is checked against
+    entries and replaced by literal paths if it would ignore any other file.
+    """
+    selected = set(selected)
+    selected_dirs = {path for path in selected if path.endswith('/')}
+
+    def parent_of(path: str) -> str:
+        return path[:path.rstrip('/').rfind('/') + 1]
+
+    def ancestors(path: str) -> Iterator[str]:
+        path = parent_of(path)
+        while path:
+            yield path
+            path = parent_of(path)
+
+    # Which files end up ignored, and per directory how many of its files that is
+    files, dirs = [], []
+    for entry in entries:
+        (dirs if entry.is_dir else files).append(entry.rel_path)
+    targets = {path for path in files
+               if path in selected or any(d in selected_dirs for d in ancestors(path))}
+    total, hits = dict.fromkeys(dirs, 0), dict.fromkeys(dirs, 0)
+    for path in files:
+        hit = path in targets
+        for directory in ancestors(path):
+            total[directory] = total.get(directory, 0) + 1
+            hits[directory] = hits.get(directory, 0) + hit
+
+    def extension_of(path: str) -> str:
+        name = path.rsplit('/', 1)[-1]
+        return name.rsplit('.', 1)[1] if '.' in name else ""
+
+    def is_full(directory: str) -> bool:
+        return hits.get(directory, 0) == total.get(directory, 0)
+
+    # Directories whose files are all selected, keeping only the outermost ones
+    candidates = {d for d in dirs if is_full(d) and (hits[d] > 0 or d in selected_dirs)}
+    full_dirs = sorted(d for d in candidates if not any(a in candidates for a in ancestors(d)))
+
+    # The same directory name fully selected everywhere it occurs
+    by_name = {}
+    for directory in full_dirs:
+        by_name.setdefault(directory.rstrip('/').rsplit('/', 1)[-1], []).append(directory)
+    dir_names = sorted(name for name, group in by_name.items() if len(group) > 1
+                       and all(is_full(d) for d in dirs if d.rstrip('/').rsplit('/', 1)[-1] == name))
+    full_dirs = [d for d in full_dirs if d.rstrip('/').rsplit('/', 1)[-1] not in dir_names]
+    covered = set(full_dirs) | {d for d in dirs if d.rstrip('/').rsplit('/', 1)[-1] in dir_names}
+
+    # Extensions every file of which is selected
+    remaining = [path for path in targets if not any(a in covered for a in ancestors(path))]
+    by_extension = {}
+    for path in remaining:
+        by_extension.setdefault(extension_of(path), []).append(path)
+    extensions = []
+    for extension, group in by_extension.items():
+        suffix = '.' + extension
+        if (extension and len(group) > 1 and re.match(r'[A-Za-z0-9_+-]+\Z', extension)
+                and all(path in targets for path in files if path.endswith(suffix))
+                and all(is_full(d) for d in dirs if d.endswith(suffix + '/'))):
+            extensions.append(extension)
+    remaining = [path for path in remaining if extension_of(path) not in extensions]
+
+    patterns = ([escape_pattern(name) + '/' for name in dir_names]
+                + ['/' + escape_pattern(d) for d in full_dirs]
+                + ['*.' + extension for extension in sorted(extensions)]
+                + ['/' + escape_pattern(path) for path in sorted(remaining)])
+
+    # Double-check the result; literal paths are always exact
+    rule_set = IgnoreRuleSet.from_lines(patterns)
+    decisions = {"": False}  # Directory -> ignored, itself or through a parent
+
+    def is_ignored(path: str, is_dir: bool) -> bool:
+        # Decide unknown ancestors top down, without recursing per level
+        chain = []
+        parent = parent_of(path)
+        while parent not in decisions:
+            chain.append(parent)
+            parent = parent_of(parent)
+        for directory in reversed(chain):
+            decisions[directory] = decisions[parent] or rule_set.match(
+                directory.rstrip('/'), directory.rstrip('/').rsplit('/', 1)[-1], True) is not None
+            parent = directory
+        if decisions[parent_of(path)]:
+            return True
+        return rule_set.match(path.rstrip('/'), path.rstrip('/').rsplit('/', 1)[-1], is_dir) is not None
+
+    if any(is_ignored(path, False) != (path in targets) for path in files):
+        patterns = ['/' + escape_pattern(path) for path in sorted(selected)
+                    if not any(a in selected_dirs for a in ancestors(path))]
+    return patterns
+
+
+class PatternImpact:
+    """What one proposed pattern would hide from the files a scan shows"""
+
+    __slots__ = ('pattern', 'files', 'bytes', 'dirs')
+
+    def __init__(self, pattern: str):
+        self.pattern = pattern
+        self.files = 0  # Visible files it hides
+        self.bytes = 0  # Their total size
+        self.dirs = 0  # Visible directories it hides as a whole
+
+
+def pattern_impact(entries: Iterable['ScanEntry'], patterns: List[str]) -> Tuple[List[PatternImpact], int, int]:
+    """Count the visible files and bytes each proposed root pattern would hide
+
+    entries are the visible, non-ignored entries of a walk in display order, so
+    anything they lack is already covered by existing rules. Every file counts
+    once, for the pattern deciding it: the one hiding its outermost hidden
+    directory, else the last pattern matching the file itself, as in git.
+    Returns the impacts (in pattern order) and the visible files and bytes.
+    """
+    impacts = [PatternImpact(pattern) for pattern in patterns]
+    rule_set = IgnoreRuleSet.from_lines(patterns)
+    total_files = total_bytes = 0
+    hidden_dir, hidden_by = None, None  # Outermost hidden directory ("src/") and its pattern
+
+    for entry in entries:
+        rel_path = entry.rel_path
+        if not entry.is_dir:
+            total_files += 1
+            total_bytes += entry.size or 0
+        if hidden_dir is not None:
+            if rel_path.startswith(hidden_dir):
+                if not entry.is_dir:
+                    hidden_by.files += 1
+                    hidden_by.bytes += entry.size or 0
+                continue
+            hidden_dir = None
+
+        rule = rule_set.match(rel_path.rstrip('/'), entry.name, entry.is_dir)
+        if rule is None or rule.negated:
+            continue
+        impact = impacts[rule.line_no - 1]
+        if entry.is_dir:
+            impact.dirs += 1
+            hidden_dir, hidden_by = rel_path, impact
+        else:
+            impact.files += 1
+            impact.bytes += entry.size or 0
+
+    return impacts, total_files, total_bytes
+
+
+def format_size(size: float) -> str:
+    """Format byte count as human-readable size"""
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if size < 1024.0:
+            return f"{size:.1f} {unit}"
+        size /= 1024.0
+    return f"{size:.1f} TB"
+
+
+def parse_size(text: str) -> int:
+    """Parse a size like "500", "20K", "1.5 MB" or "2g" (units of 1024) into bytes"""
+    match = re.fullmatch(r'\s*(\d+(?:\.\d*)?|\.\d+)\s*([kmgt]?)(?:i?b)?\s*', text, re.IGNORECASE)
+    if match is None:
+        raise ValueError(f"Not a size: {text!r}")
+    return int(float(match.group(1)) * 1024 ** " kmgt".index(match.group(2).lower() or " "))
+
+
+class ScanEntry:
+    """One visible directory entry produced by DirectoryWalker"""
+
+    __slots__ = ('name', 'path', 'rel_path', 'is_dir', 'size', 'mtime_ns', 'children')
+
+    def __init__(self, name: str, path: str, rel_path: str, is_dir: bool, size: Optional[int],
+                 mtime_ns: Optional[int] = None):
+        self.name = name
+        self.path = path
+        self.rel_path = rel_path  # Directories keep a trailing "/"
+        self.is_dir = is_dir
+        self.size = size  # None for directories and unreadable files
+        self.mtime_ns = mtime_ns  # Modification time of files, None for directories and unreadable files
+        self.children = None  # 'children', 'empty' or 'denied' once a directory has been peeked
+
+
+class ScanCache:
+    """Persistent directory listings keyed by root path and directory mtime
+
+    Stores the raw listing of every directory read (name, type, size and
+    mtime of each child, hidden and ignored ones included), so changing ignore rules
+    does not invalidate it. A directory is only re-read when its st_mtime_ns
+    differs from the cached one. Editing a file in place does not change its
+    directory's mtime, so a cached size or file mtime can lag until the
+    directory changes.
+    """
+
+    RACY_NS = 2_000_000_000  # Directories modified this recently are re-read next time
+    SCHEMA_VERSION = 3  # Bumped whenever the meaning of stored listings changes
+
+    def __init__(self, db_path: Path):
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        if self.conn.execute('PRAGMA user_version').fetchone()[0] != self.SCHEMA_VERSION:
+            self.conn.execute('DROP TABLE IF EXISTS listings')
+            self.conn.execute(f'PRAGMA user_version = {self.SCHEMA_VERSION}')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS listings ('
+                          'root TEXT, path TEXT, mtime_ns INTEGER, entries TEXT, '
+                          'PRIMARY KEY (root, path))')
+        self.conn.commit()
+        self.pending = {}  # (root, path) -> (mtime_ns, entries) not yet written
+
+    @staticmethod
+    def default_path() -> Path:
+        """Get the scan cache location under the user cache directory"""
+        if sys.platform == 'win32':
+            base = os.environ.get('LOCALAPPDATA') or Path.home() / 'AppData' / 'Local'
+        elif sys.platform == 'darwin':
+            base = Path.home() / 'Library' / 'Caches'
+        else:
+            base = os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache'
+        return Path(base) / 'ignore-manager' / 'scan-cache.sqlite3'
+
+    def get(self, root: str, path: str, mtime_ns: int) -> Optional[List[list]]:
+        """Get cached [name, is_dir, size, mtime_ns] entries of a directory if its mtime still matches"""
+        with self.lock:
+            pending = self.pending.get((root, path))
+            if pending is not None:
+                return pending[1] if pending[0] == mtime_ns else None
+            row = self.conn.execute('SELECT mtime_ns, entries FROM listings WHERE root = ? AND path = ?',
+                                    (root, path)).fetchone()
+        if row is None or row[0] != mtime_ns:
+            return None
+        return json.loads(row[1])
+
+    def put(self, root: str, path: str, mtime_ns: int, entries: List[list]):
+        """Remember the listing of a directory; written on the next commit"""
+        if time.time_ns() - mtime_ns < self.RACY_NS:
+            mtime_ns = -1  # Could still change within the same timestamp
+        with self.lock:
+            self.pending[(root, path)] = (mtime_ns, entries)
+
+    def commit(self):
+        """Write pending listings in a single transaction"""
+        with self.lock:
+            if not self.pending:
+                return
+            rows = [(root, path, mtime_ns, json.dumps(entries, separators=(',', ':')))
+                    for (root, path), (mtime_ns, entries) in self.pending.items()]
+            self.pending.clear()
+            self.conn.executemany('INSERT OR REPLACE INTO listings VALUES (?, ?, ?, ?)', rows)
+            self.conn.commit()
+
+    def clear(self, root: str):
+        """Forget every listing under a root"""
+        with self.lock:
+            self.pending = {key: value for key, value in self.pending.items() if key[0] != root}
+            self.conn.execute('DELETE FROM listings WHERE root = ?', (root,))
+            self.conn.commit()
+
+
+class DirectoryWalker:
+    """Single-pass os.scandir walker
+
+    Every directory is read exactly once: listing a directory also reads each
+    visible subdirectory to find out whether it has children, and keeps that
+    listing until the subdirectory itself is requested. File type and size
+    come from the cached DirEntry data instead of separate is_dir/stat calls.
+    Ignored directories are pruned, so nothing below them is ever read. With a
+    ScanCache, directories whose mtime is unchanged are not read at all.
+    """
+
+    VISIBLE_DOTFILES = IgnoreMatcher.IGNORE_FILES
+    MATCH_CHUNK_SIZE = 2048  # Entries per process pool job; smaller directories are matched inline
+
+    def __init__(self, matcher: IgnoreMatcher, cache: Optional[ScanCache] = None,
+                 match_pool: Optional[Executor] = None, show_hidden: bool = False):
+        self.matcher = matcher
+        self.cache = cache
+        self.match_pool = match_pool  # Optional process pool for ignore matching
+        self.show_hidden = show_hidden  # Include dotfiles (but never .git) in listings
+        self.cache_root = os.path.abspath(matcher.root)
+        self.listings = {}  # path -> entries read ahead while peeking into a subdirectory
+
+    def read_listing(self, path: str, relative_path: str, fresh: bool = False) -> tuple:
+        """Get raw [name, is_dir, size, mtime_ns] entries of a directory, plus DirEntry objects when freshly read
+
+        Returns (listing, dir_entries, mtime_ns); dir_entries is None for a listing
+        that came from the scan cache. fresh skips the cache lookup.
+        """
+        mtime_ns = None
+        if self.cache is not None:
+            mtime_ns = os.stat(path).st_mtime_ns
+            listing = None if fresh else self.cache.get(self.cache_root, relative_path, mtime_ns)
+            if STATS.enabled:
+                STATS.count('stat_calls')
+                STATS.count('scan_cache_hits' if listing is not None else 'scan_cache_misses')
+            if listing is not None:
+                return listing, None, mtime_ns
+
+        with os.scandir(path) as it:
+            dir_entries = list(it)
+        if STATS.enabled:
+            STATS.count('dirs_listed')
+            STATS.count('entries_listed', len(dir_entries))
+
+        listing = []
+        for dir_entry in dir_entries:
+            try:
+                # Like git, a symlink is never descended into, so links like X11 -> . cannot loop
+                is_dir = dir_entry.is_dir(follow_symlinks=False)
+            except OSError:
+                is_dir = False
+            listing.append([dir_entry.name, is_dir, None, None])  # Sizes and mtimes are filled in once needed
+        return listing, dir_entries, mtime_ns
+
+    def read_directory(self, path: str, relative_path: str, fresh: bool = False) -> List[ScanEntry]:
+        """Read visible, non-ignored entries of a directory, directories first
+
+        relative_path is "" for the root, otherwise it ends with "/".
+        """
+        with STATS.timer('list'):
+            listing, dir_entries, mtime_ns = self.read_listing(path, relative_path, fresh)
+
+        # Rules from this directory's own ignore files apply to its entries
+        present = {item[0] for item in listing if item[0] in IgnoreMatcher.IGNORE_FILES}
+        stack = self.matcher.stack_for(relative_path, present)
+
+        # Skip hidden files except ignore files
+        if self.show_hidden:
+            visible = [i for i, item in enumerate(listing) if item[0] != '.git']
+        else:
+            visible = [i for i, item in enumerate(listing)
+                       if not item[0].startswith('.') or item[0] in self.VISIBLE_DOTFILES]
+        with STATS.timer('match'):
+            ignored = self.match_listing(stack, relative_path, [(listing[i][0], listing[i][1]) for i in visible])
+
+        entries = []
+        changed = dir_entries is not None
+        stat_calls = 0
+        for i, skip in zip(visible, ignored):
+            if skip:
+                continue
+
+            item = listing[i]
+            name, is_dir, size, file_mtime = item
+            rel_path = relative_path + name
+            full_path = os.path.join(path, name)
+            if is_dir:
+                rel_path += "/"
+            elif size is None:
+                try:
+                    st = (dir_entries[i].stat(follow_symlinks=False) if dir_entries is not None
+                          else os.stat(full_path, follow_symlinks=False))
+                    size = item[2] = st.st_size
+                    file_mtime = item[3] = st.st_mtime_ns
+                    changed = True
+                except OSError:
+                    pass
+                stat_calls += 1
+            entries.append(ScanEntry(name, full_path, rel_path, is_dir, size, file_mtime))
+
+        if STATS.enabled:
+            STATS.count('stat_calls', stat_calls)
+            STATS.count('paths_matched', len(visible))
+
+        if self.cache is not None and changed:
+            self.cache.put(self.cache_root, relative_path, mtime_ns, listing)
+
+        # Sort items: directories first, then files
+        entries.sort(key=lambda e: (not e.is_dir, e.name.lower()))
+        return entries
+
+    def match_listing(self, stack: tuple, relative_path: str, items: List[Tuple[str, bool]]) -> List[bool]:
+        """Decide (name, is_dir) entries of one directory, in the process pool for big directories"""
+        if self.match_pool is None or len(items) < self.MATCH_CHUNK_SIZE:
+            return match_entries(stack, relative_path, items)
+
+        size = self.MATCH_CHUNK_SIZE
+        futures = [self.match_pool.submit(match_entries, stack, relative_path, items[i:i + size])
+                   for i in range(0, len(items), size)]
+        return [ignored for future in futures for ignored in future.result()]
+
+    def list_children(self, path: str, relative_path: str, fresh: bool = False) -> List[ScanEntry]:
+        """List a directory and flag which of its subdirectories have visible children
+
+        fresh re-reads the directory itself, bypassing read-ahead and scan cache.
+        """
+        entries = self.listings.pop(path, None)
+        if entries is None or fresh:
+            entries = self.read_directory(path, relative_path, fresh)
+        elif STATS.enabled:
+            STATS.count('readahead_hits')
+
+        for entry in entries:
+            if not entry.is_dir:
+                continue
+            try:
+                listing = self.read_directory(entry.path, entry.rel_path)
+            except PermissionError:
+                entry.children = 'denied'
+                continue
+            except OSError:
+                entry.children = 'empty'
+                continue
+
+            if listing:
+                entry.children = 'children'
+                self.listings[entry.path] = listing
+            else:
+                entry.children = 'empty'
+
+        if self.cache is not None:
+            self.cache.commit()
+        return entries
+
+    def walk(self, path: str, relative_path: str = "",
+             errors: Optional[List[Tuple[str, OSError]]] = None, workers: int = 1) -> Iterator[ScanEntry]:
+        """Yield every visible entry below a directory, depth first in display order
+
+        Only one listing per directory level is held at a time. Directories that
+        cannot be read are skipped and, if errors is given, recorded there. With
+        more than one worker, directories are listed by a ParallelWalk in the
+        background; the output order stays the same.
+        """
+        if workers > 1:
+            yield from ParallelWalk(self, workers).walk(path, relative_path, errors)
+            return
+
+        stack = []
+        try:
+            stack.append(iter(self.read_directory(path, relative_path)))
+        except OSError as e:
+            if errors is not None:
+                errors.append((relative_path, e))
+
+        while stack:
+            entry = next(stack[-1], None)
+            if entry is None:
+                stack.pop()
+                if self.cache is not None:
+                    self.cache.commit()
+                continue
+
+            yield entry
+            if entry.is_dir:
+                try:
+                    stack.append(iter(self.read_directory(entry.path, entry.rel_path)))
+                except OSError as e:
+                    if errors is not None:
+                        errors.append((entry.rel_path, e))
+
+
+class DirectoryTotals:
+    """Recursive size and file count of directories, rolled up bottom-up and memoized
+
+    Counts the visible, non-ignored files below a directory, i.e. what a scan
+    would show. Subtrees already summed are reused, so after a change only the
+    changed directory and its ancestors have to be summed again; listings come
+    from the walker and therefore from the scan cache when it is enabled.
+    """
+
+    def __init__(self, walker: DirectoryWalker):
+        self.walker = walker
+        self.totals = {}  # directory ("src/") -> (bytes, files)
+
+    def invalidate(self, relative_path: str, subtree: bool = False):
+        """Forget a directory and its ancestors, and with subtree everything below it as well"""
+        if subtree:
+            for key in [key for key in self.totals if key.startswith(relative_path)]:
+                del self.totals[key]
+        path = relative_path
+        while path:
+            self.totals.pop(path, None)
+            path = path[:path.rstrip('/').rfind('/') + 1]
+        self.totals.pop("", None)
+
+    def compute(self, path: str, relative_path: str) -> Tuple[int, int]:
+        """Get (bytes, files) below a directory, summing only subtrees not known yet
+
+        Unreadable subdirectories count as empty; an unreadable directory itself
+        raises OSError.
+        """
+        known = self.totals.get(relative_path)
+        if known is not None:
+            return known
+
+        # Frames of (directory, entry iterator, [bytes, files]) in post-order
+        stack = [(relative_path, iter(self.walker.read_directory(path, relative_path)), [0, 0])]
+        while stack:
+            rel_path, entries, total = stack[-1]
+            entry = next(entries, None)
+            if entry is None:
+                stack.pop()
+                self.totals[rel_path] = (total[0], total[1])
+                if stack:
+                    stack[-1][2][0] += total[0]
+                    stack[-1][2][1] += total[1]
+                continue
+
+            if not entry.is_dir:
+                total[0] += entry.size or 0
+                total[1] += 1
+                continue
+
+            known = self.totals.get(entry.rel_path)
+            if known is not None:
+                total[0] += known[0]
+                total[1] += known[1]
+                continue
+            try:
+                stack.append((entry.rel_path, iter(self.walker.read_directory(entry.path, entry.rel_path)), [0, 0]))
+            except OSError:
+                pass  # Skip directories we can't access
+
+        if self.walker.cache is not None:
+            self.walker.cache.commit()
+        return self.totals[relative_path]
+
+
+class DirectoryTask:
+    """Listing of one directory scheduled on a ParallelWalk"""
+
+    __slots__ = ('path', 'rel_path', 'state', 'entries', 'error', 'children')
+
+    def __init__(self, path: str, rel_path: str):
+        self.path = path
+        self.rel_path = rel_path
+        self.state = 'queued'  # 'queued', 'running' or 'done'
+        self.entries = None
+        self.error = None
+        self.children = {}  # rel_path -> DirectoryTask of each visible subdirectory
+
+
+class ParallelWalk:
+    """Multi-threaded traversal with the same output order as DirectoryWalker.walk
+
+    Each worker keeps its own deque of directory tasks: subdirectories found by a
+    worker are pushed onto its deque and taken back newest first, while idle
+    workers steal the oldest task (usually the biggest untouched subtree) from
+    another worker. The consumer yields entries depth first and, when the
+    directory it needs next has not been started, lists it itself instead of
+    waiting. Workers pause once max_ahead listings are waiting to be consumed.
+    """
+
+    def __init__(self, walker: 'DirectoryWalker', workers: int, max_ahead: int = 4096):
+        self.walker = walker
+        self.workers = max(1, workers)
+        self.max_ahead = max_ahead
+        self.cv = threading.Condition()
+        self.deques = [deque() for _ in range(self.workers + 1)]  # Last one holds the consumer's finds
+        self.ahead = 0  # Listings started or finished but not consumed yet
+        self.closed = False
+        self.threads = []
+
+    def walk(self, path: str, relative_path: str = "",
+             errors: Optional[List[Tuple[str, OSError]]] = None) -> Iterator[ScanEntry]:
+        """Yield every visible entry below a directory, depth first in display order"""
+        root = DirectoryTask(path, relative_path)
+        self.deques[0].append(root)
+        for index in range(self.workers):
+            thread = threading.Thread(target=self.run_worker, args=(index,), daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+        try:
+            stack = [self.consume(root, errors)]
+            while stack:
+                entry = next(stack[-1], None)
+                if entry is None:
+                    stack.pop()
+                    if self.walker.cache is not None:
+                        self.walker.cache.commit()
+                    continue
+                yield entry
+                if entry.is_dir:
+                    stack.append(self.consume(stack[-1].task.children.pop(entry.rel_path), errors))
+        finally:
+            self.close()
+
+    def consume(self, task: DirectoryTask, errors) -> Iterator[ScanEntry]:
+        """Wait for (or run) a task and return an iterator over its entries that remembers the task"""
+        with self.cv:
+            run_here = task.state == 'queued'
+            if run_here:
+                task.state = 'running'  # Left in its deque, workers skip it
+                self.ahead += 1
+            else:
+                while task.state != 'done':
+                    self.cv.wait()
+
+        if run_here:
+            self.run_task(task, len(self.deques) - 1)
+
+        with self.cv:
+            self.ahead -= 1
+            self.cv.notify_all()
+
+        if task.error is not None and errors is not None:
+            errors.append((task.rel_path, task.error))
+        return TaskIterator(task)
+
+    def run_worker(self, index: int):
+        """Worker thread: take tasks from its own deque, or steal from others"""
+        own = self.deques[index]
+        while True:
+            with self.cv:
+                task = None
+                while task is None:
+                    if self.closed:
+                        return
+                    if self.ahead < self.max_ahead:
+                        task = self.take(own)
+                    if task is None:
+                        self.cv.wait()
+                task.state = 'running'
+                self.ahead += 1
+
+            self.run_task(task, index)
+
+    def take(self, own: deque) -> Optional[DirectoryTask]:
+        """Pop the newest task of our deque, or steal the oldest task of another (lock held)"""
+        while own:
+            task = own.pop()
+            if task.state == 'queued':
+                return task
+        for other in self.deques:
+            while other is not own and other:
+                task = other.popleft()
+                if task.state == 'queued':
+                    return task
+        return None
+
+    def run_task(self, task: DirectoryTask, index: int):
+        """List a directory and queue its subdirectories on deque index"""
+        try:
+            entries = self.walker.read_directory(task.path, task.rel_path)
+        except OSError as e:
+            entries, task.error = [], e
+
+        children = {entry.rel_path: DirectoryTask(entry.path, entry.rel_path) for entry in entries if entry.is_dir}
+        with self.cv:
+            task.entries = entries
+            task.children = children
+            task.state = 'done'
+            # Reversed so the first subdirectory is popped first
+            self.deques[index].extend(reversed(list(children.values())))
+            self.cv.notify_all()
+
+    def close(self):
+        """Stop the workers"""
+        with self.cv:
+            self.closed = True
+            self.cv.notify_all()
+        for thread in self.threads:
+            thread.join()
+        if self.walker.cache is not None:
+            self.walker.cache.commit()
+
+
+class TaskIterator:
+    """Iterator over the entries of a finished DirectoryTask"""
+
+    __slots__ = ('task', 'it')
+
+    def __init__(self, task: DirectoryTask):
+        self.task = task
+        self.it = iter(task.entries)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> ScanEntry:
+        return next(self.it)
+
+
+HASH_CHUNK_SIZE = 1 << 20  # Bytes read at a time while hashing, so big files never sit in memory
+
+
+def hash_file(path: str, algorithm: str = 'sha256') -> Tuple[str, int]:
+    """Get the hex digest of a file's content, reading it in chunks, and the number of bytes hashed"""
+    digest = hashlib.new(algorithm)
+    size = 0
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def iter_manifest(entries: Iterable[ScanEntry], algorithm: Optional[str] = None, workers: int = 8,
+                  errors: Optional[list] = None) -> Iterator[Tuple[str, Optional[int], Optional[str]]]:
+    """Stream (rel_path, size, digest) for the files among entries, in walk order
+
+    With an algorithm, files are hashed on a thread pool while the walk goes
+    on. At most workers * 4 hashes are in flight, so memory stays flat no
+    matter how many files there are. digest is None without an algorithm and
+    for files that cannot be read; those go to errors as (rel_path, error).
+    A hashed file's size is the number of bytes hashed, so the two always
+    agree even if the walk's size is out of date.
+    Raises ValueError for an algorithm hashlib does not know.
+    """
+    files = (entry for entry in entries if not entry.is_dir)
+    if algorithm is None:
+        for entry in files:
+            yield entry.rel_path, entry.size, None
+        return
+
+    hashlib.new(algorithm)  # Unknown algorithms fail before anything is read
+
+    def hash_entry(entry: ScanEntry) -> Tuple[Optional[str], Optional[int], Optional[OSError]]:
+        try:
+            digest, size = hash_file(entry.path, algorithm)
+            return digest, size, None
+        except OSError as e:
+            return None, entry.size, e
+
+    def finish(entry: ScanEntry, future) -> Tuple[str, Optional[int], Optional[str]]:
+        digest, size, error = future.result()
+        if error is not None and errors is not None:
+            errors.append((entry.rel_path, error))
+        return entry.rel_path, size, digest
+
+    pending = deque()  # (entry, future) in walk order
+    submitted = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        try:
+            for entry in files:
+                pending.append((entry, pool.submit(hash_entry, entry)))
+                submitted += 1
+                if len(pending) >= workers * 4:
+                    yield finish(*pending.popleft())
+            while pending:
+                yield finish(*pending.popleft())
+        finally:
+            # Abandoned part way: do not hash what nobody will read
+            cancelled = sum(1 for _, future in pending if future.cancel())
+            if STATS.enabled:
+                STATS.count('files_hashed', submitted - cancelled)
+
+
+def write_manifest(records: Iterable[Tuple[str, Optional[int], Optional[str]]], stream, fmt: str = 'jsonl',
+                   algorithm: Optional[str] = None) -> Tuple[int, int]:
+    """Write manifest records as JSON lines or as bare paths; returns (files, bytes)
+
+    JSON lines carry path and size, plus the digest under the algorithm's
+    name when there is one. The paths format is one path per line.
+    """
+    files = total = 0
+    for rel_path, size, digest in records:
+        if fmt == 'paths':
+            stream.write(rel_path + '\n')
+        else:
+            record = {'path': rel_path, 'size': size}
+            if digest is not None:
+                record[algorithm] = digest
+            stream.write(json.dumps(record, ensure_ascii=False) + '\n')
+        files += 1
+        total += size or 0
+    return files, total
+
+
+def write_manifest_file(target: Path, records: Iterable[Tuple[str, Optional[int], Optional[str]]],
+                        fmt: str = 'jsonl', algorithm: Optional[str] = None) -> Tuple[int, int]:
+    """Stream a manifest into a temporary file and move it over target once complete
+
+    If anything fails or the records raise part way, target is left as it was.
+    """
+    fd, temp = tempfile.mkstemp(prefix=f'.{target.name}.', suffix='.tmp', dir=str(target.parent))
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', newline='\n') as f:
+            counts = write_manifest(records, f, fmt, algorithm)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            os.chmod(temp, target.stat().st_mode & 0o7777)
+        except FileNotFoundError:
+            os.chmod(temp, 0o644)
+        os.replace(temp, target)
+    except BaseException:
+        os.unlink(temp)
+        raise
+    return counts
+
+
+class GitIndex:
+    """Tracked paths of a git repository, read from .git/index without running git
+
+    The index is memory-mapped and parsed in one pass (versions 2 to 4, SHA-1
+    and SHA-256 repositories). Paths are kept relative to the directory the
+    index was loaded for, sorted like git sorts them, so the tracked files
+    below a directory are a contiguous range found by bisection.
+    """
+
+    def __init__(self, paths: List[str], stamp: tuple):
+        self.paths = paths  # Sorted tracked paths ("src/main.py")
+        self.files = frozenset(paths)
+        self.stamp = stamp  # (st_mtime_ns, st_size) of the index file
+
+    @staticmethod
+    def find_git_dir(root: Path) -> Optional[Tuple[Path, str]]:
+        """Get the git directory of the repository containing root and root's place in it ("" or "sub/")"""
+        root = Path(os.path.abspath(root))
+        for top in (root, *root.parents):
+            git = top / '.git'
+            if git.is_dir():
+                git_dir = git
+            elif git.is_file():
+                # Worktrees and submodules: ".git" is a file saying "gitdir: <path>"
+                text = git.read_text(encoding='utf-8', errors='replace').strip()
+                if not text.startswith('gitdir:'):
+                    continue
+                git_dir = top / text[len('gitdir:'):].strip()
+            else:
+                continue
+            prefix = root.relative_to(top).as_posix()
+            return git_dir, "" if prefix == '.' else prefix + '/'
+        return None
+
+    @staticmethod
+    def hash_size(git_dir: Path) -> int:
+        """Object ID length: 32 bytes in SHA-256 repositories, otherwise 20"""
+        common = git_dir / 'commondir'
+        if common.is_file():
+            git_dir = git_dir / common.read_text(encoding='utf-8').strip()
+        try:
+            config = (git_dir / 'config').read_text(encoding='utf-8', errors='replace')
+        except OSError:
+            return 20
+        return 32 if re.search(r'^\s*objectformat\s*=\s*sha256\s*$', config, re.I | re.M) else 20
+
+    @classmethod
+    def load(cls, root: Path) -> Optional['GitIndex']:
+        """Read the index of the repository containing root; None outside a repository or before the first add
+
+        Raises ValueError for an index this reader does not understand.
+        """
+        found = cls.find_git_dir(root)
+        if found is None:
+            return None
+        git_dir, prefix = found
+        try:
+            f = open(git_dir / 'index', 'rb')
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        with f:
+            st = os.fstat(f.fileno())
+            if STATS.enabled:
+                STATS.count('stat_calls')
+            if st.st_size == 0:
+                return cls([], (st.st_mtime_ns, st.st_size))
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                paths = cls.parse(data, cls.hash_size(git_dir), prefix)
+        return cls(paths, (st.st_mtime_ns, st.st_size))
+
+    @staticmethod
+    def parse(data, hash_size: int, prefix: str = "") -> List[str]:
+        """Get the tracked paths starting with prefix (which is stripped) from raw index data
+
+        Raises ValueError for an unsupported or truncated index.
+        """
+        try:
+            return GitIndex.parse_entries(data, hash_size, prefix)
+        except (struct.error, IndexError) as e:
+            raise ValueError(f"Truncated git index: {e}") from e
+
+    @staticmethod
+    def parse_entries(data, hash_size: int, prefix: str) -> List[str]:
+        """Body of parse; reads past the end of data raise struct.error or IndexError"""
+        signature, version, count = struct.unpack_from('>4sII', data, 0)
+        if signature != b'DIRC' or version not in (2, 3, 4):
+            raise ValueError(f"Unsupported git index (signature {signature!r}, version {version})")
+
+        flags_offset = 40 + hash_size  # Ten 32-bit stat fields, then the object ID
+        prefix_bytes = prefix.encode('utf-8', 'surrogateescape')
+        paths = []
+        previous = b''
+        pos = 12
+        for _ in range(count):
+            flags = struct.unpack_from('>H', data, pos + flags_offset)[0]
+            name_start = pos + flags_offset + 2
+            if version >= 3 and flags & 0x4000:
+                name_start += 2  # Extended flags
+
+            if version == 4:
+                # The name replaces the end of the previous one: a varint of bytes to drop, then the new suffix
+                byte = data[name_start]
+                name_start += 1
+                strip = byte & 0x7f
+                while byte & 0x80:
+                    byte = data[name_start]
+                    name_start += 1
+                    strip = ((strip + 1) << 7) | (byte & 0x7f)
+                end = data.find(b'\0', name_start)
+                if end < 0:
+                    raise IndexError("path runs past the end")
+                name = previous[:len(previous) - strip] + data[name_start:end]
+                pos = end + 1
+            else:
+                end = data.find(b'\0', name_start)
+                if end < 0:
+                    raise IndexError("path runs past the end")
+                name = data[name_start:end]
+                pos += (end - pos + 8) & ~7  # Entries are NUL-padded to a multiple of 8 bytes
+            previous = name
+
+            # Conflicted paths appear once per stage
+            if name.startswith(prefix_bytes):
+                path = name[len(prefix_bytes):].decode('utf-8', 'surrogateescape')
+                if not paths or paths[-1] != path:
+                    paths.append(path)
+        return paths
+
+    def is_tracked(self, rel_path: str) -> bool:
+        """Check if a file is tracked, or for a directory ("src/") if anything below it is"""
+        if rel_path.endswith('/'):
+            return self.count_below(rel_path) > 0
+        return rel_path in self.files
+
+    def count_below(self, directory: str) -> int:
+        """Count the tracked paths below a directory ("src/"; "" for all of them)"""
+        if not directory:
+            return len(self.paths)
+        # Every path starting with "src/" sorts between "src/" and "src0"
+        end = directory[:-1] + chr(ord(directory[-1]) + 1)
+        return bisect_left(self.paths, end) - bisect_left(self.paths, directory)
+
+    def count_tracked(self, rel_path: str) -> int:
+        """Count tracked files a selected file or directory ("src/") stands for"""
+        if rel_path.endswith('/'):
+            return self.count_below(rel_path)
+        return 1 if rel_path in self.files else 0
+
+
+class RuleStats:
+    """What one ignore rule does to the tree"""
+
+    __slots__ = ('rule', 'files', 'bytes', 'dirs', 'matched', 'needed')
+
+    def __init__(self, rule: IgnoreRule):
+        self.rule = rule
+        self.files = 0  # Files it ignores, including everything below directories it ignores
+        self.bytes = 0
+        self.dirs = 0  # Directories it ignores or (negated) re-includes directly
+        self.matched = 0  # Entries it matches, wherever they are
+        self.needed = 0  # Entries whose outcome would change without it
+
+    @property
+    def status(self) -> str:
+        """'dead' if it matches nothing, 'shadowed' if other rules already do its job, else 'used'"""
+        if not self.matched:
+            return 'dead'
+        return 'used' if self.needed else 'shadowed'
+
+
+def rule_statistics(root: Path, file_cache: IgnoreFileCache,
+                    errors: Optional[List[Tuple[str, OSError]]] = None) -> List[RuleStats]:
+    """Attribute every ignored entry below root to the rule that ignores it, in one walk
+
+    Unlike DirectoryWalker this descends into ignored directories, so each rule
+    gets the files and bytes it hides. git only reads .gitignore files and
+    .git/info/exclude, so their rules are judged against those alone; rules of
+    .aidigestignore are judged against the stack the digest uses, both files.
+    A rule matches an entry when its pattern does, whichever rule decides it,
+    and is needed for an entry when the outcome would change without it; one
+    that only matches entries inside ignored directories, or that other rules
+    would decide the same way anyway, is shadowed. Ignore files inside ignored
+    directories are not read, as git does not read them. Returns every rule
+    found, by file and line.
+    """
+    # (matcher, ignore files whose rules it reports, RuleStats by id(rule))
+    families = [(IgnoreMatcher(root, file_cache, ('.gitignore',)), ('.gitignore', 'exclude'), {}),
+                (IgnoreMatcher(root, file_cache), ('.aidigestignore',), {})]
+    owners = {}  # id(rule) -> (rule set, index in it)
+
+    def stats_for(stats: dict, rule: IgnoreRule) -> RuleStats:
+        entry = stats.get(id(rule))
+        if entry is None:
+            entry = stats[id(rule)] = RuleStats(rule)
+        return entry
+
+    def register(stack: tuple, stats: dict):
+        for directory, rule_set in stack:
+            if id(rule_set.rules[0]) not in stats:
+                for index, rule in enumerate(rule_set.rules):
+                    owners[id(rule)] = (rule_set, index)
+                    stats_for(stats, rule)
+
+    def matching_rules(stack: tuple, rel_path: str, name: str, is_dir: bool) -> Iterator[IgnoreRule]:
+        # Every rule whose pattern matches, the deciding one first
+        for directory, rule_set in reversed(stack):
+            local = rel_path[len(directory):]
+            rule = rule_set.match(local, name, is_dir)
+            while rule is not None:
+                yield rule
+                rule = rule_set.match_before(local, name, is_dir, owners[id(rule)][1])
+
+    def next_rule(stack: tuple, rule: IgnoreRule, rel_path: str, name: str, is_dir: bool) -> Optional[IgnoreRule]:
+        # The rule that would decide the entry if rule were deleted
+        owner, index = owners[id(rule)]
+        found = False
+        for directory, rule_set in reversed(stack):
+            local = rel_path[len(directory):]
+            if rule_set is owner:
+                found = True
+                candidate = rule_set.match_before(local, name, is_dir, index)
+            elif found:
+                candidate = rule_set.match(local, name, is_dir)
+            else:
+                continue  # Files of higher precedence did not match, or rule would not have decided
+            if candidate is not None:
+                return candidate
+        return None
+
+    pending = [("", [None] * len(families))]  # (directory, per family RuleStats of the rule hiding it or None)
+    while pending:
+        rel_dir, hidden_by = pending.pop()
+        try:
+            with os.scandir(os.path.join(root, rel_dir)) as it:
+                dir_entries = list(it)
+        except OSError as e:
+            if errors is not None:
+                errors.append((rel_dir, e))
+            continue
+
+        present = {e.name for e in dir_entries if e.name in IgnoreMatcher.IGNORE_FILES}
+        stacks = []
+        for (matcher, _, stats), hidden in zip(families, hidden_by):
+            stacks.append(matcher.stack_for(rel_dir, present if hidden is None else set()))
+            register(stacks[-1], stats)
+
+        for dir_entry in dir_entries:
+            name = dir_entry.name
+            if name == '.git':
+                continue
+            try:
+                is_dir = dir_entry.is_dir(follow_symlinks=False)
+            except OSError:
+                is_dir = False
+            rel_path = rel_dir + name
+
+            decisions = []
+            for (_, _, stats), stack, hidden in zip(families, stacks, hidden_by):
+                decided = hidden
+                for rank, rule in enumerate(matching_rules(stack, rel_path, name, is_dir)):
+                    rule_stats = stats_for(stats, rule)
+                    rule_stats.matched += 1
+                    if rank or hidden is not None:
+                        continue
+                    alternative = next_rule(stack, rule, rel_path, name, is_dir)
+                    if (alternative is None or alternative.negated) != rule.negated:
+                        rule_stats.needed += 1
+                    if is_dir:
+                        rule_stats.dirs += 1
+                    decided = None if rule.negated else rule_stats
+                decisions.append(decided)
+
+            if is_dir:
+                pending.append((rel_path + '/', decisions))
+                continue
+            decisions = [decided for decided in decisions if decided is not None]
+            if not decisions:
+                continue
+            if STATS.enabled:
+                STATS.count('stat_calls')
+            try:
+                size = dir_entry.stat(follow_symlinks=False).st_size
+            except OSError:
+                size = 0
+            for decided in decisions:
+                decided.files += 1
+                decided.bytes += size
+
+    reported = [entry for _, names, stats in families for entry in stats.values()
+                if Path(entry.rule.source).name in names]
+    return sorted(reported, key=lambda entry: (entry.rule.source, entry.rule.line_no))
+
+
+class DirectoryWatcher:
+    """Reports changes in watched directories from a background thread
+
+    Uses inotify on Linux and otherwise falls back to polling the mtime of each
+    watched directory together with the stamps of its ignore files. Changes are
+    queued on events as ('dir', directory) when entries were added, removed or
+    modified, and ('rules', directory) when one of its ignore files changed;
+    directory is relative to the root ("" or ending with "/").
+    """
+
+    POLL_INTERVAL = 2.0
+
+    # inotify constants from <sys/inotify.h>
+    IN_MODIFY = 0x00000002
+    IN_ATTRIB = 0x00000004
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_MOVE_SELF = 0x00000800
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+    WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE
+                  | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+
+    def __init__(self, root: Path):
+        self.root = str(root)
+        self.events = queue.Queue()
+        self.lock = threading.Lock()
+        self.watched = {}  # directory -> watch descriptor (inotify) or stamp (polling)
+        self.wd_dirs = {}  # watch descriptor -> directory
+        self.stopped = threading.Event()
+        self.libc = None
+        self.fd = -1
+
+        if sys.platform.startswith('linux'):
+            try:
+                self.init_inotify()
+            except (OSError, AttributeError):
+                self.fd = -1  # No inotify available, poll instead
+
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    @property
+    def mode(self) -> str:
+        return 'inotify' if self.fd >= 0 else 'polling'
+
+    def init_inotify(self):
+        """Open an inotify instance through libc"""
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        fd = libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.libc, self.fd = libc, fd
+
+    def poll_stamp(self, path: str) -> tuple:
+        """Get the mtime of a directory plus (mtime, size) of its ignore files"""
+        stamp = []
+        for name in ('',) + IgnoreMatcher.IGNORE_FILES:
+            try:
+                st = os.stat(os.path.join(path, name))
+                stamp.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                stamp.append(None)
+        if STATS.enabled:
+            STATS.count('stat_calls', len(stamp))
+        return tuple(stamp)
+
+    def watch(self, directory: str):
+        """Start reporting changes in a directory"""
+        path = os.path.join(self.root, directory)
+        with self.lock:
+            if directory in self.watched or self.stopped.is_set():
+                return
+            if self.fd >= 0:
+                wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), self.WATCH_MASK)
+                if wd < 0:
+                    return  # E.g. watch limit reached; the directory just won't update live
+                self.watched[directory] = wd
+                self.wd_dirs[wd] = directory
+            else:
+                self.watched[directory] = self.poll_stamp(path)
+
+    def unwatch(self, directory: str):
+        """Stop reporting changes in a directory"""
+        with self.lock:
+            wd = self.watched.pop(directory, None)
+            if self.fd >= 0 and wd is not None:
+                self.wd_dirs.pop(wd, None)
+                self.libc.inotify_rm_watch(self.fd, wd)
+
+    def stop(self):
+        """Stop the watcher thread"""
+        self.stopped.set()
+
+    def run(self):
+        """Background thread: wait for changes and queue events"""
+        if self.fd >= 0:
+            self.run_inotify()
+        else:
+            self.run_polling()
+
+    def run_inotify(self):
+        """Read and decode inotify events until stopped"""
+        header = struct.Struct('iIII')
+        try:
+            while not self.stopped.is_set():
+                ready, _, _ = select.select([self.fd], [], [], 0.5)
+                if not ready:
+                    continue
+                try:
+                    data = os.read(self.fd, 65536)
+                except BlockingIOError:
+                    continue
+
+                offset = 0
+                while offset + header.size <= len(data):
+                    wd, mask, cookie, length = header.unpack_from(data, offset)
+                    name = os.fsdecode(data[offset + header.size:offset + header.size + length].rstrip(b'\0'))
+                    offset += header.size + length
+                    self.handle_event(wd, mask, name)
+        finally:
+            with self.lock:
+                os.close(self.fd)
+                self.fd = -1
+                self.watched.clear()
+                self.wd_dirs.clear()
+
+    def handle_event(self, wd: int, mask: int, name: str):
+        """Translate one inotify event into a queued change"""
+        if mask & self.IN_Q_OVERFLOW:
+            # Events were lost, treat every watched directory as changed
+            with self.lock:
+                directories = list(self.watched)
+            for directory in directories:
+                self.events.put(('dir', directory))
+            return
+
+        with self.lock:
+            directory = self.wd_dirs.get(wd)
+            if directory is not None and mask & self.IN_IGNORED:
+                self.wd_dirs.pop(wd, None)
+                self.watched.pop(directory, None)
+                return
+        if directory is None:
+            return
+
+        if mask & (self.IN_DELETE_SELF | self.IN_MOVE_SELF):
+            # The directory itself went away, its parent listing changed
+            self.events.put(('dir', directory[:directory.rstrip('/').rfind('/') + 1]))
+            return
+
+        if name in IgnoreMatcher.IGNORE_FILES:
+            self.events.put(('rules', directory))
+        self.events.put(('dir', directory))
+
+    def run_polling(self):
+        """Compare directory stamps every POLL_INTERVAL seconds until stopped"""
+        while not self.stopped.wait(self.POLL_INTERVAL):
+            with self.lock:
+                watched = list(self.watched.items())
+
+            for directory, stamp in watched:
+                new_stamp = self.poll_stamp(os.path.join(self.root, directory))
+                if new_stamp == stamp:
+                    continue
+                with self.lock:
+                    if directory in self.watched:
+                        self.watched[directory] = new_stamp
+                if new_stamp[1:] != stamp[1:]:
+                    self.events.put(('rules', directory))
+                self.events.put(('dir', directory))
+
+
+class FileIndex:
+    """Size, extension and modification time of every scanned file, for selection queries
+
+    Rows are numbered in walk order. Sizes and mtimes are also kept sorted
+    with their rows, so "larger than" and "older than" are a bisect plus a
+    slice, and each lowercased extension maps straight to its rows. Binary
+    detection reads only the first SNIFF_BYTES of a file, like git does.
+    """
+
+    SNIFF_BYTES = 8000  # Git calls a file binary if this much of it contains a NUL byte
+    SNIFF_WORKERS = 8  # Parallel reads while sniffing
+
+    def __init__(self, entries: Iterable[ScanEntry]):
+        self.paths = []  # row -> relative path
+        self.full_paths = []  # row -> absolute path
+        self.sizes = array('q')  # row -> size in bytes, -1 if unknown
+        self.mtimes = array('q')  # row -> st_mtime_ns, -1 if unknown
+        self.extensions = {}  # lowercased extension -> rows
+        for entry in entries:
+            if entry.is_dir:
+                continue
+            row = len(self.paths)
+            self.paths.append(entry.rel_path)
+            self.full_paths.append(entry.path)
+            self.sizes.append(-1 if entry.size is None else entry.size)
+            self.mtimes.append(-1 if entry.mtime_ns is None else entry.mtime_ns)
+            if '.' in entry.name:
+                self.extensions.setdefault(entry.name.rsplit('.', 1)[1].lower(), []).append(row)
+
+        self.by_size = sorted(range(len(self.sizes)), key=self.sizes.__getitem__)
+        self.size_keys = array('q', (self.sizes[row] for row in self.by_size))
+        self.by_mtime = sorted(range(len(self.mtimes)), key=self.mtimes.__getitem__)
+        self.mtime_keys = array('q', (self.mtimes[row] for row in self.by_mtime))
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def larger_than(self, size: int) -> List[str]:
+        """Get files of more than size bytes"""
+        return [self.paths[row] for row in self.by_size[bisect_right(self.size_keys, size):]]
+
+    def with_extensions(self, extensions: Iterable[str]) -> List[str]:
+        """Get files with any of the extensions ("log", ".LOG" and "*.log" all work), in walk order"""
+        rows = set()
+        for extension in extensions:
+            rows.update(self.extensions.get(extension.lstrip('*.').lower(), ()))
+        return [self.paths[row] for row in sorted(rows)]
+
+    def older_than(self, mtime_ns: int) -> List[str]:
+        """Get files last modified before a time, skipping those whose mtime is unknown
+
+        Indexed mtimes can come from the scan cache, which does not notice a
+        file edited in place. Such a file only looks older than it is, so the
+        candidates are stat'ed once more and only still old files count.
+        """
+        start = bisect_left(self.mtime_keys, 0)
+        end = bisect_left(self.mtime_keys, mtime_ns, start)
+        paths = []
+        for row in self.by_mtime[start:end]:
+            try:
+                if os.stat(self.full_paths[row], follow_symlinks=False).st_mtime_ns < mtime_ns:
+                    paths.append(self.paths[row])
+            except OSError:
+                pass  # Gone since the scan
+        if STATS.enabled:
+            STATS.count('stat_calls', end - start)
+        return paths
+
+    def binaries(self, known: Optional[Dict[str, tuple]] = None) -> List[str]:
+        """Get files with a NUL byte near the start, reading each file at most once
+
+        known maps absolute paths to (size, mtime_ns, is_binary) from earlier
+        calls and is updated in place; a file is read again only if its size
+        or mtime changed. Empty and unreadable files are not binary.
+        """
+        known = {} if known is None else known
+        results = {}  # row -> is_binary
+        unknown = []
+        for row, path in enumerate(self.full_paths):
+            size, mtime_ns = self.sizes[row], self.mtimes[row]
+            if size <= 0:
+                continue
+            cached = known.get(path)
+            if cached is not None and cached[0] == size and cached[1] == mtime_ns:
+                results[row] = cached[2]
+            else:
+                unknown.append(row)
+
+        if unknown:
+            with ThreadPoolExecutor(max_workers=self.SNIFF_WORKERS) as pool:
+                sniffed = pool.map(self.sniff, (self.full_paths[row] for row in unknown))
+                for row, is_binary in zip(unknown, sniffed):
+                    results[row] = is_binary
+                    known[self.full_paths[row]] = (self.sizes[row], self.mtimes[row], is_binary)
+            if STATS.enabled:
+                STATS.count('files_sniffed', len(unknown))
+
+        return [self.paths[row] for row in sorted(results) if results[row]]
+
+    @classmethod
+    def sniff(cls, path: str) -> bool:
+        """Check if the start of a file contains a NUL byte"""
+        try:
+            with open(path, 'rb') as f:
+                return b'\0' in f.read(cls.SNIFF_BYTES)
+        except OSError:
+            return False
+
+
+class NameIndex:
+    """Trigram index over lowercased item names for substring search"""
+
+    def __init__(self):
+        self.names = {}  # key -> lowercased name
+        self.trigrams = {}  # trigram -> set of keys
+
+    def add(self, key: str, name: str):
+        """Index an item name"""
+        name = name.lower()
+        self.names[key] = name
+        for i in range(len(name) - 2):
+            self.trigrams.setdefault(name[i:i + 3], set()).add(key)
+
+    def clear(self):
+        """Drop all indexed names"""
+        self.names.clear()
+        self.trigrams.clear()
+
+    def remove(self, key: str):
+        """Drop an indexed name"""
+        name = self.names.pop(key, None)
+        if name is None:
+            return
+        for i in range(len(name) - 2):
+            keys = self.trigrams.get(name[i:i + 3])
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.trigrams[name[i:i + 3]]
+
+    def matches(self, key: str, text: str) -> bool:
+        """Check if an indexed name contains text"""
+        return text in self.names[key]
+
+    def search(self, text: str, within: Optional[Set[str]] = None) -> Set[str]:
+        """Get keys whose name contains text, optionally narrowing an earlier result"""
+        text = text.lower()
+        candidates = within
+        if len(text) >= 3:
+            postings = sorted((self.trigrams.get(text[i:i + 3], set()) for i in range(len(text) - 2)), key=len)
+            if candidates is None or len(postings[0]) < len(candidates):
+                candidates = set.intersection(*postings)
+        if candidates is None:
+            candidates = self.names
+
+        names = self.names
+        return {key for key in candidates if text in names[key]}
+
+
+class NodeStore:
+    """Compact table of tree nodes keyed by Tk item ID
+
+    Every node is one slot across parallel arrays: an interned name, the slot
+    of its parent, a flag byte and a size (file size or directory total, -1
+    while unknown). Relative and full paths are rebuilt from
+    the parent chain on demand instead of being stored per node, and bulk
+    check operations work on the whole flag array at once. Slots of removed
+    nodes are reused.
+    """
+
+    IS_DIR = 1
+    CHECKED = 2
+    USED = 4
+    CHECKED_TABLE = bytes((flags >> 1) & 1 for flags in range(256))  # Flag byte -> 1 if CHECKED
+
+    def __init__(self, root: str = ""):
+        self.root = root  # Directory the top-level nodes live in
+        self.item_ids = []  # slot -> item ID, None for a free slot
+        self.names = []  # slot -> interned name
+        self.parents = array('l')  # slot -> parent slot, -1 for top-level nodes
+        self.flags = bytearray()  # slot -> IS_DIR | CHECKED | USED bits
+        self.sizes = array('q')  # slot -> size in bytes, -1 if unknown
+        self.slots = {}  # item ID -> slot
+        self.free = []  # Slots available for reuse
+        self.checked_count = 0
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def __contains__(self, item_id) -> bool:
+        return item_id in self.slots
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.slots)
+
+    def clear(self, root: str = ""):
+        """Drop every node and start over below another root directory"""
+        self.__init__(root)
+
+    def add(self, item_id: str, name: str, parent_item: str, is_dir: bool, size: int = -1):
+        """Store a node under parent_item ("" for top level)"""
+        parent = self.slots[parent_item] if parent_item else -1
+        flags = self.USED | (self.IS_DIR if is_dir else 0)
+        if self.free:
+            slot = self.free.pop()
+            self.item_ids[slot] = item_id
+            self.names[slot] = sys.intern(name)
+            self.parents[slot] = parent
+            self.flags[slot] = flags
+            self.sizes[slot] = size
+        else:
+            slot = len(self.item_ids)
+            self.item_ids.append(item_id)
+            self.names.append(sys.intern(name))
+            self.parents.append(parent)
+            self.flags.append(flags)
+            self.sizes.append(size)
+        self.slots[item_id] = slot
+
+    def remove(self, item_id: str):
+        """Free the slot of a node; its children must be removed as well"""
+        slot = self.slots.pop(item_id)
+        if self.flags[slot] & self.CHECKED:
+            self.checked_count -= 1
+        self.item_ids[slot] = None
+        self.names[slot] = ""
+        self.flags[slot] = 0
+        self.free.append(slot)
+
+    def name(self, item_id: str) -> str:
+        """Get the file or directory name of a node"""
+        return self.names[self.slots[item_id]]
+
+    def is_dir(self, item_id: str) -> bool:
+        """Check if a node is a directory"""
+        return bool(self.flags[self.slots[item_id]] & self.IS_DIR)
+
+    def is_checked(self, item_id: str) -> bool:
+        """Check if a node is checked"""
+        return bool(self.flags[self.slots[item_id]] & self.CHECKED)
+
+    def size(self, item_id: str) -> int:
+        """Get the size of a node in bytes, -1 if unknown"""
+        return self.sizes[self.slots[item_id]]
+
+    def set_size(self, item_id: str, size: int):
+        """Store the size of a node"""
+        self.sizes[self.slots[item_id]] = size
+
+    def parent(self, item_id: str) -> str:
+        """Get the item ID of a node's parent, "" for top-level nodes"""
+        parent = self.parents[self.slots[item_id]]
+        return self.item_ids[parent] if parent >= 0 else ""
+
+    def path(self, item_id: str) -> str:
+        """Get the relative path of a node; directories end with "/" """
+        return self.slot_path(self.slots[item_id])
+
+    def slot_path(self, slot: int) -> str:
+        """Rebuild the relative path of a slot from its parent chain"""
+        parts = []
+        suffix = "/" if self.flags[slot] & self.IS_DIR else ""
+        while slot >= 0:
+            parts.append(self.names[slot])
+            slot = self.parents[slot]
+        return "/".join(reversed(parts)) + suffix
+
+    def full_path(self, item_id: str) -> Path:
+        """Get the absolute path of a node"""
+        return Path(self.root, self.path(item_id))
+
+    def set_checked(self, item_id: str, checked: bool) -> bool:
+        """Set the checked flag of a node; returns False if it already had that state"""
+        slot = self.slots[item_id]
+        flags = self.flags[slot]
+        if bool(flags & self.CHECKED) == checked:
+            return False
+        self.flags[slot] = flags ^ self.CHECKED
+        self.checked_count += 1 if checked else -1
+        return True
+
+    def set_checked_items(self, item_ids: Iterable[str], checked: bool) -> List[str]:
+        """Set the checked flag of many nodes at once; returns the item IDs that changed"""
+        flags, slots = self.flags, self.slots
+        changed = []
+        for item_id in item_ids:
+            slot = slots[item_id]
+            if bool(flags[slot] & self.CHECKED) != checked:
+                flags[slot] ^= self.CHECKED
+                changed.append(item_id)
+        self.checked_count += len(changed) if checked else -len(changed)
+        return changed
+
+    def set_checked_by_type(self, files: bool, dirs: bool) -> List[str]:
+        """Check every file and/or directory and uncheck the rest; returns the item IDs that changed"""
+        def wanted(flags: int) -> bool:
+            return dirs if flags & self.IS_DIR else files
+
+        # Translation tables map every possible flag byte to its new value in one pass
+        changed_table = bytes(1 if flags & self.USED and bool(flags & self.CHECKED) != wanted(flags) else 0
+                              for flags in range(256))
+        new_table = bytes((flags & ~self.CHECKED) | (self.CHECKED if wanted(flags) else 0)
+                          if flags & self.USED else flags for flags in range(256))
+
+        changed = list(compress(self.item_ids, self.flags.translate(changed_table)))
+        self.flags = self.flags.translate(new_table)
+        self.checked_count = self.flags.translate(self.CHECKED_TABLE).count(1)
+        return changed
+
+    def checked_items(self) -> List[str]:
+        """Get the item IDs of all checked nodes"""
+        return list(compress(self.item_ids, self.flags.translate(self.CHECKED_TABLE)))
+
+    def checked_paths(self) -> List[str]:
+        """Get the relative paths of all checked nodes"""
+        dir_paths = {-1: ""}  # Parent slot -> its path, shared between siblings
+
+        def parent_path(slot: int) -> str:
+            # Climb to the nearest known ancestor, then fill in the chain top down; no recursion
+            chain = []
+            while slot not in dir_paths:
+                chain.append(slot)
+                slot = self.parents[slot]
+            path = dir_paths[slot]
+            for slot in reversed(chain):
+                path = dir_paths[slot] = path + self.names[slot] + "/"
+            return path
+
+        paths = []
+        for slot in compress(range(len(self.flags)), self.flags.translate(self.CHECKED_TABLE)):
+            path = parent_path(self.parents[slot]) + self.names[slot]
+            paths.append(path + "/" if self.flags[slot] & self.IS_DIR else path)
+        return paths
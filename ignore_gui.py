@@ -0,0 +1,1820 @@
+"""
+Tree view GUI of the Git/AI Digest Ignore Manager
+"""
+
+import os
+import re
+import queue
+import sqlite3
+import time
+import threading
+import tkinter as tk
+from tkinter import ttk, filedialog, messagebox, scrolledtext
+from pathlib import Path
+from typing import List, Set, Tuple, Optional, FrozenSet
+
+from ignore_core import (IgnoreFileCache, IgnoreMatcher, ScanCache, ScanEntry, DirectoryWalker,
+                         DirectoryWatcher, DirectoryTotals, FileIndex, NameIndex, NodeStore, IgnoreFileChange,
+                         PatternImpact, GitIndex, RuleStats, format_size, iter_manifest, minimize_patterns, pattern_key,
+                         parse_size, pattern_impact, remove_ignore_lines, rule_statistics, update_ignore_files,
+                         write_manifest_file, STATS)
+from virtual_tree import VirtualTree
+
+
+class TreeWalk:
+    """Expand or collapse in progress, run over the tree a time slice at a time"""
+
+    __slots__ = ('open_rows', 'depth', 'matches', 'stack', 'seen', 'changed')
+
+    def __init__(self, open_rows: bool, depth: int, matches: bool, stack: List[Tuple[str, int]]):
+        self.open_rows = open_rows  # True to expand, False to collapse
+        self.depth = depth  # Deepest level to expand, top-level rows being 1
+        self.matches = matches  # Only open the directories leading to filter matches
+        self.stack = stack  # (item ID, depth) still to visit
+        self.seen = set()  # Directories already handled in matches mode
+        self.changed = 0  # Rows opened or closed so far
+
+
+class IgnoreManagerTreeGUI:
+    SCAN_CHUNK_SIZE = 100  # Entries per message from the scanner thread
+    SCAN_BATCH_SIZE = 500  # Tree inserts per main loop tick
+    SCAN_POLL_MS = 20
+    SCAN_WORKERS = min(4, os.cpu_count() or 1)  # Scanner threads listing directories in parallel
+    FILTER_DELAY_MS = 150  # Debounce for the filter entry
+    WATCH_POLL_MS = 300  # How often filesystem changes are applied to the tree
+    INDEX_POLL_MS = 100  # How often the scan index build reports progress
+    EXPORT_POLL_MS = 200  # How often export progress is shown
+    TREE_WALK_SLICE_MS = 15  # Main loop time per slice of Expand/Collapse
+    UNLIMITED_DEPTH = 1 << 30  # Expand All depth, deeper than any real tree
+    HASH_WORKERS = min(8, (os.cpu_count() or 1) * 2)  # Threads hashing files during an export
+    SMART_QUERIES = {  # Smart selection query -> example value
+        "Larger than": "10 MB",
+        "Extension": "log, tmp",
+        "Binary files": "",
+        "Older than (days)": "365",
+    }
+
+    def __init__(self, root, use_cache: bool = True):
+        self.root = root
+        self.root.title("Git/AI Digest Ignore Manager - Tree View")
+        self.root.geometry("1000x750")
+
+        # Variables
+        self.directory = tk.StringVar(value=os.getcwd())
+        self.nodes = NodeStore()  # Name, parent, type and check state of every row, keyed by item ID
+        self.child_order = {}  # Parent item -> child items in display order
+        self.unloaded_dirs = set()  # Directory items whose children are still a placeholder
+        self.loading_dirs = set()  # Directory items queued for the scanner
+        self.dir_items = {}  # Relative path of each loaded directory -> item ID ("" for the root)
+        self.ignore_cache = IgnoreFileCache()
+        self.ignore_matcher = None  # Rules of the current refresh
+
+        # Filtering
+        self.name_index = NameIndex()
+        self.filter_text = ""  # Filter currently applied to the tree
+        self.filter_matches = None  # Items matching filter_text, None when not filtering
+        self.detached = set()  # Items hidden by the filter
+        self.filter_after_id = None
+
+        # Background scanning
+        self.scan_jobs = [queue.Queue() for _ in range(self.SCAN_WORKERS)]  # One job queue per scanner thread
+        self.scan_results = queue.Queue()
+        self.scan_threads = []
+        self.scan_generation = 0  # Bumped to cancel every queued and running scan job
+        self.scan_root = None
+        self.scan_walker = None
+        self.scan_errors = []
+        self.pending_scans = 0
+        self.scan_poll_id = None
+        self.scan_index = None  # Every visible entry (dotfiles included) for generalizing and previews
+        self.scan_index_complete = False  # No directory of scan_index was unreadable
+        self.index_generation = 0  # Bumped whenever the scan index goes stale or its build is cancelled
+        self.index_results = queue.Queue()
+        self.index_progress = None  # [entries walked] of the running index build, None when none runs
+        self.index_waiters = []  # Callbacks run on the main loop once the scan index is ready
+        self.index_poll_id = None
+        self.git_index = None  # Tracked files of the repository being shown, if any
+        self.file_index = None  # Size, extension and mtime of every file the tree can show, built with scan_index
+        self.sniff_cache = {}  # Absolute path -> (size, mtime_ns, is_binary) of files already sniffed
+        self.reveal_paths = set()  # Rows to check (files) or load and open (directories) once they are inserted
+        self.use_cache_var = tk.BooleanVar(value=use_cache)
+        self.scan_cache = None  # Scans still work, just without reuse between sessions
+        if use_cache:
+            try:
+                self.scan_cache = ScanCache(ScanCache.default_path())
+            except (OSError, sqlite3.Error):
+                pass
+
+        # Directory sizes
+        self.size_jobs = queue.Queue()
+        self.size_thread = None
+        self.dir_totals = None  # Recursive sizes of the current refresh
+        self.pending_sizes = 0
+        self.sort_by_size = False  # Order siblings by size instead of by name
+
+        # Filesystem watching
+        self.watcher = None
+        self.watch_poll_id = None
+        self.watch_var = tk.BooleanVar(value=True)
+
+        # Expand/Collapse
+        self.tree_walk = None  # TreeWalk in progress
+        self.tree_walk_id = None
+        self.expand_depth_var = tk.IntVar(value=2)
+
+        # Manifest export
+        self.export_cancel = None  # Set to stop the running export, None when no export runs
+
+        # Hot-path statistics, also switched on by --profile
+        self.stats_var = tk.BooleanVar(value=STATS.enabled)
+        self.refresh_started = None  # perf_counter() of the refresh whose scan is still running
+
+        self.setup_ui()
+        self.refresh_tree()
+
+    def setup_ui(self):
+        """Create the GUI layout"""
+        # Main frame
+        main_frame = ttk.Frame(self.root, padding="10")
+        main_frame.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+
+        # Configure grid weights
+        self.root.columnconfigure(0, weight=1)
+        self.root.rowconfigure(0, weight=1)
+        main_frame.columnconfigure(0, weight=1)
+        main_frame.rowconfigure(2, weight=1)
+
+        # Directory selection
+        dir_frame = ttk.LabelFrame(main_frame, text="Directory", padding="5")
+        dir_frame.grid(row=0, column=0, sticky=(tk.W, tk.E), pady=(0, 10))
+        dir_frame.columnconfigure(1, weight=1)
+
+        ttk.Label(dir_frame, text="Working Directory:").grid(row=0, column=0, sticky=tk.W, padx=(0, 5))
+        dir_entry = ttk.Entry(dir_frame, textvariable=self.directory, width=50)
+        dir_entry.grid(row=0, column=1, sticky=(tk.W, tk.E), padx=(0, 5))
+        ttk.Button(dir_frame, text="Browse", command=self.browse_directory).grid(row=0, column=2)
+        ttk.Button(dir_frame, text="Refresh", command=self.refresh_tree).grid(row=0, column=3, padx=(5, 0))
+        ttk.Button(dir_frame, text="Cancel", command=self.cancel_scan).grid(row=0, column=4, padx=(5, 0))
+        ttk.Checkbutton(dir_frame, text="Use scan cache", variable=self.use_cache_var).grid(row=0, column=5,
+                                                                                            padx=(5, 0))
+        ttk.Checkbutton(dir_frame, text="Watch for changes", variable=self.watch_var).grid(row=0, column=6,
+                                                                                           padx=(5, 0))
+        self.directory.trace('w', self.on_directory_changed)
+
+        # Tree frame
+        tree_frame = ttk.LabelFrame(main_frame, text="Files and Directories", padding="5")
+        tree_frame.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(0, 10))
+        tree_frame.columnconfigure(0, weight=1)
+        tree_frame.rowconfigure(3, weight=1)
+
+        # Selection buttons
+        select_frame = ttk.Frame(tree_frame)
+        select_frame.grid(row=0, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(0, 5))
+
+        ttk.Button(select_frame, text="Check All", command=self.check_all).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(select_frame, text="Uncheck All", command=self.uncheck_all).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(select_frame, text="Check Files Only", command=self.check_files_only).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(select_frame, text="Check Dirs Only", command=self.check_dirs_only).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(select_frame, text="Expand All", command=self.expand_all).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(select_frame, text="Expand to Depth", command=self.expand_to_depth).pack(side=tk.LEFT)
+        ttk.Spinbox(select_frame, from_=1, to=99, width=3,
+                    textvariable=self.expand_depth_var).pack(side=tk.LEFT, padx=(2, 5))
+        ttk.Button(select_frame, text="Expand Matches", command=self.expand_matches).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(select_frame, text="Collapse All", command=self.collapse_all).pack(side=tk.LEFT)
+
+        # Smart selection: check files by size, extension, content or age across the whole tree
+        smart_frame = ttk.Frame(tree_frame)
+        smart_frame.grid(row=1, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(0, 5))
+
+        ttk.Label(smart_frame, text="Check files:").pack(side=tk.LEFT, padx=(0, 5))
+        self.smart_query_var = tk.StringVar(value="Larger than")
+        self.smart_value_var = tk.StringVar(value=self.SMART_QUERIES["Larger than"])
+        smart_query = ttk.Combobox(smart_frame, textvariable=self.smart_query_var, state='readonly', width=18,
+                                   values=list(self.SMART_QUERIES))
+        smart_query.pack(side=tk.LEFT, padx=(0, 5))
+        smart_query.bind('<<ComboboxSelected>>',
+                         lambda event: self.smart_value_var.set(self.SMART_QUERIES[self.smart_query_var.get()]))
+        ttk.Entry(smart_frame, textvariable=self.smart_value_var, width=15).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(smart_frame, text="Check Matching", command=self.smart_select).pack(side=tk.LEFT)
+
+        # Search frame
+        search_frame = ttk.Frame(tree_frame)
+        search_frame.grid(row=2, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(0, 5))
+        search_frame.columnconfigure(1, weight=1)
+
+        ttk.Label(search_frame, text="Filter:").grid(row=0, column=0, sticky=tk.W, padx=(0, 5))
+        self.search_var = tk.StringVar()
+        self.search_var.trace('w', self.filter_tree)
+        search_entry = ttk.Entry(search_frame, textvariable=self.search_var, width=30)
+        search_entry.grid(row=0, column=1, sticky=(tk.W, tk.E), padx=(0, 5))
+        ttk.Button(search_frame, text="Clear", command=self.clear_filter).grid(row=0, column=2)
+
+        # Create treeview with checkboxes
+        tree_container = ttk.Frame(tree_frame)
+        tree_container.grid(row=3, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        tree_container.columnconfigure(0, weight=1)
+        tree_container.rowconfigure(0, weight=1)
+
+        # Configure treeview columns; only rows in view get drawn, so huge trees stay responsive
+        self.tree = VirtualTree(tree_container, columns=('type', 'size', 'git'), show='tree headings', stats=STATS)
+        self.tree.heading('#0', text='Name', anchor=tk.W, command=lambda: self.set_sort(False))
+        self.tree.heading('type', text='Type', anchor=tk.W)
+        self.tree.heading('size', text='Size', anchor=tk.E, command=lambda: self.set_sort(True))
+        self.tree.heading('git', text='Git', anchor=tk.W)
+
+        self.tree.column('#0', width=400, minwidth=200)
+        self.tree.column('type', width=140, minwidth=50)
+        self.tree.column('size', width=100, minwidth=60)
+        self.tree.column('git', width=90, minwidth=40)
+
+        # Scrollbars for tree
+        tree_scroll_y = ttk.Scrollbar(tree_container, orient=tk.VERTICAL, command=self.tree.yview)
+        tree_scroll_x = ttk.Scrollbar(tree_container, orient=tk.HORIZONTAL, command=self.tree.xview)
+        self.tree.configure(yscrollcommand=tree_scroll_y.set, xscrollcommand=tree_scroll_x.set)
+
+        self.tree.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        tree_scroll_y.grid(row=0, column=1, sticky=(tk.N, tk.S))
+        tree_scroll_x.grid(row=1, column=0, sticky=(tk.W, tk.E))
+
+        # Bind tree events
+        self.tree.bind('<Button-1>', self.on_tree_click)
+        self.tree.bind('<space>', self.on_tree_space)
+        self.tree.bind('<<TreeviewOpen>>', self.on_tree_open)
+
+        # Configure tags for different item types
+        self.tree.tag_configure('checked', foreground='blue')
+        self.tree.tag_configure('unchecked', foreground='black')
+        self.tree.tag_configure('directory', foreground='darkblue')
+        self.tree.tag_configure('file', foreground='darkgreen')
+
+        # Action frame
+        action_frame = ttk.LabelFrame(main_frame, text="Actions", padding="5")
+        action_frame.grid(row=3, column=0, sticky=(tk.W, tk.E), pady=(0, 10))
+
+        # Ignore file options
+        ignore_frame = ttk.Frame(action_frame)
+        ignore_frame.pack(fill=tk.X, pady=(0, 10))
+
+        ttk.Label(ignore_frame, text="Add selected items to:").pack(side=tk.LEFT, padx=(0, 10))
+
+        self.gitignore_var = tk.BooleanVar(value=True)
+        self.aidigest_var = tk.BooleanVar(value=False)
+
+        ttk.Checkbutton(ignore_frame, text=".gitignore", variable=self.gitignore_var).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Checkbutton(ignore_frame, text=".aidigestignore", variable=self.aidigest_var).pack(side=tk.LEFT)
+
+        self.minimize_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(ignore_frame, text="Generalize patterns (dir/, *.ext)",
+                        variable=self.minimize_var).pack(side=tk.LEFT, padx=(20, 0))
+
+        # Action buttons
+        button_frame = ttk.Frame(action_frame)
+        button_frame.pack(fill=tk.X)
+
+        ttk.Button(button_frame, text="Add to Ignore Files", command=self.add_to_ignore_files).pack(side=tk.LEFT,
+                                                                                                    padx=(0, 5))
+        ttk.Button(button_frame, text="Preview Changes", command=self.preview_changes).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(button_frame, text="View Ignore Files", command=self.view_ignore_files).pack(side=tk.LEFT,
+                                                                                                padx=(0, 5))
+        ttk.Button(button_frame, text="Export File List", command=self.export_file_list).pack(side=tk.LEFT,
+                                                                                             padx=(0, 5))
+        ttk.Button(button_frame, text="Stats", command=self.show_stats).pack(side=tk.LEFT, padx=(0, 5))
+
+        # Selection info
+        self.selection_var = tk.StringVar(value="0 items selected")
+        ttk.Label(button_frame, textvariable=self.selection_var).pack(side=tk.RIGHT, padx=(10, 0))
+
+        # Status bar
+        self.status_var = tk.StringVar(value="Ready")
+        status_bar = ttk.Label(main_frame, textvariable=self.status_var, relief=tk.SUNKEN, anchor=tk.W)
+        status_bar.grid(row=4, column=0, sticky=(tk.W, tk.E), pady=(10, 0))
+
+    def browse_directory(self):
+        """Open directory browser"""
+        directory = filedialog.askdirectory(initialdir=self.directory.get())
+        if directory:
+            self.directory.set(directory)
+            self.refresh_tree()
+
+    def get_existing_patterns(self, ignore_file: Path) -> FrozenSet[str]:
+        """Read existing patterns from ignore file"""
+        try:
+            return self.ignore_cache.get_patterns(ignore_file)
+        except Exception as e:
+            self.status_var.set(f"Warning: Could not read {ignore_file}: {e}")
+            return frozenset()
+
+    def populate_tree(self, parent_item: str, directory: Path, relative_path: str = "", expand: int = 0,
+                      mode: str = 'load'):
+        """Queue one level of the tree for the background scanner
+
+        expand is how many levels of the new directory rows to open and load
+        as they arrive. mode 'load' streams new children in chunks; 'sync' (directory changed on
+        disk) and 'rules' (ignore rules changed) deliver the full listing at once
+        so it can be diffed against the loaded children.
+        """
+        if not self.scan_threads:
+            for jobs in self.scan_jobs:
+                thread = threading.Thread(target=self.scan_worker, args=(jobs,), daemon=True)
+                thread.start()
+                self.scan_threads.append(thread)
+
+        # Jobs for the same directory always go to the same thread, so a later
+        # sync can never be overtaken by an earlier one
+        jobs = self.scan_jobs[hash(parent_item) % len(self.scan_jobs)]
+        if STATS.enabled:
+            STATS.count('directories_queued')
+        self.pending_scans += 1
+        jobs.put((self.scan_generation, parent_item, directory, relative_path, expand, mode))
+        self.schedule_scan_results()
+
+    def scan_worker(self, jobs: queue.Queue):
+        """Background thread: list queued directories and stream their entries to the main loop"""
+        while True:
+            generation, parent_item, directory, relative_path, expand, mode = jobs.get()
+            if generation != self.scan_generation:
+                continue  # Scan was cancelled or superseded
+
+            items = []
+            try:
+                items = self.list_directory(directory, relative_path, generation, fresh=mode == 'sync')
+            except PermissionError:
+                pass  # Skip directories we can't access
+            except Exception as e:
+                self.scan_results.put((generation, 'error', parent_item, f"Error populating tree: {e}", expand))
+                if mode != 'load':
+                    items = None  # Keep the loaded children rather than wiping them
+
+            if mode != 'load':
+                if items is not None:
+                    self.scan_results.put((generation, 'sync', parent_item, items, expand))
+            else:
+                for start in range(0, len(items), self.SCAN_CHUNK_SIZE):
+                    chunk = items[start:start + self.SCAN_CHUNK_SIZE]
+                    self.scan_results.put((generation, 'entries', parent_item, chunk, expand))
+            self.scan_results.put((generation, 'done', parent_item, mode, expand))
+
+    def list_directory(self, directory: Path, relative_path: str, generation: int,
+                       fresh: bool = False) -> List[ScanEntry]:
+        """List one directory (runs on a scanner thread, must not touch Tk)"""
+        if generation != self.scan_generation:
+            return []
+        with STATS.timer('list_directory'):
+            return self.scan_walker.list_children(str(directory), relative_path, fresh)
+
+    def insert_entries(self, parent_item: str, entries: List[ScanEntry], expand: int):
+        """Insert a chunk of scanned entries under parent item"""
+        self.clear_placeholder(parent_item)
+        with STATS.timer('tree_insert'):
+            inserted = [self.insert_entry(parent_item, entry, expand) for entry in entries]
+        if STATS.enabled:
+            STATS.count('tree_inserts', len(inserted))
+
+        if self.filter_text:
+            self.filter_new_items(inserted)
+
+    def insert_entry(self, parent_item: str, entry: ScanEntry, expand: int = 0,
+                     index='end') -> str:
+        """Insert one scanned entry under parent item and return its item ID"""
+        # Determine icon and type
+        if entry.is_dir:
+            icon = "📁"
+            item_type = "Folder"
+            tags = ('directory', 'unchecked')
+        else:
+            icon = "📄"
+            item_type = "File"
+            tags = ('file', 'unchecked')
+
+        # Insert item into tree
+        item_id = self.tree.insert(parent_item, index,
+                                   text=f"☐ {icon} {entry.name}",
+                                   values=(item_type, self.entry_size_text(entry), self.tracked_text(entry)),
+                                   tags=tags,
+                                   open=False)
+
+        # Store item data
+        self.nodes.add(item_id, entry.name, parent_item, entry.is_dir,
+                       -1 if entry.is_dir or entry.size is None else entry.size)
+        self.child_order.setdefault(parent_item, []).append(item_id)
+        self.name_index.add(item_id, entry.name)
+
+        # Subdirectories are populated when first opened
+        if entry.children == 'children':
+            self.add_placeholder(item_id)
+            if expand:
+                self.tree.item(item_id, open=True)
+                self.load_children(item_id, expand=expand - 1)
+        elif entry.children == 'denied':
+            # Add a placeholder for permission denied directories
+            self.tree.insert(item_id, tk.END,
+                             text="🔒 Permission Denied",
+                             values=("", ""),
+                             tags=('disabled',))
+
+        # Rows picked by a smart selection before their directory was loaded
+        if self.reveal_paths and entry.rel_path in self.reveal_paths:
+            self.reveal_paths.discard(entry.rel_path)
+            if entry.is_dir:
+                self.tree.item(item_id, open=True)
+                self.load_children(item_id)
+            else:
+                self.set_checked(item_id, True)
+
+        return item_id
+
+    def tracked_text(self, entry: ScanEntry) -> str:
+        """Git column of a row: whether git tracks the file, or files inside the directory"""
+        if self.git_index is None or not self.git_index.is_tracked(entry.rel_path):
+            return ""
+        return "has tracked" if entry.is_dir else "tracked"
+
+    @staticmethod
+    def entry_size_text(entry: ScanEntry) -> str:
+        """Get the size column text for a scanned entry"""
+        if entry.is_dir:
+            return "Folder"
+        if entry.size is None:
+            return "Unknown"
+        return format_size(entry.size)
+
+    def add_placeholder(self, item_id: str):
+        """Give an unloaded directory a dummy child so it shows an expand indicator"""
+        self.tree.insert(item_id, tk.END, text="Loading...", values=("", ""),
+                         tags=('placeholder',))
+        self.unloaded_dirs.add(item_id)
+
+    def clear_placeholder(self, item_id: str):
+        """Remove the "Loading..." child of a directory whose scan results arrived"""
+        if item_id in self.loading_dirs:
+            self.loading_dirs.discard(item_id)
+            self.tree.delete(*self.tree.get_children(item_id))
+
+    def sync_entries(self, parent_item: str, entries: List[ScanEntry]):
+        """Bring the loaded children of a directory in line with a fresh listing
+
+        Rows that disappeared or became ignored are removed, new or re-included
+        ones are inserted and the rest only get their size refreshed, so checks,
+        expansion and scroll position survive.
+        """
+        if parent_item and (parent_item not in self.nodes or parent_item in self.unloaded_dirs
+                            or parent_item in self.loading_dirs):
+            return
+
+        current = {self.nodes.name(c): c for c in self.child_order.get(parent_item, ())}
+        removed, inserted, order = [], [], []
+        for entry in entries:
+            item_id = current.pop(entry.name, None)
+            if item_id is not None and self.nodes.is_dir(item_id) != entry.is_dir:
+                removed.append(item_id)
+                item_id = None
+
+            if item_id is None:
+                item_id = self.insert_entry(parent_item, entry)
+                inserted.append(item_id)
+            else:
+                self.update_entry(item_id, entry)
+            order.append(item_id)
+
+        removed.extend(current.values())
+        if not removed and not inserted:
+            return
+
+        self.remove_items(removed)
+        self.child_order[parent_item] = order
+        self.tree.set_children(parent_item, *[item_id for item_id in order if item_id not in self.detached])
+        if self.filter_text:
+            self.filter_new_items(inserted)
+
+    def update_entry(self, item_id: str, entry: ScanEntry):
+        """Refresh an existing row from a new listing of its directory"""
+        if not entry.is_dir:
+            self.nodes.set_size(item_id, -1 if entry.size is None else entry.size)
+            self.tree.set(item_id, 'size', self.entry_size_text(entry))
+        elif self.nodes.path(item_id) not in self.dir_items:
+            # Not loaded yet: only the expand indicator can be stale
+            has_placeholder = item_id in self.unloaded_dirs
+            if entry.children == 'children' and not has_placeholder and item_id not in self.loading_dirs:
+                self.tree.delete(*self.tree.get_children(item_id))
+                self.add_placeholder(item_id)
+            elif entry.children != 'children' and has_placeholder:
+                self.unloaded_dirs.discard(item_id)
+                self.tree.delete(*self.tree.get_children(item_id))
+
+    def remove_items(self, item_ids: List[str]):
+        """Delete rows together with everything loaded below them"""
+        if not item_ids:
+            return
+
+        roots = set(item_ids)
+        parents = {self.nodes.parent(item_id) for item_id in item_ids}
+        doomed = []
+        stack = list(item_ids)
+        while stack:
+            item_id = stack.pop()
+            doomed.append(item_id)
+            stack.extend(self.child_order.pop(item_id, ()))
+
+        # Attached descendants go with their row, detached ones must be deleted explicitly
+        self.tree.delete(*[item_id for item_id in doomed if item_id in roots or item_id in self.detached])
+
+        # Paths are rebuilt from parents, so look them up before any node is freed
+        for item_id in doomed:
+            if self.nodes.is_dir(item_id):
+                rel_path = self.nodes.path(item_id)
+                if self.dir_items.get(rel_path) == item_id:
+                    del self.dir_items[rel_path]
+                    if self.watcher is not None:
+                        self.watcher.unwatch(rel_path)
+
+        for item_id in doomed:
+            self.nodes.remove(item_id)
+            self.unloaded_dirs.discard(item_id)
+            self.loading_dirs.discard(item_id)
+            self.detached.discard(item_id)
+            self.name_index.remove(item_id)
+            if self.filter_matches is not None:
+                self.filter_matches.discard(item_id)
+
+        for parent in parents:
+            if parent in self.child_order:
+                self.child_order[parent] = [c for c in self.child_order[parent] if c not in roots]
+        self.update_selection_count()
+
+    def schedule_scan_results(self, delay: Optional[int] = None):
+        """Make sure the main loop will drain the scan result queue"""
+        if self.scan_poll_id is None:
+            self.scan_poll_id = self.root.after(self.SCAN_POLL_MS if delay is None else delay,
+                                                self.process_scan_results)
+
+    def process_scan_results(self):
+        """Insert queued scan results in bounded batches so the UI stays responsive"""
+        self.scan_poll_id = None
+        budget = self.SCAN_BATCH_SIZE
+        resort = set()  # Parents whose children need sorting again
+
+        while budget > 0:
+            try:
+                generation, kind, parent_item, payload, expand = self.scan_results.get_nowait()
+            except queue.Empty:
+                break
+
+            if generation != self.scan_generation:
+                continue  # Result of a cancelled or superseded scan
+
+            if kind == 'entries':
+                self.insert_entries(parent_item, payload, expand)
+                budget -= len(payload)
+            elif kind == 'sync':
+                self.sync_entries(parent_item, payload)
+                budget -= len(payload)
+            elif kind == 'error':
+                self.scan_errors.append(payload)
+            elif kind == 'size':
+                self.pending_sizes -= 1
+                if self.show_size(parent_item, payload) and self.sort_by_size:
+                    resort.add(self.nodes.parent(parent_item))
+                budget -= 1
+            elif kind == 'done':
+                self.clear_placeholder(parent_item)
+                self.pending_scans -= 1
+                if parent_item and parent_item not in self.nodes:
+                    continue  # Removed by a sync of its parent in the meantime
+                if payload == 'load':
+                    self.watch_directory(parent_item)
+                else:
+                    self.invalidate_sizes(parent_item)
+                self.queue_sizes([c for c in self.child_order.get(parent_item, ()) if self.nodes.is_dir(c)])
+                if self.sort_by_size:
+                    resort.add(parent_item)
+                if self.filter_text:
+                    self.hide_unmatched_dirs(parent_item)
+
+        for parent_item in resort:
+            self.sort_children(parent_item)
+
+        if self.pending_scans > 0:
+            self.status_var.set(f"Scanning... {len(self.nodes)} items loaded, "
+                                f"{self.pending_scans} directories pending")
+            self.schedule_scan_results(1 if budget <= 0 else None)
+        else:
+            status = f"Loaded {len(self.nodes)} items"
+            if self.scan_errors:
+                status += f" ({self.scan_errors[-1]})"
+            if self.ignore_cache.errors:
+                # Such files count as having no rules
+                ignore_file, error = next(iter(self.ignore_cache.errors.items()))
+                status += f" (could not read {ignore_file}: {error})"
+            if self.refresh_started is not None:
+                if STATS.enabled:
+                    STATS.add_time('refresh_tree', time.perf_counter() - self.refresh_started)
+                self.refresh_started = None
+            if STATS.enabled:
+                status += f" | {STATS.summary()}"
+            if self.pending_sizes > 0:
+                # Sizes keep arriving after the scan itself is done
+                status += f", sizing {self.pending_sizes} directories"
+                self.schedule_scan_results(1 if budget <= 0 else None)
+            self.status_var.set(status)
+            self.update_selection_count()
+
+    def watch_directory(self, item_id: str):
+        """Track a directory whose children are loaded so later changes can be applied in place"""
+        if item_id and item_id not in self.nodes:
+            return
+        rel_path = self.nodes.path(item_id) if item_id else ""
+        self.dir_items[rel_path] = item_id
+        if self.watcher is not None:
+            self.watcher.watch(rel_path)
+
+    def process_watch_events(self):
+        """Apply filesystem changes reported by the watcher to the loaded directories"""
+        self.watch_poll_id = self.root.after(self.WATCH_POLL_MS, self.process_watch_events)
+        if self.watcher is None:
+            return
+
+        changed, rule_dirs = set(), set()
+        while True:
+            try:
+                kind, directory = self.watcher.events.get_nowait()
+            except queue.Empty:
+                break
+            (rule_dirs if kind == 'rules' else changed).add(directory)
+        if changed or rule_dirs:
+            self.invalidate_index()
+
+        if rule_dirs:
+            self.apply_rule_changes(rule_dirs, skip=changed)
+        for directory in changed:
+            self.sync_directory(directory, 'sync')
+
+    def apply_rule_changes(self, rule_dirs: Set[str], skip: Set[str] = frozenset()):
+        """Re-evaluate loaded directories below ignore files that changed"""
+        self.scan_walker.listings.clear()  # Read ahead with the old rules
+        self.invalidate_index()
+        for directory in rule_dirs:
+            self.ignore_matcher.invalidate(directory)
+            self.size_jobs.put((self.scan_generation, self.dir_totals, 'invalidate-tree', None, directory, None))
+        for rel_path in list(self.dir_items):
+            if rel_path not in skip and any(rel_path.startswith(d) for d in rule_dirs):
+                self.sync_directory(rel_path, 'rules')
+
+    def sync_directory(self, rel_path: str, mode: str):
+        """Queue a loaded directory for an incremental update"""
+        item_id = self.dir_items.get(rel_path)
+        if item_id is None:
+            return  # Not loaded, it will be read fresh when expanded
+        directory = self.nodes.full_path(item_id) if item_id else Path(self.scan_root)
+        self.populate_tree(item_id, directory, rel_path, mode=mode)
+
+    def cancel_scan(self):
+        """Abort the running scan; directories still loading can be expanded again later"""
+        self.scan_generation += 1
+        if self.scan_poll_id is not None:
+            self.root.after_cancel(self.scan_poll_id)
+            self.scan_poll_id = None
+
+        was_scanning = self.pending_scans > 0
+        self.pending_scans = 0
+        self.pending_sizes = 0
+        self.refresh_started = None
+        for item_id in self.loading_dirs:
+            if self.tree.exists(item_id):
+                self.unloaded_dirs.add(item_id)
+        self.loading_dirs.clear()
+        self.reveal_paths.clear()
+        self.cancel_tree_walk()
+        if self.export_cancel is not None:
+            self.export_cancel.set()
+        if self.index_progress is not None:
+            self.index_waiters.clear()
+            self.invalidate_index()
+            self.status_var.set("Indexing cancelled")
+
+        if was_scanning:
+            self.status_var.set(f"Scan cancelled, {len(self.nodes)} items loaded")
+            self.update_selection_count()
+
+    def queue_sizes(self, item_ids: List[str]):
+        """Have the size thread fill in the recursive size of directory rows"""
+        if self.size_thread is None:
+            self.size_thread = threading.Thread(target=self.size_worker, daemon=True)
+            self.size_thread.start()
+
+        for item_id in item_ids:
+            self.pending_sizes += 1
+            self.size_jobs.put((self.scan_generation, self.dir_totals, 'size', item_id,
+                                self.nodes.path(item_id), str(self.nodes.full_path(item_id))))
+        if item_ids:
+            self.schedule_scan_results()
+
+    def invalidate_sizes(self, item_id: str):
+        """Recompute the sizes of a directory that changed and of its ancestors"""
+        rel_path = self.nodes.path(item_id) if item_id else ""
+        self.size_jobs.put((self.scan_generation, self.dir_totals, 'invalidate', None, rel_path, None))
+        ancestors = []
+        while item_id:
+            ancestors.append(item_id)
+            item_id = self.nodes.parent(item_id)
+        self.queue_sizes(ancestors)
+
+    def size_worker(self):
+        """Background thread: sum up directories, sharing subtotals between jobs"""
+        while True:
+            generation, totals, action, item_id, rel_path, path = self.size_jobs.get()
+            if generation != self.scan_generation:
+                continue  # Sizes of a cancelled or superseded scan
+
+            if action != 'size':
+                totals.invalidate(rel_path, subtree=action == 'invalidate-tree')
+                continue
+            try:
+                total = totals.compute(path, rel_path)
+            except OSError:
+                total = None
+            self.scan_results.put((generation, 'size', item_id, total, False))
+
+    def show_size(self, item_id: str, total: Optional[Tuple[int, int]]) -> bool:
+        """Show the (bytes, files) total of a directory row; returns False if the row is gone"""
+        if item_id not in self.nodes:
+            return False
+        if total is None:
+            self.tree.set(item_id, 'size', "Unknown")
+            return True
+
+        size, files = total
+        self.nodes.set_size(item_id, size)
+        self.tree.set(item_id, 'type', f"Folder, {files:,} file{'' if files == 1 else 's'}")
+        self.tree.set(item_id, 'size', format_size(size))
+        return True
+
+    def set_sort(self, by_size: bool):
+        """Order siblings by size (largest first) or by name, directories first"""
+        self.sort_by_size = by_size
+        self.tree.heading('size', text='Size ▼' if by_size else 'Size')
+        for parent_item in list(self.child_order):
+            self.sort_children(parent_item)
+
+    def sort_children(self, parent_item: str):
+        """Reorder the loaded children of a row by the current sort"""
+        children = self.child_order.get(parent_item)
+        if not children or parent_item in self.loading_dirs or (parent_item and parent_item not in self.nodes):
+            return
+
+        nodes = self.nodes
+        if self.sort_by_size:
+            order = sorted(children, key=lambda c: (-nodes.size(c), nodes.name(c).lower()))
+        else:
+            order = sorted(children, key=lambda c: (not nodes.is_dir(c), nodes.name(c).lower()))
+        if order != children:
+            self.child_order[parent_item] = order
+            self.tree.set_children(parent_item, *[c for c in order if c not in self.detached])
+
+    def on_directory_changed(self, *args):
+        """Abort a scan that no longer matches the working directory"""
+        if self.pending_scans > 0 and self.directory.get() != self.scan_root:
+            self.cancel_scan()
+
+    def load_children(self, item_id: str, expand: int = 0):
+        """Start loading the real children of a directory item in place of its placeholder"""
+        if item_id not in self.unloaded_dirs:
+            return
+
+        self.unloaded_dirs.discard(item_id)
+        self.loading_dirs.add(item_id)
+
+        self.populate_tree(item_id, self.nodes.full_path(item_id), self.nodes.path(item_id), expand)
+
+    def on_tree_open(self, event):
+        """Populate a directory the first time it is expanded"""
+        item = self.tree.focus()
+        if item:
+            self.load_children(item)
+
+    def refresh_tree(self):
+        """Refresh the entire tree"""
+        # Abort any scan still running for the previous tree
+        self.cancel_scan()
+        self.status_var.set("Refreshing tree...")
+        self.refresh_started = time.perf_counter()
+
+        # Clear existing tree, including rows detached by the filter
+        for item in self.tree.get_children():
+            self.tree.delete(item)
+        if self.detached:
+            self.tree.delete(*self.detached)
+        self.nodes.clear()
+        self.child_order.clear()
+        self.unloaded_dirs.clear()
+        self.dir_items.clear()
+        self.scan_errors = []
+        self.invalidate_index()
+        self.sniff_cache.clear()
+        self.reveal_paths.clear()
+
+        # Keep the active filter; it is applied to rows as they arrive
+        self.name_index.clear()
+        self.detached.clear()
+        self.filter_matches = set() if self.filter_text else None
+
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+
+        # Get directory
+        directory = Path(self.directory.get())
+        if not directory.exists():
+            self.status_var.set("Directory does not exist")
+            return
+
+        # Populate tree
+        self.scan_root = self.directory.get()
+        self.nodes.root = self.scan_root
+        self.ignore_matcher = IgnoreMatcher(directory, self.ignore_cache)
+        try:
+            self.git_index = GitIndex.load(directory)
+        except (OSError, ValueError) as e:
+            self.git_index = None
+            self.scan_errors.append(f"Could not read git index: {e}")
+        cache = self.scan_cache if self.use_cache_var.get() else None
+        self.scan_walker = DirectoryWalker(self.ignore_matcher, cache)
+        self.dir_totals = DirectoryTotals(DirectoryWalker(self.ignore_matcher, cache))
+        if self.watch_var.get():
+            self.watcher = DirectoryWatcher(directory)
+            if self.watch_poll_id is None:
+                self.watch_poll_id = self.root.after(self.WATCH_POLL_MS, self.process_watch_events)
+        self.populate_tree("", directory)
+        self.update_selection_count()
+
+    def on_tree_click(self, event):
+        """Handle tree item clicks"""
+        item = self.tree.identify('item', event.x, event.y)
+        if item and item in self.nodes:
+            # Check if click was on the checkbox area (approximate)
+            region = self.tree.identify_region(event.x, event.y)
+            if region == "tree":
+                self.toggle_item(item)
+
+    def on_tree_space(self, event):
+        """Handle spacebar press on tree items"""
+        selection = self.tree.selection()
+        if selection:
+            for item in selection:
+                if item in self.nodes:
+                    self.toggle_item(item)
+
+    def toggle_item(self, item_id):
+        """Toggle the checked state of an item"""
+        if item_id not in self.nodes:
+            return
+
+        self.set_checked(item_id, not self.nodes.is_checked(item_id))
+        self.update_selection_count()
+
+    def set_checked(self, item_id: str, checked: bool):
+        """Set the checked state of an item and keep the running count in step"""
+        if self.nodes.set_checked(item_id, checked):
+            self.show_checked(item_id)
+
+    def show_checked(self, item_id: str):
+        """Update the check box of a row from the stored data, in a single Tk call"""
+        is_dir, checked = self.nodes.is_dir(item_id), self.nodes.is_checked(item_id)
+        icon = "📁" if is_dir else "📄"
+        box = '☑' if checked else '☐'
+        tags = ('directory' if is_dir else 'file', 'checked' if checked else 'unchecked')
+        self.tree.item(item_id, text=f"{box} {icon} {self.nodes.name(item_id)}", tags=tags)
+
+    def set_checked_by_type(self, files: bool, dirs: bool):
+        """Check all files and/or directories and uncheck the rest, redrawing only rows that changed"""
+        for item_id in self.nodes.set_checked_by_type(files, dirs):
+            self.show_checked(item_id)
+        self.update_selection_count()
+
+    def check_all(self):
+        """Check all items"""
+        self.set_checked_by_type(True, True)
+
+    def uncheck_all(self):
+        """Uncheck all items"""
+        self.set_checked_by_type(False, False)
+
+    def check_files_only(self):
+        """Check only files"""
+        self.set_checked_by_type(True, False)
+
+    def check_dirs_only(self):
+        """Check only directories"""
+        self.set_checked_by_type(False, True)
+
+    def query_files(self, index: FileIndex, query: str, value: str) -> Tuple[List[str], str]:
+        """Run a smart selection query; returns the matching file paths and a description of the query
+
+        Reads file contents for "Binary files", so it runs on a worker thread.
+        Raises ValueError for a value the query cannot use.
+        """
+        if query == "Larger than":
+            size = parse_size(value)
+            return index.larger_than(size), f"larger than {format_size(size)}"
+        if query == "Extension":
+            extensions = [extension for extension in re.split(r'[\s,;]+', value) if extension.strip('*.')]
+            if not extensions:
+                raise ValueError("Enter one or more extensions, e.g. \"log, tmp\"")
+            return index.with_extensions(extensions), "with extension " + ", ".join(extensions)
+        if query == "Binary files":
+            return index.binaries(self.sniff_cache), "that look binary"
+        try:
+            days = float(value)
+        except ValueError:
+            raise ValueError(f"Not a number of days: {value!r}") from None
+        return index.older_than(time.time_ns() - int(days * 86400e9)), f"older than {value} days"
+
+    def smart_select(self):
+        """Check every file matching the smart selection query, on top of the current selection"""
+        query, value = self.smart_query_var.get(), self.smart_value_var.get().strip()
+        self.with_scan_index(lambda: self.run_file_query(query, value))
+
+    def run_file_query(self, query: str, value: str):
+        """Run a smart selection query on a worker thread and check what it finds"""
+        index, generation = self.file_index, self.index_generation
+        results = queue.Queue()
+
+        def run():
+            # Background thread: must not touch Tk
+            try:
+                results.put((self.query_files(index, query, value), None))
+            except Exception as e:
+                results.put((None, e))
+
+        def poll():
+            try:
+                found, error = results.get_nowait()
+            except queue.Empty:
+                self.root.after(self.INDEX_POLL_MS, poll)
+                return
+            if generation != self.index_generation:
+                self.status_var.set("Smart selection dropped: the tree changed while it ran")
+                return
+            if isinstance(error, ValueError):
+                messagebox.showerror("Smart Selection", str(error))
+                self.status_var.set("Ready")
+                return
+            if error is not None:
+                messagebox.showerror("Error", f"Error selecting files: {error}")
+                self.status_var.set("Ready")
+                return
+
+            paths, description = found
+            checked, pending = self.check_paths(paths)
+            status = f"{len(paths)} files {description}: {checked} newly checked"
+            if pending:
+                status += f", {pending} more as their directories load"
+            self.status_var.set(status)
+
+        self.status_var.set("Selecting files...")
+        threading.Thread(target=run, daemon=True).start()
+        poll()
+
+    def check_paths(self, paths: List[str]) -> Tuple[int, int]:
+        """Check files by relative path and reveal them; returns (rows checked now, rows still loading)
+
+        Loaded rows are checked in one bulk update. For the others the
+        directories leading to them are loaded and opened, and insert_entry
+        checks them as they arrive.
+        """
+        loaded, pending, to_load = [], set(), set()
+        names = {}  # Loaded directory item -> {child name: item ID}
+
+        def child_item(dir_path: str, name: str) -> Optional[str]:
+            parent_item = self.dir_items[dir_path]
+            children = names.get(parent_item)
+            if children is None:
+                children = names[parent_item] = {self.nodes.name(c): c for c in self.child_order.get(parent_item, ())}
+            return children.get(name)
+
+        for path in paths:
+            dir_path = path[:path.rfind('/') + 1]
+            if dir_path in self.dir_items:
+                item_id = child_item(dir_path, path[len(dir_path):])
+                if item_id is not None:
+                    loaded.append(item_id)
+                continue
+
+            # Reveal the path from the deepest directory that is loaded
+            pending.add(path)
+            while dir_path and dir_path not in self.dir_items:
+                parent_path = dir_path[:dir_path.rstrip('/').rfind('/') + 1]
+                if parent_path in self.dir_items:
+                    item_id = child_item(parent_path, dir_path[len(parent_path):-1])
+                    if item_id is not None:
+                        to_load.add(item_id)
+                else:
+                    pending.add(dir_path)  # Its row is not there yet either
+                dir_path = parent_path
+
+        changed = self.nodes.set_checked_items(loaded, True)
+        for item_id in changed:
+            self.show_checked(item_id)
+
+        # Open the directories holding the matches so they can be seen
+        opened = set()
+        for item_id in loaded + list(to_load):
+            parent = self.nodes.parent(item_id)
+            while parent and parent not in opened:
+                opened.add(parent)
+                self.tree.item(parent, open=True)
+                parent = self.nodes.parent(parent)
+
+        self.reveal_paths |= pending
+        for item_id in to_load:
+            self.tree.item(item_id, open=True)
+            self.load_children(item_id)
+        self.update_selection_count()
+        return len(changed), len([path for path in pending if not path.endswith('/')])
+
+    def expand_all(self):
+        """Expand all tree items, loading directories that were not read yet"""
+        self.start_tree_walk(True, self.UNLIMITED_DEPTH)
+
+    def expand_to_depth(self):
+        """Expand directories down to the depth in the depth box, top-level rows being depth 1"""
+        try:
+            depth = self.expand_depth_var.get()
+        except (tk.TclError, ValueError):
+            depth = 0
+        if depth < 1:
+            messagebox.showerror("Invalid Depth", "The depth must be a whole number of at least 1.")
+            return
+        self.start_tree_walk(True, depth)
+
+    def expand_matches(self):
+        """Open just the directories leading to loaded rows that match the filter"""
+        if self.filter_matches is None:
+            messagebox.showinfo("No Filter", "Type a filter first to expand the directories holding its matches.")
+            return
+        self.start_tree_walk(True, self.UNLIMITED_DEPTH, matches=True)
+
+    def collapse_all(self):
+        """Collapse all tree items"""
+        self.start_tree_walk(False, self.UNLIMITED_DEPTH)
+
+    def start_tree_walk(self, open_rows: bool, depth: int, matches: bool = False):
+        """Start expanding or collapsing in time slices, replacing one still running
+
+        The walk keeps its own stack instead of recursing, so deep trees
+        cannot hit the recursion limit. It only touches rows whose state
+        changes. Unloaded directories that have to be expanded are loaded
+        with the remaining depth, and their rows open as they arrive.
+        """
+        self.cancel_tree_walk()
+        if matches:
+            stack = [(item_id, 0) for item_id in self.filter_matches]
+        else:
+            stack = [(item_id, 1) for item_id in reversed(self.child_order.get('', ()))
+                     if self.nodes.is_dir(item_id)]
+        self.tree_walk = TreeWalk(open_rows, depth, matches, stack)
+        self.step_tree_walk()
+
+    def step_tree_walk(self):
+        """Run one time slice of the expand or collapse in progress"""
+        self.tree_walk_id = None
+        walk = self.tree_walk
+        stack, tree, nodes = walk.stack, self.tree, self.nodes
+        deadline = time.perf_counter() + self.TREE_WALK_SLICE_MS / 1000
+        visited = 0
+
+        while stack:
+            visited += 1
+            if visited % 256 == 0 and time.perf_counter() > deadline:
+                break
+            item_id, depth = stack.pop()
+            if item_id not in nodes:
+                continue  # Removed since it was queued
+
+            if walk.matches:
+                # Walk up from each match, stopping at directories another match already opened
+                parent = nodes.parent(item_id)
+                if parent and parent not in walk.seen:
+                    walk.seen.add(parent)
+                    if not tree.item(parent, 'open'):
+                        tree.item(parent, open=True)
+                        walk.changed += 1
+                    stack.append((parent, 0))
+                continue
+
+            if walk.open_rows and item_id in self.unloaded_dirs:
+                tree.item(item_id, open=True)
+                self.load_children(item_id, expand=walk.depth - depth)
+                walk.changed += 1
+                continue
+            if bool(tree.item(item_id, 'open')) != walk.open_rows:
+                tree.item(item_id, open=walk.open_rows)
+                walk.changed += 1
+            if depth < walk.depth:
+                stack.extend((child, depth + 1) for child in reversed(self.child_order.get(item_id, ()))
+                             if nodes.is_dir(child))
+
+        if stack:
+            action = "Expanding" if walk.open_rows else "Collapsing"
+            self.status_var.set(f"{action}... {walk.changed} directories so far")
+            self.tree_walk_id = self.root.after(1, self.step_tree_walk)
+        else:
+            self.tree_walk = None
+            action = "Expanded" if walk.open_rows else "Collapsed"
+            self.status_var.set(f"{action} {walk.changed} directories")
+
+    def cancel_tree_walk(self):
+        """Stop the expand or collapse in progress, keeping what it did so far"""
+        if self.tree_walk_id is not None:
+            self.root.after_cancel(self.tree_walk_id)
+            self.tree_walk_id = None
+        if self.tree_walk is not None:
+            action = "Expand" if self.tree_walk.open_rows else "Collapse"
+            self.status_var.set(f"{action} stopped after {self.tree_walk.changed} directories")
+            self.tree_walk = None
+
+    def filter_tree(self, *args):
+        """Schedule a filter update once typing pauses"""
+        if self.filter_after_id is not None:
+            self.root.after_cancel(self.filter_after_id)
+        self.filter_after_id = self.root.after(self.FILTER_DELAY_MS, self.apply_filter)
+
+    def apply_filter(self):
+        """Filter tree items based on search text, hiding rows that do not match"""
+        self.filter_after_id = None
+        search_text = self.search_var.get().lower()
+        if search_text == self.filter_text and (self.filter_matches is not None or not search_text):
+            return
+
+        if not search_text:
+            self.filter_text, self.filter_matches = "", None
+            self.set_hidden(set(), set(self.detached))
+            self.status_var.set(f"Loaded {len(self.nodes)} items")
+            return
+
+        # Narrow the previous result when the query only got longer
+        within = None
+        if self.filter_matches is not None and self.filter_text and self.filter_text in search_text:
+            within = self.filter_matches
+        matches = self.name_index.search(search_text, within)
+
+        # Keep matches and their ancestors, expanding the ancestors
+        visible = set(matches)
+        for item_id in matches:
+            parent = self.nodes.parent(item_id)
+            while parent and parent not in visible:
+                visible.add(parent)
+                self.tree.item(parent, open=True)
+                parent = self.nodes.parent(parent)
+
+        # Directories that are not loaded yet may still contain matches
+        for item_id in self.unloaded_dirs | self.loading_dirs:
+            while item_id and item_id not in visible:
+                visible.add(item_id)
+                item_id = self.nodes.parent(item_id)
+
+        hidden = set(self.nodes).difference(visible)
+        self.set_hidden(hidden, self.detached - hidden)
+        self.filter_text, self.filter_matches = search_text, matches
+        self.status_var.set(f"{len(matches)} of {len(self.nodes)} loaded items match \"{search_text}\"")
+
+    def filter_new_items(self, item_ids: List[str]):
+        """Apply the active filter to freshly inserted items"""
+        hide, show = set(), set()
+        for item_id in item_ids:
+            if self.name_index.matches(item_id, self.filter_text):
+                self.filter_matches.add(item_id)
+                parent = self.nodes.parent(item_id)
+                while parent and parent not in show:
+                    show.add(parent)
+                    self.tree.item(parent, open=True)
+                    parent = self.nodes.parent(parent)
+            elif item_id not in self.unloaded_dirs and item_id not in self.loading_dirs:
+                hide.add(item_id)
+        self.set_hidden(hide - show, show)
+
+    def hide_unmatched_dirs(self, item_id: str):
+        """Hide a loaded directory, then its ancestors, once nothing under it matches the filter"""
+        while item_id and item_id not in self.detached:
+            if (item_id in self.filter_matches or item_id in self.unloaded_dirs or item_id in self.loading_dirs
+                    or any(child not in self.detached for child in self.child_order.get(item_id, ()))):
+                break
+            self.set_hidden({item_id}, set())
+            item_id = self.nodes.parent(item_id)
+
+    def set_hidden(self, hide: Set[str], show: Set[str]):
+        """Detach rows in hide and reattach rows in show at their original positions"""
+        hide = hide - self.detached
+        show = show & self.detached
+        if hide:
+            self.tree.detach(*hide)
+            self.detached |= hide
+        if show:
+            self.detached -= show
+            for parent in {self.nodes.parent(item_id) for item_id in show}:
+                position = 0
+                for child in self.child_order.get(parent, ()):
+                    if child in show:
+                        self.tree.move(child, parent, position)
+                    if child not in self.detached:
+                        position += 1
+
+    def clear_filter(self):
+        """Clear the search filter"""
+        self.search_var.set("")
+        self.collapse_all()
+
+    def update_selection_count(self):
+        """Update the selection count display"""
+        self.selection_var.set(f"{self.nodes.checked_count} items selected")
+
+    def get_selected_files(self) -> List[str]:
+        """Get list of selected file paths"""
+        return self.nodes.checked_paths()
+
+    def invalidate_index(self):
+        """Forget the scan index; a build still running is abandoned and restarted for anyone waiting"""
+        self.scan_index = None
+        self.scan_index_complete = False
+        self.file_index = None
+        self.index_generation += 1
+        self.index_progress = None
+        if self.index_waiters:
+            self.start_index()
+
+    def with_scan_index(self, callback):
+        """Run callback once the scan index is ready, building it in the background first if needed
+
+        The index is kept until the tree, its rules or a watched directory
+        change, so previews and adds reuse it.
+        """
+        if self.ignore_matcher is None:
+            return
+        if self.scan_index is not None:
+            callback()
+            return
+        self.index_waiters.append(callback)
+        if self.index_progress is None:
+            self.start_index()
+
+    def start_index(self):
+        """Walk the whole tree (hidden files included) on a background thread
+
+        The same walk yields the file index for smart selection, limited to
+        the files the tree itself can show.
+        """
+        generation = self.index_generation
+        progress = self.index_progress = [0]
+        cache = self.scan_cache if self.use_cache_var.get() else None
+        walker = DirectoryWalker(self.ignore_matcher, cache, show_hidden=True)
+        root = self.scan_root
+
+        def build():
+            # Background thread: must not touch Tk
+            errors, entries = [], []
+            try:
+                for entry in walker.walk(root, "", errors):
+                    if generation != self.index_generation:
+                        return  # Stale or cancelled
+                    entries.append(entry)
+                    progress[0] += 1
+                with STATS.timer('file_index'):
+                    file_index = FileIndex(entry for entry in entries if not any(
+                        part.startswith('.') and part not in DirectoryWalker.VISIBLE_DOTFILES
+                        for part in entry.rel_path.split('/')))
+            except Exception as e:
+                self.index_results.put((generation, None, e))
+                return
+            self.index_results.put((generation, (entries, file_index), errors))
+
+        self.status_var.set("Indexing tree...")
+        threading.Thread(target=build, daemon=True).start()
+        if self.index_poll_id is None:
+            self.index_poll_id = self.root.after(self.INDEX_POLL_MS, self.poll_index)
+
+    def poll_index(self):
+        """Show index build progress, and hand the finished index to whoever waits for it"""
+        self.index_poll_id = None
+        while True:
+            try:
+                generation, entries, errors = self.index_results.get_nowait()
+            except queue.Empty:
+                if self.index_progress is not None:
+                    self.status_var.set(f"Indexing tree... {self.index_progress[0]:,} entries (Cancel to stop)")
+                    self.index_poll_id = self.root.after(self.INDEX_POLL_MS, self.poll_index)
+                return
+            if generation == self.index_generation:
+                break  # Results of abandoned builds are dropped
+
+        self.index_progress = None
+        waiters, self.index_waiters = self.index_waiters, []
+        if entries is None:
+            messagebox.showerror("Error", f"Error indexing the tree: {errors}")
+            self.status_var.set("Indexing failed")
+            return
+
+        entries, self.file_index = entries
+        self.scan_index = entries
+        self.scan_index_complete = not errors
+        self.status_var.set(f"Indexed {len(entries):,} entries")
+        for callback in waiters:
+            callback()
+
+    def get_scan_index(self) -> Optional[List[ScanEntry]]:
+        """Get every visible entry of the tree (hidden files included), or None if it is not built or incomplete"""
+        return self.scan_index if self.scan_index_complete else None
+
+    def get_ignore_patterns(self, selected: List[str]) -> List[str]:
+        """Turn the selected paths into the patterns to write, generalized if enabled
+
+        Generalizing needs the whole tree so the patterns are known to ignore
+        exactly the selected files; if part of it cannot be read, the selected
+        paths are used as they are. Call it once the scan index is ready.
+        """
+        if not self.minimize_var.get():
+            return selected
+        entries = self.get_scan_index()
+        if entries is None:
+            return selected
+        return minimize_patterns(entries, selected)
+
+    def tracked_warning(self, selected: List[str]) -> str:
+        """Warn that .gitignore has no effect on selected files git already tracks"""
+        if self.git_index is None:
+            return ""
+        tracked = [(path, self.git_index.count_tracked(path)) for path in selected]
+        tracked = [(path, count) for path, count in tracked if count]
+        if not tracked:
+            return ""
+
+        total = sum(count for path, count in tracked)
+        lines = [f"# Warning: {total:,} selected file{'' if total == 1 else 's'} already tracked by git; "
+                 f"ignoring does not untrack them (use git rm --cached):\n"]
+        for path, count in tracked[:10]:
+            lines.append(f"#   {path}" + (f" ({count:,} tracked files)" if path.endswith('/') else "") + "\n")
+        if len(tracked) > 10:
+            lines.append(f"#   ... and {len(tracked) - 10:,} more\n")
+        return "".join(lines)
+
+    @staticmethod
+    def format_impact(target: str, patterns: List[str], impacts: Optional[List[PatternImpact]],
+                      existing: FrozenSet[str], total_files: int, total_bytes: int) -> str:
+        """Describe what each pattern does to the visible files when added to one ignore file"""
+        if impacts is None:
+            return "# Impact unknown: part of the tree could not be read\n\n" + "".join(f"{p}\n" for p in patterns)
+
+        hidden_files = hidden_bytes = 0
+        lines = []
+        width = min(48, max((len(pattern) for pattern in patterns), default=0))
+        existing_keys = {pattern_key(line) for line in existing}
+        for pattern, impact in zip(patterns, impacts):
+            if pattern_key(pattern) in existing_keys:
+                note = f"already in {target}"
+            elif impact.files or impact.dirs:
+                hidden_files += impact.files
+                hidden_bytes += impact.bytes
+                note = f"hides {impact.files:,} file{'' if impact.files == 1 else 's'}, {format_size(impact.bytes)}"
+            else:
+                note = "redundant: everything it matches is already ignored or hidden by another pattern"
+            lines.append(f"{pattern:<{width}}  # {note}\n")
+
+        file_share = hidden_files / total_files * 100 if total_files else 0.0
+        byte_share = hidden_bytes / total_bytes * 100 if total_bytes else 0.0
+        header = (f"# Hides {hidden_files:,} of {total_files:,} files ({file_share:.1f}%) and "
+                  f"{format_size(hidden_bytes)} of {format_size(total_bytes)} ({byte_share:.1f}%)\n"
+                  f"# AI digest shrinks to {format_size(total_bytes - hidden_bytes)}\n\n")
+        return header + "".join(lines)
+
+    def preview_changes(self):
+        """Preview what will be added to ignore files"""
+        selected = self.get_selected_files()
+        if not selected:
+            messagebox.showwarning("No Selection", "Please select files to preview.")
+            return
+
+        git_selected = self.gitignore_var.get()
+        ai_selected = self.aidigest_var.get()
+
+        if not git_selected and not ai_selected:
+            messagebox.showwarning("No Target", "Please select at least one ignore file.")
+            return
+
+        self.with_scan_index(lambda: self.show_preview(selected, git_selected, ai_selected))
+
+    def show_preview(self, selected: List[str], git_selected: bool, ai_selected: bool):
+        """Open the preview window once the scan index is ready"""
+        patterns = self.get_ignore_patterns(selected)
+        summary = f"# {len(patterns)} patterns for {len(selected)} selected items\n"
+
+        # Effect of each pattern, from the cached walk rather than a rescan
+        entries = self.get_scan_index()
+        impacts, total_files, total_bytes = None, 0, 0
+        if entries is not None:
+            impacts, total_files, total_bytes = pattern_impact(entries, patterns)
+        directory = Path(self.directory.get())
+
+        # Create preview window
+        preview_window = tk.Toplevel(self.root)
+        preview_window.title("Preview Changes")
+        preview_window.geometry("720x450")
+
+        # Create notebook for tabs
+        notebook = ttk.Notebook(preview_window)
+        notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+        if git_selected:
+            git_frame = ttk.Frame(notebook)
+            notebook.add(git_frame, text=".gitignore")
+
+            git_text = scrolledtext.ScrolledText(git_frame, wrap=tk.WORD)
+            git_text.pack(fill=tk.BOTH, expand=True)
+            git_text.insert(tk.END, "# Patterns to be added to .gitignore:\n")
+            git_text.insert(tk.END, summary)
+            git_text.insert(tk.END, self.tracked_warning(selected))
+            git_text.insert(tk.END, self.format_impact(".gitignore", patterns, impacts,
+                                                       self.get_existing_patterns(directory / ".gitignore"),
+                                                       total_files, total_bytes))
+
+        if ai_selected:
+            ai_frame = ttk.Frame(notebook)
+            notebook.add(ai_frame, text=".aidigestignore")
+
+            ai_text = scrolledtext.ScrolledText(ai_frame, wrap=tk.WORD)
+            ai_text.pack(fill=tk.BOTH, expand=True)
+            ai_text.insert(tk.END, "# Patterns to be added to .aidigestignore:\n")
+            ai_text.insert(tk.END, summary)
+            ai_text.insert(tk.END, self.format_impact(".aidigestignore", patterns, impacts,
+                                                      self.get_existing_patterns(directory / ".aidigestignore"),
+                                                      total_files, total_bytes))
+
+    def add_to_ignore_files(self):
+        """Add selected files to ignore files"""
+        selected = self.get_selected_files()
+        if not selected:
+            messagebox.showwarning("No Selection", "Please select files to add.")
+            return
+
+        git_selected = self.gitignore_var.get()
+        ai_selected = self.aidigest_var.get()
+
+        if not git_selected and not ai_selected:
+            messagebox.showwarning("No Target", "Please select at least one ignore file.")
+            return
+
+        directory = Path(self.directory.get())
+        targets = []
+        if git_selected:
+            targets.append(directory / ".gitignore")
+        if ai_selected:
+            targets.append(directory / ".aidigestignore")
+
+        if self.minimize_var.get():
+            self.with_scan_index(lambda: self.write_ignore_patterns(targets, selected))
+        else:
+            self.write_ignore_patterns(targets, selected)
+
+    def write_ignore_patterns(self, targets: List[Path], selected: List[str]):
+        """Write the patterns for the selected paths to the target ignore files"""
+        # All targets are updated together, or none of them
+        patterns = self.get_ignore_patterns(selected)
+        try:
+            changes = update_ignore_files(targets, patterns, self.ignore_cache)
+        except Exception as e:
+            messagebox.showerror("Error", f"Error updating ignore files, nothing was changed: {e}")
+            return
+
+        messages = []
+        for change in changes:
+            if change.added:
+                messages.append(f"Added {len(change.added)} patterns to {change.path.name}")
+            else:
+                messages.append(f"All patterns already exist in {change.path.name}")
+
+        messagebox.showinfo("Success", "\n".join(messages))
+        self.uncheck_all()
+        self.apply_ignore_changes(changes)
+
+    def apply_ignore_changes(self, changes: List[IgnoreFileChange]):
+        """Drop the rows that patterns just added to the root ignore files exclude
+
+        Added rules can only exclude more, so the loaded rows are re-checked
+        against the updated rules instead of listing every directory again.
+        """
+        if not any(change.added for change in changes) or self.ignore_matcher is None:
+            return
+
+        self.ignore_matcher.invalidate("")
+        self.scan_walker.listings.clear()  # Read ahead with the old rules
+        self.invalidate_index()
+
+        # Top down, so rows below an excluded directory are not checked at all
+        removed = []
+        stack = list(self.child_order.get("", ()))
+        while stack:
+            item_id = stack.pop()
+            if self.ignore_matcher.is_ignored(self.nodes.path(item_id).rstrip('/'), self.nodes.is_dir(item_id)):
+                removed.append(item_id)
+            else:
+                stack.extend(self.child_order.get(item_id, ()))
+        self.remove_items(removed)
+
+        # Any subtree may have lost files to the new rules
+        self.size_jobs.put((self.scan_generation, self.dir_totals, 'invalidate-tree', None, "", None))
+        self.queue_sizes([item_id for item_id in self.nodes if self.nodes.is_dir(item_id)])
+        if self.filter_text:
+            for parent_item in {self.nodes.parent(item_id) for item_id in removed} & set(self.child_order):
+                self.hide_unmatched_dirs(parent_item)
+        self.status_var.set(f"Removed {len(removed)} newly ignored rows, {len(self.nodes)} items loaded")
+
+    def show_stats(self):
+        """Show hot-path counters and phase timings, refreshed while the window is open"""
+        stats_window = tk.Toplevel(self.root)
+        stats_window.title("Scan Statistics")
+        stats_window.geometry("600x520")
+
+        controls = ttk.Frame(stats_window)
+        controls.pack(fill=tk.X, padx=10, pady=(10, 0))
+        stats_text = scrolledtext.ScrolledText(stats_window, wrap=tk.NONE, font=('Courier', 10))
+        stats_text.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+        def render():
+            stats_text.delete(1.0, tk.END)
+            stats_text.insert(tk.END, STATS.report())
+
+        def poll():
+            if stats_window.winfo_exists():
+                render()
+                stats_window.after(1000, poll)
+
+        def reset():
+            STATS.reset()
+            render()
+
+        ttk.Checkbutton(controls, text="Collect stats", variable=self.stats_var,
+                        command=self.toggle_stats).pack(side=tk.LEFT)
+        ttk.Button(controls, text="Reset", command=reset).pack(side=tk.LEFT, padx=(10, 5))
+        ttk.Button(controls, text="Export JSON...", command=self.export_stats).pack(side=tk.LEFT)
+        ttk.Button(controls, text="Close", command=stats_window.destroy).pack(side=tk.RIGHT)
+        poll()
+
+    def toggle_stats(self):
+        """Start or stop collecting hot-path statistics"""
+        STATS.enabled = self.stats_var.get()
+        self.status_var.set("Collecting scan statistics" if STATS.enabled else "Scan statistics off")
+
+    def export_stats(self):
+        """Save the collected statistics as JSON"""
+        path = filedialog.asksaveasfilename(defaultextension=".json", initialfile="ignore-manager-stats.json",
+                                            filetypes=[("JSON", "*.json"), ("All files", "*.*")])
+        if not path:
+            return
+        try:
+            STATS.write(path)
+            self.status_var.set(f"Statistics written to {path}")
+        except OSError as e:
+            messagebox.showerror("Error", f"Error writing statistics: {e}")
+
+    def export_file_list(self):
+        """Write every file left after both ignore files to a manifest, in the background
+
+        A .jsonl target gets path, size and SHA-256 per file, anything else
+        one path per line. The manifest replaces the target only once it is
+        complete; Cancel (or a refresh) stops the export and leaves the target
+        untouched.
+        """
+        if self.ignore_matcher is None:
+            return
+        if self.export_cancel is not None:
+            messagebox.showwarning("Export Running", "An export is already running.")
+            return
+
+        target = filedialog.asksaveasfilename(
+            title="Export File List", defaultextension=".jsonl", initialfile="digest-manifest.jsonl",
+            filetypes=[("JSON lines with sizes and SHA-256", "*.jsonl"), ("Path list", "*.txt"),
+                       ("All files", "*.*")])
+        if not target:
+            return
+
+        fmt = 'jsonl' if target.endswith(('.jsonl', '.json')) else 'paths'
+        algorithm = 'sha256' if fmt == 'jsonl' else None
+        walker = DirectoryWalker(self.ignore_matcher)  # Not the scan cache: its sizes can be out of date
+        cancel = self.export_cancel = threading.Event()
+        progress = [0, 0]  # Files and bytes written so far
+        results = queue.Queue()
+
+        def records(errors):
+            # Counts progress for the status bar and stops the write on Cancel
+            for record in iter_manifest(walker.walk(self.scan_root, "", errors, self.SCAN_WORKERS), algorithm,
+                                        self.HASH_WORKERS, errors):
+                if cancel.is_set():
+                    raise InterruptedError("Export cancelled")
+                progress[0] += 1
+                progress[1] += record[1] or 0
+                yield record
+
+        def export():
+            # Background thread: must not touch Tk
+            errors = []
+            try:
+                results.put((write_manifest_file(Path(target), records(errors), fmt, algorithm), errors))
+            except Exception as e:
+                results.put((None, e))
+
+        def poll():
+            try:
+                counts, errors = results.get_nowait()
+            except queue.Empty:
+                self.status_var.set(f"Exporting... {progress[0]:,} files ({format_size(progress[1])})")
+                self.root.after(self.EXPORT_POLL_MS, poll)
+                return
+
+            self.export_cancel = None
+            if counts is None:
+                if isinstance(errors, InterruptedError):
+                    self.status_var.set("Export cancelled")
+                else:
+                    messagebox.showerror("Error", f"Error exporting file list: {errors}")
+                    self.status_var.set("Export failed")
+                return
+            status = f"Exported {counts[0]:,} files ({format_size(counts[1])}) to {target}"
+            if errors:
+                status += f", {len(errors)} paths could not be read ({errors[-1][0]}: {errors[-1][1]})"
+            self.status_var.set(status)
+
+        self.status_var.set("Exporting...")
+        threading.Thread(target=export, daemon=True).start()
+        poll()
+
+    def view_ignore_files(self):
+        """View contents of ignore files"""
+        directory = Path(self.directory.get())
+        gitignore_path = directory / ".gitignore"
+        aidigest_path = directory / ".aidigestignore"
+
+        # Create viewer window
+        viewer_window = tk.Toplevel(self.root)
+        viewer_window.title("View Ignore Files")
+        viewer_window.geometry("800x550")
+
+        # Create notebook for tabs
+        notebook = ttk.Notebook(viewer_window)
+        notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+        # .gitignore tab
+        git_frame = ttk.Frame(notebook)
+        notebook.add(git_frame, text=".gitignore")
+
+        git_text = scrolledtext.ScrolledText(git_frame, wrap=tk.WORD)
+        git_text.pack(fill=tk.BOTH, expand=True)
+
+        try:
+            content = self.ignore_cache.get_text(gitignore_path)
+            if content is not None:
+                git_text.insert(tk.END, content)
+            else:
+                git_text.insert(tk.END, ".gitignore file does not exist")
+        except Exception as e:
+            git_text.insert(tk.END, f"Error reading .gitignore: {e}")
+
+        # .aidigestignore tab
+        ai_frame = ttk.Frame(notebook)
+        notebook.add(ai_frame, text=".aidigestignore")
+
+        ai_text = scrolledtext.ScrolledText(ai_frame, wrap=tk.WORD)
+        ai_text.pack(fill=tk.BOTH, expand=True)
+
+        try:
+            content = self.ignore_cache.get_text(aidigest_path)
+            if content is not None:
+                ai_text.insert(tk.END, content)
+            else:
+                ai_text.insert(tk.END, ".aidigestignore file does not exist")
+        except Exception as e:
+            ai_text.insert(tk.END, f"Error reading .aidigestignore: {e}")
+
+        # Rule analysis tab
+        rules_frame = ttk.Frame(notebook, padding="5")
+        notebook.add(rules_frame, text="Rule Analysis")
+        self.setup_rule_analysis(rules_frame, directory)
+
+    def setup_rule_analysis(self, frame, directory: Path):
+        """Show what every rule of every ignore file hides, and remove the ones that do nothing"""
+        frame.columnconfigure(0, weight=1)
+        frame.rowconfigure(1, weight=1)
+        summary_var = tk.StringVar(value="Analyzing rules...")
+        ttk.Label(frame, textvariable=summary_var).grid(row=0, column=0, columnspan=2, sticky=tk.W, pady=(0, 5))
+
+        rules_tree = ttk.Treeview(frame, columns=('file', 'line', 'files', 'size', 'status'),
+                                  show='tree headings', selectmode='extended')
+        for column, text, width, anchor in (('#0', "Pattern", 220, tk.W), ('file', "File", 180, tk.W),
+                                            ('line', "Line", 50, tk.E), ('files', "Files", 80, tk.E),
+                                            ('size', "Size", 90, tk.E), ('status', "Status", 80, tk.W)):
+            rules_tree.heading(column, text=text, anchor=anchor)
+            rules_tree.column(column, width=width, anchor=anchor)
+        rules_tree.tag_configure('dead', foreground='gray')
+        rules_tree.tag_configure('shadowed', foreground='darkorange')
+        rules_scroll = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=rules_tree.yview)
+        rules_tree.configure(yscrollcommand=rules_scroll.set)
+        rules_tree.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        rules_scroll.grid(row=1, column=1, sticky=(tk.N, tk.S))
+
+        button_frame = ttk.Frame(frame)
+        button_frame.grid(row=2, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(5, 0))
+        rows = {}  # Treeview item -> RuleStats
+        results = queue.Queue()
+
+        def analyze():
+            # Background thread: a full walk, ignored directories included
+            errors = []
+            try:
+                results.put((rule_statistics(directory, IgnoreFileCache(), errors), errors))
+            except Exception as e:
+                results.put((None, e))
+
+        def show(stats: List[RuleStats], errors):
+            rules_tree.delete(*rules_tree.get_children())
+            rows.clear()
+            for entry in stats:
+                source = Path(entry.rule.source)
+                try:
+                    source_name = source.relative_to(directory).as_posix()
+                except ValueError:
+                    source_name = str(source)
+                item_id = rules_tree.insert('', tk.END, text=entry.rule.pattern, tags=(entry.status,),
+                                            values=(source_name, entry.rule.line_no, f"{entry.files:,}",
+                                                    format_size(entry.bytes), entry.status))
+                rows[item_id] = entry
+
+            counts = {status: sum(1 for entry in stats if entry.status == status)
+                      for status in ('used', 'shadowed', 'dead')}
+            summary = (f"{len(stats)} rules: {counts['used']} used, {counts['shadowed']} shadowed "
+                       f"(other rules already cover them), {counts['dead']} dead (match nothing); "
+                       f"{sum(entry.files for entry in stats):,} files, "
+                       f"{format_size(sum(entry.bytes for entry in stats))} ignored")
+            if errors:
+                summary += f" ({len(errors)} directories could not be read)"
+            summary_var.set(summary)
+
+        def poll():
+            if not frame.winfo_exists():
+                return
+            try:
+                stats, errors = results.get_nowait()
+            except queue.Empty:
+                frame.after(100, poll)
+                return
+            if stats is None:
+                summary_var.set(f"Error analyzing rules: {errors}")
+            else:
+                show(stats, errors)
+
+        def start():
+            summary_var.set("Analyzing rules...")
+            threading.Thread(target=analyze, daemon=True).start()
+            poll()
+
+        def select_unused():
+            # Only dead rules: shadowed ones may cover for each other, like two copies of one line
+            rules_tree.selection_set(*[item_id for item_id, entry in rows.items() if entry.status == 'dead'])
+
+        def remove_selected():
+            chosen = [rows[item_id] for item_id in rules_tree.selection() if item_id in rows]
+            if not chosen:
+                messagebox.showwarning("No Selection", "Please select rules to remove.")
+                return
+            used = sum(1 for entry in chosen if entry.status == 'used')
+            shadowed = sum(1 for entry in chosen if entry.status == 'shadowed')
+            question = f"Remove {len(chosen)} rules from their ignore files?"
+            if used:
+                question += f"\n\n{used} of them are in use; files they ignore will show up again."
+            if shadowed > 1:
+                question += (f"\n\n{shadowed} of them are shadowed; each is covered by other rules, "
+                             f"which may be among those removed.")
+            if not messagebox.askyesno("Remove Rules", question):
+                return
+
+            removals = {}
+            for entry in chosen:
+                removals.setdefault(Path(entry.rule.source), {})[entry.rule.line_no] = entry.rule.pattern
+            try:
+                changes = remove_ignore_lines(removals, self.ignore_cache)
+            except Exception as e:
+                messagebox.showerror("Error", f"Error removing rules, nothing was changed: {e}")
+                return
+
+            self.status_var.set(f"Removed {sum(len(change.removed) for change in changes)} rules")
+            if self.ignore_matcher is not None and self.scan_root is not None:
+                rule_dirs = set()
+                for change in changes:
+                    try:
+                        rel_dir = Path(change.path).parent.relative_to(self.scan_root).as_posix()
+                    except ValueError:
+                        continue
+                    rule_dirs.add("" if rel_dir in ('.', '.git/info') else rel_dir + '/')
+                self.apply_rule_changes(rule_dirs)
+            start()
+
+        ttk.Button(button_frame, text="Select Unused", command=select_unused).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(button_frame, text="Remove Selected Rules", command=remove_selected).pack(side=tk.LEFT,
+                                                                                           padx=(0, 5))
+        ttk.Button(button_frame, text="Analyze Again", command=start).pack(side=tk.LEFT)
+        start()
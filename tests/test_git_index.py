@@ -0,0 +1,104 @@
+"""GitIndex.parse on synthetic and real index files, whole and truncated"""
+
+import os
+import shutil
+import struct
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+from typing import List
+
+from ignore_core import GitIndex
+
+
+def build_index(paths: List[str], version: int = 2, hash_size: int = 20) -> bytes:
+    """Index data with one entry per path, in the order given, without extensions or trailing checksum"""
+    data = [struct.pack('>4sII', b'DIRC', version, len(paths))]
+    previous = b''
+    for path in paths:
+        name = path.encode('utf-8')
+        fixed = bytes(40) + bytes(hash_size) + struct.pack('>H', min(len(name), 0xfff))
+        if version == 4:
+            # Bytes to drop from the previous name as a varint, then the new suffix
+            common = len(os.path.commonprefix([previous, name]))
+            strip = len(previous) - common
+            varint = [strip & 0x7f]
+            strip >>= 7
+            while strip:
+                strip -= 1
+                varint.insert(0, 0x80 | (strip & 0x7f))
+                strip >>= 7
+            data.append(fixed + bytes(varint) + name[common:] + b'\0')
+        else:
+            entry = fixed + name
+            data.append(entry + bytes(8 - len(entry) % 8))  # One to eight NULs
+        previous = name
+    return b''.join(data)
+
+
+class ParseTest(unittest.TestCase):
+    PATHS = ["README.md", "src/a.py", "src/b.py", "src/sub/c.py", "zeta/" + "long" * 40 + ".txt"]
+
+    def test_versions(self):
+        for version in (2, 3, 4):
+            for hash_size in (20, 32):
+                data = build_index(self.PATHS, version, hash_size)
+                self.assertEqual(GitIndex.parse(data, hash_size), self.PATHS, (version, hash_size))
+
+    def test_prefix_is_stripped(self):
+        self.assertEqual(GitIndex.parse(build_index(self.PATHS), 20, "src/"), ["a.py", "b.py", "sub/c.py"])
+
+    def test_conflict_stages_are_listed_once(self):
+        self.assertEqual(GitIndex.parse(build_index(["a", "b", "b", "b", "c"]), 20), ["a", "b", "c"])
+
+    def test_unsupported(self):
+        with self.assertRaises(ValueError):
+            GitIndex.parse(b'XXXX' + bytes(8), 20)
+        with self.assertRaises(ValueError):
+            GitIndex.parse(struct.pack('>4sII', b'DIRC', 5, 0), 20)
+
+    def test_truncated(self):
+        for version in (2, 3, 4):
+            data = build_index(self.PATHS, version)
+            for length in range(len(data)):
+                with self.assertRaises(ValueError, msg=(version, length)):
+                    GitIndex.parse(data[:length], 20)
+
+    def test_tracked_queries(self):
+        index = GitIndex(GitIndex.parse(build_index(self.PATHS), 20), (0, 0))
+        self.assertTrue(index.is_tracked("src/a.py"))
+        self.assertFalse(index.is_tracked("src/x.py"))
+        self.assertTrue(index.is_tracked("src/"))
+        self.assertEqual(index.count_tracked("src/"), 3)
+        self.assertFalse(index.is_tracked("sr/"))
+
+
+@unittest.skipUnless(shutil.which('git'), "git is not installed")
+class RealIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp(prefix='ignore-git-index-'))
+        self.addCleanup(shutil.rmtree, self.root, True)
+        subprocess.run(['git', 'init', '-q', str(self.root)], check=True)
+        self.paths = ["a.txt", "dir/b.txt", "dir/sub/c.txt", "été.txt"]
+        for rel_path in self.paths:
+            (self.root / rel_path).parent.mkdir(parents=True, exist_ok=True)
+            (self.root / rel_path).write_text(rel_path, encoding='utf-8')
+        subprocess.run(['git', 'add', '.'], cwd=self.root, check=True)
+
+    def test_every_index_version(self):
+        for version in (2, 3, 4):
+            subprocess.run(['git', 'update-index', '--index-version', str(version)], cwd=self.root, check=True)
+            index = GitIndex.load(self.root)
+            self.assertEqual(index.paths, sorted(self.paths), version)
+            self.assertEqual(GitIndex.load(self.root / "dir").paths, ["b.txt", "sub/c.txt"])
+
+    def test_truncated_file(self):
+        index_file = self.root / ".git" / "index"
+        index_file.write_bytes(index_file.read_bytes()[:70])
+        with self.assertRaises(ValueError):
+            GitIndex.load(self.root)
+
+
+if __name__ == '__main__':
+    unittest.main()
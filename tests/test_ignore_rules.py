@@ -0,0 +1,216 @@
+"""Gitignore semantics of the rule parser, IgnoreRuleSet and IgnoreMatcher"""
+
+import os
+import random
+import shutil
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+from typing import Dict, List, Set
+
+from ignore_core import (IgnoreFileCache, IgnoreMatcher, IgnoreRuleSet, DirectoryWalker, parse_ignore_line,
+                         rule_statistics)
+
+
+def write_files(root: Path, files: Dict[str, str]):
+    """Create files below root from relative path -> text; a path ending in "/" is an empty directory"""
+    for rel_path, text in files.items():
+        path = root / rel_path
+        if rel_path.endswith('/'):
+            path.mkdir(parents=True, exist_ok=True)
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(text, encoding='utf-8')
+
+
+def visible_files(root: Path) -> Set[str]:
+    """Files the walker keeps, hidden ones included"""
+    walker = DirectoryWalker(IgnoreMatcher(root, IgnoreFileCache()), show_hidden=True)
+    return {entry.rel_path for entry in walker.walk(str(root)) if not entry.is_dir}
+
+
+class ParseTest(unittest.TestCase):
+    def test_blank_and_comment_lines(self):
+        for line in ("", "   ", "# comment", "/", "!"):
+            self.assertIsNone(parse_ignore_line(line), line)
+
+    def test_flags(self):
+        rule = parse_ignore_line("!/src/gen/\n")
+        self.assertEqual((rule.negated, rule.dir_only, rule.anchored, rule.body), (True, True, True, "src/gen"))
+        rule = parse_ignore_line("build/")
+        self.assertEqual((rule.negated, rule.dir_only, rule.anchored, rule.body), (False, True, False, "build"))
+        rule = parse_ignore_line("a/b")
+        self.assertTrue(rule.anchored)
+
+    def test_escapes_and_trailing_spaces(self):
+        self.assertEqual(parse_ignore_line("\\#hash").body, "#hash")
+        self.assertFalse(parse_ignore_line("\\!bang").negated)
+        self.assertEqual(parse_ignore_line("name   ").body, "name")
+        self.assertEqual(parse_ignore_line("name\\ ").body, "name\\ ")
+
+
+class RuleSetTest(unittest.TestCase):
+    def decide(self, lines: List[str], path: str, is_dir: bool = False) -> bool:
+        rule = IgnoreRuleSet.from_lines(lines).match(path, path.rsplit('/', 1)[-1], is_dir)
+        return rule is not None and not rule.negated
+
+    def test_last_match_wins(self):
+        self.assertFalse(self.decide(["*.log", "!keep.log"], "keep.log"))
+        self.assertTrue(self.decide(["!keep.log", "*.log"], "keep.log"))
+        self.assertTrue(self.decide(["*.log", "!keep.log"], "other.log"))
+
+    def test_anchoring(self):
+        self.assertTrue(self.decide(["foo"], "foo"))
+        self.assertTrue(self.decide(["foo"], "a/b/foo"))
+        self.assertTrue(self.decide(["/foo"], "foo"))
+        self.assertFalse(self.decide(["/foo"], "a/foo"))
+        self.assertTrue(self.decide(["a/b"], "a/b"))
+        self.assertFalse(self.decide(["a/b"], "x/a/b"))
+
+    def test_wildcards_stop_at_slash(self):
+        self.assertTrue(self.decide(["doc/*.md"], "doc/a.md"))
+        self.assertFalse(self.decide(["doc/*.md"], "doc/sub/a.md"))
+        self.assertTrue(self.decide(["f?o"], "fao"))
+        self.assertFalse(self.decide(["a?b"], "a/b"))
+        self.assertTrue(self.decide(["[ab]c"], "bc"))
+        self.assertFalse(self.decide(["[!ab]c"], "bc"))
+
+    def test_double_star(self):
+        self.assertTrue(self.decide(["**/x"], "x"))
+        self.assertTrue(self.decide(["**/x"], "a/b/x"))
+        self.assertTrue(self.decide(["a/**"], "a/b/c"))
+        self.assertFalse(self.decide(["a/**"], "a"))
+        self.assertTrue(self.decide(["a/**/b"], "a/b"))
+        self.assertTrue(self.decide(["a/**/b"], "a/x/y/b"))
+        self.assertFalse(self.decide(["a/**/b"], "x/a/b"))
+
+    def test_dir_only(self):
+        self.assertTrue(self.decide(["build/"], "build", is_dir=True))
+        self.assertFalse(self.decide(["build/"], "build"))
+        self.assertFalse(self.decide(["build/", "!build"], "build", is_dir=True))
+
+    def test_invalid_glob_matches_nothing(self):
+        self.assertFalse(self.decide(["[z-a]"], "a"))
+        self.assertTrue(self.decide(["*.log", "[z-a]", "a?c"], "a.log"))
+        self.assertTrue(self.decide(["[z-a]", "a?c"], "abc"))
+
+    def test_joined_globs_match_rule_by_rule(self):
+        # The joined regex must pick the same rule as trying every rule, newest first
+        pool = ['*.log', '!keep.log', 'build/', 'a/**/b', '**/x*', 'doc/*.md', 'f?o', '[ab]c', '!bc',
+                'src/gen*/', 'lit', 'dir/lit', '*.tar.gz', '\\*star', '[z-a]', 'a/b*c/**', '!*.md']
+        paths = ['keep.log', 'a.log', 'build', 'a/b', 'a/q/b', 'x1', 'doc/r.md', 'foo', 'ac', 'bc',
+                 'src/gen1', 'lit', 'dir/lit', 'q/lit', 'f.tar.gz', '*star', 'a/bqc/z', 'xx/x9']
+        rng = random.Random(8)
+        for _ in range(200):
+            rule_set = IgnoreRuleSet.from_lines(rng.choices(pool, k=rng.randint(1, 12)))
+            for path in paths:
+                name = path.rsplit('/', 1)[-1]
+                for is_dir in (False, True):
+                    expected = None
+                    for rule in rule_set.rules:
+                        if (not rule.dir_only or is_dir) and rule.regex.match(path if rule.anchored else name):
+                            expected = rule
+                    self.assertIs(rule_set.match(path, name, is_dir), expected, (path, is_dir))
+
+
+class MatcherTest(unittest.TestCase):
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp(prefix='ignore-test-'))
+        self.addCleanup(shutil.rmtree, self.root, True)
+
+    def test_nested_files_take_precedence(self):
+        write_files(self.root, {".gitignore": "*.log\n", "sub/.gitignore": "!keep.log\n",
+                                "a.log": "", "keep.log": "", "sub/keep.log": "", "sub/b.log": ""})
+        self.assertEqual(visible_files(self.root), {".gitignore", "sub/.gitignore", "sub/keep.log"})
+
+    def test_ignored_directory_cannot_be_reincluded(self):
+        write_files(self.root, {".gitignore": "build/\n!build/keep\n", "build/keep": "", "out.txt": ""})
+        self.assertEqual(visible_files(self.root), {".gitignore", "out.txt"})
+
+    def test_info_exclude_has_lowest_precedence(self):
+        write_files(self.root, {".git/info/exclude": "*.tmp\nkeep.txt\n", ".gitignore": "!keep.tmp\n",
+                                "a.tmp": "", "keep.tmp": "", "keep.txt": ""})
+        self.assertEqual(visible_files(self.root), {".gitignore", "keep.tmp"})
+
+    def test_aidigestignore_applies_on_top(self):
+        write_files(self.root, {".gitignore": "*.log\n", ".aidigestignore": "*.md\n!b.log\n",
+                                "a.log": "", "b.log": "", "c.md": "", "d.txt": ""})
+        self.assertEqual(visible_files(self.root), {".gitignore", ".aidigestignore", "b.log", "d.txt"})
+
+    def test_explain_names_the_deciding_rule(self):
+        write_files(self.root, {".gitignore": "*.log\n", "sub/.gitignore": "!keep.log\n", "sub/keep.log": ""})
+        matcher = IgnoreMatcher(self.root, IgnoreFileCache())
+        ignored, rule = matcher.explain("sub/keep.log", False)
+        self.assertFalse(ignored)
+        self.assertEqual((rule.pattern, Path(rule.source).parent.name), ("!keep.log", "sub"))
+
+    def test_unreadable_ignore_file_counts_as_empty(self):
+        write_files(self.root, {"sub/.gitignore/": "", "sub/a.txt": ""})  # A directory cannot be read as a file
+        (self.root / ".gitignore").write_bytes(b"caf\xe9.txt\n")  # Not UTF-8
+        (self.root / os.fsdecode(b"caf\xe9.txt")).write_bytes(b"")
+        matcher = IgnoreMatcher(self.root, IgnoreFileCache())
+        walker = DirectoryWalker(matcher, show_hidden=True)
+        files = {entry.rel_path for entry in walker.walk(str(self.root)) if not entry.is_dir}
+        self.assertEqual(files, {".gitignore", "sub/a.txt"})
+        self.assertEqual(list(matcher.file_cache.errors), [str(self.root / "sub" / ".gitignore")])
+
+
+class RuleStatisticsTest(unittest.TestCase):
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp(prefix='ignore-stats-'))
+        self.addCleanup(shutil.rmtree, self.root, True)
+
+    def test_each_file_is_judged_by_its_own_family(self):
+        write_files(self.root, {".gitignore": "*.log\n!logs/keep.log\n*.tmp\n*.tmp\nnothing\n",
+                                ".aidigestignore": "*.log\n", "a.log": "aa", "logs/keep.log": "", "t.tmp": ""})
+        stats = {(Path(entry.rule.source).name, entry.rule.line_no): entry
+                 for entry in rule_statistics(self.root, IgnoreFileCache())}
+        self.assertEqual({key: entry.status for key, entry in stats.items()},
+                         {('.gitignore', 1): 'used', ('.gitignore', 2): 'used', ('.gitignore', 3): 'shadowed',
+                          ('.gitignore', 4): 'shadowed', ('.gitignore', 5): 'dead', ('.aidigestignore', 1): 'used'})
+        self.assertEqual((stats['.gitignore', 1].files, stats['.gitignore', 1].bytes), (1, 2))
+
+
+@unittest.skipUnless(shutil.which('git'), "git is not installed")
+class GitComparisonTest(unittest.TestCase):
+    """Random trees and rules must leave the same untracked files visible as git does"""
+
+    PATTERNS = ['*.log', '!keep.log', 'build/', '/build', 'a/**/b', '**/x', 'doc/*.md', 'f?o', '[ab]c',
+                '!bc', 'sub/', '!sub/keep.log', 'lit', 'dir/lit', '*.tar.gz', 'a/**', '!*.md', '/d.txt', '*/e.log']
+    NAMES = ['a', 'b', 'bc', 'build', 'sub', 'x', 'dir', 'doc', 'foo', 'lit', 'keep.log', 'e.log', 'd.txt',
+             'r.md', 'f.tar.gz']
+
+    def git_visible(self, root: Path) -> Set[str]:
+        env = dict(os.environ, GIT_CONFIG_NOSYSTEM='1', HOME=str(root.parent))
+        output = subprocess.run(['git', '-c', 'core.excludesFile=', '-c', 'core.quotePath=false', 'ls-files',
+                                 '--others', '--exclude-standard', '-z'],
+                                cwd=root, env=env, capture_output=True, check=True).stdout
+        return {path for path in output.decode('utf-8').split('\0') if path}
+
+    def test_random_trees(self):
+        rng = random.Random(21)
+        for trial in range(40):
+            base = Path(tempfile.mkdtemp(prefix='ignore-git-'))
+            self.addCleanup(shutil.rmtree, base, True)
+            root = base / 'repo'
+            root.mkdir()
+            subprocess.run(['git', 'init', '-q', str(root)], check=True)
+
+            files = {}
+            for _ in range(rng.randint(5, 25)):
+                parts = rng.choices(self.NAMES[:8], k=rng.randint(0, 3)) + [rng.choice(self.NAMES)]
+                files['/'.join(parts)] = ""
+            # Keep files from colliding with directories of the same path
+            files = {path: "" for path in files if not any(other.startswith(path + '/') for other in files)}
+            for directory in {''} | {path.rsplit('/', 1)[0] + '/' for path in files if '/' in path}:
+                if rng.random() < 0.6 and not any(directory.rstrip('/') == path for path in files):
+                    files[directory + '.gitignore'] = "".join(
+                        line + "\n" for line in rng.choices(self.PATTERNS, k=rng.randint(1, 5)))
+            write_files(root, files)
+
+            self.assertEqual(visible_files(root), self.git_visible(root), (trial, sorted(files.items())))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+"""update_ignore_files and remove_ignore_lines: duplicates, formatting and all-or-nothing writes"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import ignore_core
+from ignore_core import IgnoreFileCache, pattern_key, remove_ignore_lines, update_ignore_files
+
+
+class UpdateIgnoreFilesTest(unittest.TestCase):
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp(prefix='ignore-writer-'))
+        self.addCleanup(shutil.rmtree, self.root, True)
+        self.gitignore = self.root / ".gitignore"
+        self.aidigest = self.root / ".aidigestignore"
+
+    def leftovers(self) -> list:
+        return [name for name in os.listdir(self.root) if name.endswith('.tmp')]
+
+    def test_creates_missing_file(self):
+        change, = update_ignore_files([self.gitignore], ["/build/", "*.log"])
+        self.assertIsNone(change.old_text)
+        self.assertEqual(self.gitignore.read_text(), "\n# Added by ignore manager\n/build/\n*.log\n")
+
+    def test_skips_patterns_already_present(self):
+        self.gitignore.write_text("/a/b\nfoo\n# *.log\n")
+        change, = update_ignore_files([self.gitignore], ["a/b", "foo", "*.log", "*.log"])
+        self.assertEqual(change.added, ["*.log"])
+        self.assertEqual(change.existing, ["a/b", "foo"])
+
+    def test_anchoring_and_dir_only_make_different_rules(self):
+        self.gitignore.write_text("/build/\n/y.py\nz\n")
+        change, = update_ignore_files([self.gitignore], ["build/", "y.py", "z/", "/build/"])
+        self.assertEqual(change.added, ["build/", "y.py", "z/"])
+        self.assertEqual(change.existing, ["/build/"])
+
+    def test_pattern_key(self):
+        self.assertEqual(pattern_key("a/b"), pattern_key("/a/b"))
+        self.assertEqual(pattern_key("foo  "), pattern_key("foo"))
+        self.assertNotEqual(pattern_key("foo"), pattern_key("/foo"))
+        self.assertNotEqual(pattern_key("foo"), pattern_key("!foo"))
+        self.assertIsNone(pattern_key("# foo"))
+
+    def test_keeps_line_endings_and_missing_final_newline(self):
+        self.gitignore.write_bytes(b"a\r\nb")
+        update_ignore_files([self.gitignore], ["c"])
+        self.assertEqual(self.gitignore.read_bytes(), b"a\r\nb\r\n\r\n# Added by ignore manager\r\nc\r\n")
+
+    def test_keeps_bytes_that_are_not_utf8(self):
+        self.gitignore.write_bytes(b"caf\xe9.txt\n")
+        update_ignore_files([self.gitignore], ["new"])
+        self.assertTrue(self.gitignore.read_bytes().startswith(b"caf\xe9.txt\n"))
+
+    def test_writes_through_symlink(self):
+        target = self.root / "shared-ignore"
+        target.write_text("a\n")
+        self.gitignore.symlink_to(target.name)
+        update_ignore_files([self.gitignore], ["b"])
+        self.assertTrue(self.gitignore.is_symlink())
+        self.assertTrue(target.read_text().endswith("b\n"))
+
+    def test_failed_replace_restores_earlier_files(self):
+        self.gitignore.write_text("a\n")
+        real_replace = os.replace
+        calls = []
+
+        def replace(src, dst):
+            calls.append(dst)
+            if len(calls) == 2:
+                raise OSError("disk full")
+            real_replace(src, dst)
+
+        with mock.patch.object(ignore_core.os, 'replace', side_effect=replace):
+            with self.assertRaises(OSError):
+                update_ignore_files([self.gitignore, self.aidigest], ["new"])
+        self.assertEqual(self.gitignore.read_text(), "a\n")
+        self.assertFalse(self.aidigest.exists())
+        self.assertEqual(self.leftovers(), [])
+
+    def test_failed_temp_write_changes_nothing(self):
+        self.gitignore.write_text("a\n")
+        real_write = ignore_core.write_temp_file
+
+        def write_temp_file(target, data):
+            if target.name == ".aidigestignore":
+                raise OSError("read-only")
+            return real_write(target, data)
+
+        with mock.patch.object(ignore_core, 'write_temp_file', side_effect=write_temp_file):
+            with self.assertRaises(OSError):
+                update_ignore_files([self.gitignore, self.aidigest], ["new"])
+        self.assertEqual(self.gitignore.read_text(), "a\n")
+        self.assertFalse(self.aidigest.exists())
+        self.assertEqual(self.leftovers(), [])
+
+    def test_cache_sees_the_new_contents(self):
+        cache = IgnoreFileCache()
+        self.gitignore.write_text("a\n")
+        self.assertEqual(cache.get_patterns(self.gitignore), {"a"})
+        update_ignore_files([self.gitignore], ["b"], cache)
+        self.assertEqual(cache.get_patterns(self.gitignore), {"a", "b"})
+
+
+class RemoveIgnoreLinesTest(unittest.TestCase):
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp(prefix='ignore-writer-'))
+        self.addCleanup(shutil.rmtree, self.root, True)
+        self.gitignore = self.root / ".gitignore"
+
+    def test_removes_only_the_given_lines(self):
+        self.gitignore.write_text("# keep\na\nb\r\nc\n")
+        change, = remove_ignore_lines({self.gitignore: {2: "a", 3: "b"}})
+        self.assertEqual(change.removed, ["a", "b"])
+        self.assertEqual(self.gitignore.read_text(), "# keep\nc\n")
+
+    def test_refuses_lines_that_changed(self):
+        self.gitignore.write_text("a\nb\n")
+        with self.assertRaises(ValueError):
+            remove_ignore_lines({self.gitignore: {1: "b"}})
+        self.assertEqual(self.gitignore.read_text(), "a\nb\n")
+
+
+if __name__ == '__main__':
+    unittest.main()
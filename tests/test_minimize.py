@@ -0,0 +1,101 @@
+"""minimize_patterns must ignore exactly the selected files, and generalize where it safely can"""
+
+import random
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from typing import List, Set
+
+from ignore_core import DirectoryWalker, IgnoreFileCache, IgnoreMatcher, minimize_patterns
+
+
+class MinimizeTest(unittest.TestCase):
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp(prefix='ignore-minimize-'))
+        self.addCleanup(shutil.rmtree, self.root, True)
+
+    def make(self, paths: List[str]):
+        for rel_path in paths:
+            path = self.root / rel_path
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.touch()
+
+    def entries(self) -> list:
+        walker = DirectoryWalker(IgnoreMatcher(self.root, IgnoreFileCache()), show_hidden=True)
+        return list(walker.walk(str(self.root)))
+
+    def hidden_by(self, patterns: List[str]) -> Set[str]:
+        """Files that disappear once patterns are the root .gitignore"""
+        before = {entry.rel_path for entry in self.entries() if not entry.is_dir}
+        (self.root / ".gitignore").write_text("".join(p + "\n" for p in patterns), encoding='utf-8')
+        try:
+            after = {entry.rel_path for entry in self.entries() if not entry.is_dir}
+        finally:
+            (self.root / ".gitignore").unlink()
+        return before - after - {".gitignore"}
+
+    def targets(self, selected: Set[str]) -> Set[str]:
+        files = {entry.rel_path for entry in self.entries() if not entry.is_dir}
+        return {path for path in files
+                if path in selected or any(path.startswith(d) for d in selected if d.endswith('/'))}
+
+    def test_generalizes_full_directories_and_extensions(self):
+        self.make(["build/a.o", "build/sub/b.o", "src/a.py", "src/b.pyc", "lib/c.pyc", "lib/d.py"])
+        patterns = minimize_patterns(self.entries(), ["build/a.o", "build/sub/b.o", "src/b.pyc", "lib/c.pyc"])
+        self.assertEqual(sorted(patterns), ["*.pyc", "/build/"])
+
+    def test_same_directory_name_everywhere(self):
+        self.make(["a/node_modules/x.js", "b/node_modules/y.js", "a/keep.js", "b/keep.js"])
+        patterns = minimize_patterns(self.entries(), ["a/node_modules/", "b/node_modules/"])
+        self.assertEqual(patterns, ["node_modules/"])
+
+    def test_falls_back_to_literal_paths(self):
+        self.make(["a.log", "b.log", "c.log"])
+        patterns = minimize_patterns(self.entries(), ["a.log", "b.log"])
+        self.assertEqual(sorted(patterns), ["/a.log", "/b.log"])
+
+    def test_special_characters_are_escaped(self):
+        self.make(["we[ir]d*.txt", "wed.txt"])
+        patterns = minimize_patterns(self.entries(), ["we[ir]d*.txt"])
+        self.assertEqual(self.hidden_by(patterns), {"we[ir]d*.txt"})
+
+    def test_random_selections_hide_exactly_the_selection(self):
+        rng = random.Random(15)
+        names = ['a', 'b', 'build', 'src', 'x.py', 'y.pyc', 'z.log', 'w.txt']
+        for trial in range(60):
+            shutil.rmtree(self.root)
+            self.root.mkdir()
+            paths = set()
+            for _ in range(rng.randint(3, 20)):
+                parts = rng.choices(names[:4], k=rng.randint(0, 3)) + [rng.choice(names[4:])]
+                paths.add('/'.join(parts))
+            self.make(sorted(paths))
+
+            entries = self.entries()
+            candidates = [entry.rel_path for entry in entries]
+            selected = set(rng.sample(candidates, rng.randint(1, len(candidates))))
+            patterns = minimize_patterns(entries, selected)
+            self.assertEqual(self.hidden_by(patterns), self.targets(selected), (trial, sorted(selected), patterns))
+
+    def test_deep_tree_does_not_recurse_per_level(self):
+        # Built and removed one level at a time: os.makedirs and shutil.rmtree recurse themselves
+        chain = [self.root]
+        for _ in range(1500):
+            chain.append(chain[-1] / "d")
+            chain[-1].mkdir()
+        (chain[-1] / "f.txt").touch()
+        (self.root / "g.txt").touch()
+
+        def remove_chain():
+            (chain[-1] / "f.txt").unlink()
+            for directory in reversed(chain[1:]):
+                directory.rmdir()
+        self.addCleanup(remove_chain)
+
+        rel_path = (chain[-1] / "f.txt").relative_to(self.root).as_posix()
+        self.assertEqual(minimize_patterns(self.entries(), [rel_path]), ["/d/"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,649 @@
+"""
+Virtualized tree widget for the Git/AI Digest Ignore Manager
+A ttk.Treeview look-alike that keeps every row in Python and only draws the
+rows inside the viewport on a Canvas, so it stays fast with millions of rows
+"""
+
+import time
+import tkinter as tk
+from tkinter import ttk
+from tkinter import font as tkfont
+from bisect import bisect_right
+from itertools import islice
+from typing import List, Tuple, Optional, Iterator
+
+
+class TreeRow:
+    """One row of a VirtualTree"""
+
+    __slots__ = ('text', 'values', 'tags', 'open', 'parent', 'children', 'size')
+
+    def __init__(self, text: str = "", values: tuple = (), tags: tuple = (), open: bool = False):
+        self.text = text
+        self.values = values
+        self.tags = tags
+        self.open = open
+        self.parent = None  # Parent item ID, None while detached
+        self.children = []
+        self.size = 0  # Rows shown below this one while it is open
+
+
+class VirtualTree(ttk.Frame):
+    """Tree with the ttk.Treeview methods the ignore manager uses, drawn on demand
+
+    Rows, check marks and open state live in TreeRow objects; only the rows in
+    the viewport have Canvas items, which are reused while scrolling. Every
+    row knows how many rows its open subtree shows, and each parent keeps a
+    lazily rebuilt prefix sum over its children, so finding the row at a
+    scroll position or the position of a row costs O(depth * log(children)).
+    """
+
+    INDENT = 18
+    PADDING = 4
+
+    def __init__(self, master, columns: Tuple[str, ...] = (), stats=None, **kw):
+        kw.pop('show', None)  # Tree and headings are always shown
+        super().__init__(master)
+        self.stats = stats  # Optional HotPathStats for redraw counts and timing
+        self.columns = ('#0',) + tuple(columns)
+        self.column_options = {column: {'width': 200 if column == '#0' else 100, 'minwidth': 20,
+                                         'anchor': tk.W} for column in self.columns}
+        self.heading_options = {column: {'text': "", 'anchor': tk.W, 'command': None} for column in self.columns}
+        self.tag_colors = {}  # tag -> (priority, color)
+
+        self.rows = {'': TreeRow(open=True)}  # item ID -> TreeRow, '' is the invisible root
+        self.prefix = {}  # item ID -> cumulative row counts of its children, rebuilt on demand
+        self.next_id = 0
+        self.focus_item = ''
+        self.selected = []
+        self.top = 0  # Index of the first row in the viewport
+        self.top_item = None  # Row at the top, kept in view when rows above it change
+        self.x_offset = 0
+        self.yscrollcommand = None
+        self.xscrollcommand = None
+        self.redraw_id = None
+
+        self.font = tkfont.nametofont('TkDefaultFont')
+        self.row_height = self.font.metrics('linespace') + 6
+
+        self.header = tk.Canvas(self, height=self.row_height + 2, highlightthickness=0,
+                                background='#ececec', borderwidth=0)
+        self.body = tk.Canvas(self, highlightthickness=0, background='white', borderwidth=0, takefocus=1)
+        self.header.grid(row=0, column=0, sticky=(tk.W, tk.E))
+        self.body.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(1, weight=1)
+        self.slots = []  # Canvas items of each drawn row: (background, indicator, text, *values)
+
+        self.body.bind('<Configure>', lambda event: self.schedule_redraw())
+        self.body.bind('<Button-1>', self.on_click)
+        self.body.bind('<Double-Button-1>', self.on_double_click)
+        self.body.bind('<MouseWheel>', self.on_wheel)
+        self.body.bind('<Button-4>', lambda event: self.yview('scroll', -3, 'units'))
+        self.body.bind('<Button-5>', lambda event: self.yview('scroll', 3, 'units'))
+        for key, handler in (('<Up>', lambda: self.move_focus(-1)), ('<Down>', lambda: self.move_focus(1)),
+                             ('<Prior>', lambda: self.move_focus(-self.page_rows())),
+                             ('<Next>', lambda: self.move_focus(self.page_rows())),
+                             ('<Left>', lambda: self.set_open(self.focus_item, False)),
+                             ('<Right>', lambda: self.set_open(self.focus_item, True))):
+            self.body.bind(key, lambda event, handler=handler: handler())
+        self.header.bind('<Button-1>', self.on_heading_click)
+
+    # Treeview API
+
+    def insert(self, parent: str, index, iid: Optional[str] = None, text: str = "", values=(), tags=(),
+               open: bool = False) -> str:
+        """Add a row under parent at index ('end' or a position) and return its ID"""
+        if iid is None:
+            self.next_id += 1
+            iid = f"I{self.next_id:03X}"
+        elif iid in self.rows:
+            raise tk.TclError(f'Item {iid} already exists')
+        self.rows[iid] = TreeRow(text, tuple(values), self.as_tags(tags), open)
+        self.attach(iid, parent, index)
+        return iid
+
+    def item(self, item: str, option: Optional[str] = None, **kw):
+        """Query or change text, values, tags or open state of a row"""
+        row = self.rows[item]
+        if option is not None:
+            return getattr(row, option) if option != 'open' else int(row.open)
+        if not kw:
+            return {'text': row.text, 'values': list(row.values), 'tags': list(row.tags), 'open': int(row.open)}
+
+        if 'text' in kw:
+            row.text = kw['text']
+        if 'values' in kw:
+            row.values = tuple(kw['values'])
+        if 'tags' in kw:
+            row.tags = self.as_tags(kw['tags'])
+        if 'open' in kw and bool(kw['open']) != row.open:
+            self.set_open(item, bool(kw['open']), notify=False)
+        self.schedule_redraw()
+
+    def set(self, item: str, column: Optional[str] = None, value=None):
+        """Query or change one column value of a row"""
+        row = self.rows[item]
+        names = self.columns[1:]
+        if column is None:
+            return dict(zip(names, row.values))
+        index = names.index(column)
+        if value is None:
+            return row.values[index] if index < len(row.values) else ""
+        values = list(row.values) + [""] * (len(names) - len(row.values))
+        values[index] = value
+        row.values = tuple(values)
+        self.schedule_redraw()
+
+    def get_children(self, item: str = '') -> tuple:
+        """Get the attached children of a row"""
+        return tuple(self.rows[item].children)
+
+    def parent(self, item: str) -> str:
+        """Get the parent of a row ('' for top-level and detached rows)"""
+        return self.rows[item].parent or ''
+
+    def index(self, item: str) -> int:
+        """Get the position of a row among its siblings"""
+        parent = self.rows[item].parent
+        return self.rows[parent].children.index(item) if parent is not None else 0
+
+    def exists(self, item: str) -> bool:
+        """Check if a row exists, attached or not"""
+        return item in self.rows
+
+    def delete(self, *items: str):
+        """Remove rows with everything below them"""
+        items = [item for item in items if item in self.rows and item != '']
+        self.detach(*items)
+        stack = list(items)
+        while stack:
+            item = stack.pop()
+            row = self.rows.pop(item, None)
+            if row is None:
+                continue
+            stack.extend(row.children)
+            self.prefix.pop(item, None)
+        if self.focus_item not in self.rows:
+            self.focus_item = ''
+        self.selected = [item for item in self.selected if item in self.rows]
+
+    def detach(self, *items: str):
+        """Unlink rows from the tree; they can be attached again with move"""
+        by_parent = {}
+        for item in items:
+            parent = self.rows[item].parent
+            if parent is not None:
+                by_parent.setdefault(parent, set()).add(item)
+
+        # One pass over each parent's children, however many of them go
+        for parent, gone in by_parent.items():
+            row = self.rows[parent]
+            row.children = [child for child in row.children if child not in gone]
+            delta = 0
+            for item in gone:
+                child = self.rows[item]
+                child.parent = None
+                delta -= 1 + (child.size if child.open else 0)
+            self.propagate(parent, delta)
+        self.schedule_redraw()
+
+    def move(self, item: str, parent: str, index):
+        """Move a row, attached or detached, to position index under parent"""
+        self.detach(item)
+        self.attach(item, parent, index)
+
+    def set_children(self, item: str, *children: str):
+        """Replace the children of a row; previous children not listed are detached"""
+        row = self.rows[item]
+        moved = [child for child in children if self.rows[child].parent not in (None, item)]
+        if moved:
+            self.detach(*moved)
+
+        delta = 0
+        for child in row.children:
+            old = self.rows[child]
+            old.parent = None
+            delta -= 1 + (old.size if old.open else 0)
+        row.children = list(children)
+        for child in children:
+            new = self.rows[child]
+            new.parent = item
+            delta += 1 + (new.size if new.open else 0)
+        self.prefix.pop(item, None)
+        self.propagate(item, delta)
+        self.schedule_redraw()
+
+    def focus(self, item: Optional[str] = None) -> str:
+        """Query or set the focused row"""
+        if item is None:
+            return self.focus_item
+        self.focus_item = item
+        self.schedule_redraw()
+        return item
+
+    def selection(self) -> tuple:
+        """Get the selected rows"""
+        return tuple(self.selected)
+
+    def selection_set(self, *items: str):
+        """Select exactly the given rows"""
+        self.selected = [item for item in items if item in self.rows]
+        self.schedule_redraw()
+
+    def see(self, item: str):
+        """Open the ancestors of a row and scroll it into view"""
+        parent = self.rows[item].parent
+        while parent:
+            self.set_open(parent, True, notify=False)
+            parent = self.rows[parent].parent
+        position = self.index_of(item)
+        if position is not None and not self.top <= position < self.top + self.page_rows():
+            self.scroll_to(position - self.page_rows() // 2)
+
+    def identify(self, component: str, x: int, y: int) -> str:
+        """Identify the 'item', 'row', 'column' or 'region' at a point of the body"""
+        if component in ('item', 'row'):
+            return self.identify_row(y)
+        if component == 'column':
+            return self.identify_column(x)
+        if component == 'region':
+            return self.identify_region(x, y)
+        raise tk.TclError(f'bad component "{component}"')
+
+    def identify_row(self, y: int) -> str:
+        """Get the row at a y coordinate of the body, '' below the last row"""
+        if y < 0:
+            return ''
+        for item, depth in islice(self.iter_rows(self.top + y // self.row_height), 1):
+            return item
+        return ''
+
+    def identify_column(self, x: int) -> str:
+        """Get the column ('#0', '#1', ...) at an x coordinate"""
+        x += self.x_offset
+        for number, (left, right) in enumerate(self.column_bounds()):
+            if left <= x < right:
+                return f'#{number}'
+        return ''
+
+    def identify_region(self, x: int, y: int) -> str:
+        """Get 'tree', 'cell' or 'nothing' for a point of the body"""
+        if not self.identify_row(y):
+            return 'nothing'
+        column = self.identify_column(x)
+        return 'tree' if column == '#0' else 'cell' if column else 'nothing'
+
+    def heading(self, column: str, **kw):
+        """Query or configure a column heading"""
+        if not kw:
+            return dict(self.heading_options[column])
+        self.heading_options[column].update(kw)
+        self.draw_header()
+
+    def column(self, column: str, **kw):
+        """Query or configure a column's width, minwidth or anchor"""
+        if not kw:
+            return dict(self.column_options[column])
+        self.column_options[column].update(kw)
+        self.schedule_redraw()
+
+    def tag_configure(self, tag: str, foreground: Optional[str] = None, **kw):
+        """Set the text color of rows with tag; tags configured later take precedence"""
+        priority = self.tag_colors.get(tag, (len(self.tag_colors), None))[0]
+        self.tag_colors[tag] = (priority, foreground)
+        self.schedule_redraw()
+
+    def configure(self, cnf=None, **kw):
+        """Accept the scroll commands of a Treeview; anything else configures the frame"""
+        if 'yscrollcommand' in kw:
+            self.yscrollcommand = kw.pop('yscrollcommand')
+        if 'xscrollcommand' in kw:
+            self.xscrollcommand = kw.pop('xscrollcommand')
+        if cnf or kw:
+            return super().configure(cnf, **kw)
+        self.schedule_redraw()
+
+    config = configure
+
+    def bind(self, sequence=None, func=None, add=None):
+        """Bind to the drawing area, after the widget's own handlers"""
+        return self.body.bind(sequence, func, '+')
+
+    def yview(self, *args):
+        """Scrollbar protocol: report or change the vertical position"""
+        total = self.rows[''].size
+        if not args:
+            return self.fractions(self.top, self.page_rows(), total)
+        if args[0] == 'moveto':
+            self.scroll_to(int(float(args[1]) * total))
+        elif args[0] == 'scroll':
+            step = self.page_rows() if args[2] == 'pages' else 1
+            self.scroll_to(self.top + int(args[1]) * step)
+
+    def xview(self, *args):
+        """Scrollbar protocol: report or change the horizontal position"""
+        total = self.column_bounds()[-1][1]
+        width = max(1, self.body.winfo_width())
+        if not args:
+            return self.fractions(self.x_offset, width, total)
+        if args[0] == 'moveto':
+            offset = int(float(args[1]) * total)
+        else:
+            offset = self.x_offset + int(args[1]) * (width if args[2] == 'pages' else 20)
+        self.x_offset = max(0, min(offset, total - width))
+        self.schedule_redraw()
+
+    # Row bookkeeping
+
+    @staticmethod
+    def as_tags(tags) -> tuple:
+        """Normalize tags given as a string or a sequence"""
+        return (tags,) if isinstance(tags, str) else tuple(tags)
+
+    def attach(self, item: str, parent: str, index):
+        """Link a detached row under parent at index"""
+        parent_row = self.rows[parent]
+        row = self.rows[item]
+        if index == 'end' or index == tk.END:
+            parent_row.children.append(item)
+        else:
+            parent_row.children.insert(int(index), item)
+        row.parent = parent
+        self.propagate(parent, 1 + (row.size if row.open else 0))
+        self.schedule_redraw()
+
+    def propagate(self, item: str, delta: int):
+        """Add delta to the rows shown below item and below its open ancestors"""
+        while item is not None:
+            row = self.rows[item]
+            row.size += delta
+            self.prefix.pop(item, None)
+            if not row.open:
+                break
+            item = row.parent
+
+    def set_open(self, item: str, open: bool, notify: bool = True):
+        """Open or close a row, firing <<TreeviewOpen>>/<<TreeviewClose>> for user actions"""
+        if not item:
+            return
+        row = self.rows[item]
+        if row.open == open:
+            return
+        if notify:
+            self.focus_item = item
+            self.body.event_generate('<<TreeviewOpen>>' if open else '<<TreeviewClose>>')
+            if row.open == open:
+                return  # The handler opened it already
+        row.open = open
+        if row.parent is not None:
+            self.propagate(row.parent, row.size if open else -row.size)
+        self.schedule_redraw()
+
+    def child_prefix(self, item: str) -> List[int]:
+        """Get [0, rows up to and including child 0, ...] for the children of a row"""
+        prefix = self.prefix.get(item)
+        if prefix is None:
+            rows = self.rows
+            prefix = [0]
+            total = 0
+            for child in rows[item].children:
+                row = rows[child]
+                total += 1 + (row.size if row.open else 0)
+                prefix.append(total)
+            self.prefix[item] = prefix
+        return prefix
+
+    def iter_rows(self, start: int) -> Iterator[Tuple[str, int]]:
+        """Yield (item, depth) of the shown rows from display position start on"""
+        rows = self.rows
+        stack = []  # [parent, child index] down to the row at start
+        item, position = '', start
+        while True:
+            row = rows[item]
+            if position < 0 or position >= row.size or not row.children:
+                if not stack:
+                    return
+                break
+            prefix = self.child_prefix(item)
+            index = bisect_right(prefix, position) - 1
+            stack.append([item, index])
+            offset = position - prefix[index]
+            if offset == 0:
+                break
+            item, position = row.children[index], offset - 1
+
+        while stack:
+            parent, index = stack[-1]
+            children = rows[parent].children
+            if index >= len(children):
+                stack.pop()
+                if stack:
+                    stack[-1][1] += 1
+                continue
+            child = children[index]
+            yield child, len(stack) - 1
+            row = rows[child]
+            if row.open and row.children:
+                stack.append([child, 0])
+            else:
+                stack[-1][1] += 1
+
+    def index_of(self, item: str) -> Optional[int]:
+        """Get the display position of a row, None if it is detached or inside a closed row"""
+        position = 0
+        while item != '':
+            parent = self.rows[item].parent
+            if parent is None or (parent != '' and not self.rows[parent].open):
+                return None
+            position += self.child_prefix(parent)[self.rows[parent].children.index(item)]
+            if parent != '':
+                position += 1
+            item = parent
+        return position
+
+    # Drawing
+
+    def page_rows(self) -> int:
+        """Number of rows that fit in the viewport"""
+        return max(1, self.body.winfo_height() // self.row_height)
+
+    @staticmethod
+    def fractions(first: int, shown: int, total: int) -> Tuple[float, float]:
+        """Scrollbar fractions for a window of shown units starting at first"""
+        if total <= 0:
+            return 0.0, 1.0
+        return first / total, min(1.0, (first + shown) / total)
+
+    def scroll_to(self, top: int):
+        """Make row top the first one in the viewport"""
+        self.top = max(0, min(top, self.rows[''].size - self.page_rows()))
+        self.top_item = None
+        self.schedule_redraw()
+
+    def column_bounds(self) -> List[Tuple[int, int]]:
+        """Get (left, right) of every column; the tree column takes up spare width"""
+        widths = [max(self.column_options[c]['width'], self.column_options[c]['minwidth']) for c in self.columns]
+        spare = self.body.winfo_width() - sum(widths)
+        if spare > 0:
+            widths[0] += spare
+        bounds, left = [], 0
+        for width in widths:
+            bounds.append((left, left + width))
+            left += width
+        return bounds
+
+    def schedule_redraw(self):
+        """Redraw once the current batch of changes is done"""
+        if self.redraw_id is None:
+            self.redraw_id = self.after_idle(self.redraw)
+
+    def row_color(self, tags: tuple) -> str:
+        """Get the text color of a row from its highest-priority configured tag"""
+        best = None
+        for tag in tags:
+            config = self.tag_colors.get(tag)
+            if config is not None and config[1] is not None and (best is None or config[0] > best[0]):
+                best = config
+        return best[1] if best is not None else 'black'
+
+    def fit(self, text: str, width: int) -> str:
+        """Shorten text with an ellipsis so it fits in width pixels"""
+        if width <= 0:
+            return ""
+        if self.font.measure(text) <= width:
+            return text
+        low, high = 0, len(text)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self.font.measure(text[:middle] + '…') <= width:
+                low = middle
+            else:
+                high = middle - 1
+        return text[:low] + '…'
+
+    def redraw(self):
+        """Draw the rows in the viewport, reusing Canvas items from earlier draws"""
+        self.redraw_id = None
+        started = time.perf_counter()
+        total = self.rows[''].size
+        shown = self.page_rows() + 1
+        canvas_calls = 0
+
+        # Keep the same row at the top when rows above it come or go
+        if self.top_item is not None and self.top_item in self.rows:
+            position = self.index_of(self.top_item)
+            if position is not None:
+                self.top = position
+        self.top = max(0, min(self.top, total - shown + 1))
+
+        rows = list(islice(self.iter_rows(self.top), shown))
+        self.top_item = rows[0][0] if rows else None
+        bounds = self.column_bounds()
+        width = bounds[-1][1]
+        height = self.row_height
+        canvas = self.body
+
+        while len(self.slots) < len(rows):
+            self.slots.append((canvas.create_rectangle(0, 0, 0, 0, width=0),
+                               canvas.create_text(0, 0, anchor=tk.W, font=self.font),
+                               canvas.create_text(0, 0, anchor=tk.W, font=self.font))
+                              + tuple(canvas.create_text(0, 0, font=self.font) for _ in self.columns[1:]))
+
+        selected = set(self.selected)
+        for number, slot in enumerate(self.slots):
+            if number >= len(rows):
+                for canvas_item in slot:
+                    canvas.itemconfigure(canvas_item, state='hidden')
+                canvas_calls += len(slot)
+                continue
+
+            item, depth = rows[number]
+            row = self.rows[item]
+            top = number * height
+            middle = top + height // 2
+            background, indicator, text = slot[:3]
+            fill = '#cce4f7' if item in selected else '#eef4fb' if item == self.focus_item else ''
+            canvas.coords(background, -self.x_offset, top, width - self.x_offset, top + height)
+            canvas.itemconfigure(background, fill=fill, state='normal' if fill else 'hidden')
+
+            indent = bounds[0][0] + depth * self.INDENT - self.x_offset
+            canvas.coords(indicator, indent + self.PADDING, middle)
+            canvas.itemconfigure(indicator, text=('▾' if row.open else '▸') if row.children else "",
+                                 state='normal')
+            text_left = indent + self.INDENT
+            canvas.coords(text, text_left, middle)
+            canvas.itemconfigure(text, fill=self.row_color(row.tags), state='normal',
+                                 text=self.fit(row.text, bounds[0][1] - self.x_offset - text_left - self.PADDING))
+
+            for index, column in enumerate(self.columns[1:]):
+                left, right = bounds[index + 1]
+                anchor = self.column_options[column]['anchor']
+                x = (right - self.PADDING if anchor == tk.E else left + self.PADDING) - self.x_offset
+                value = str(row.values[index]) if index < len(row.values) else ""
+                canvas.coords(slot[3 + index], x, middle)
+                canvas.itemconfigure(slot[3 + index], text=self.fit(value, right - left - 2 * self.PADDING),
+                                     anchor=tk.E if anchor == tk.E else tk.W, state='normal')
+            canvas_calls += 2 * len(slot)
+
+        self.draw_header()
+        if self.yscrollcommand:
+            self.yscrollcommand(*self.fractions(self.top, shown - 1, total))
+        if self.xscrollcommand:
+            self.xscrollcommand(*self.fractions(self.x_offset, canvas.winfo_width(), width))
+        if self.stats is not None and self.stats.enabled:
+            self.stats.count('tree_redraws')
+            self.stats.count('canvas_calls', canvas_calls + 3 * len(self.columns))
+            self.stats.add_time('tree_redraw', time.perf_counter() - started)
+
+    def draw_header(self):
+        """Draw the column headings"""
+        header = self.header
+        header.delete('all')
+        for column, (left, right) in zip(self.columns, self.column_bounds()):
+            left, right = left - self.x_offset, right - self.x_offset
+            options = self.heading_options[column]
+            anchor = options['anchor']
+            x = right - self.PADDING if anchor == tk.E else left + self.PADDING
+            header.create_text(x, (self.row_height + 2) // 2, text=options['text'], font=self.font,
+                               anchor=tk.E if anchor == tk.E else tk.W)
+            header.create_line(right - 1, 2, right - 1, self.row_height, fill='#bbbbbb')
+
+    # Event handlers
+
+    def on_click(self, event):
+        """Toggle a row's open state on its indicator, otherwise focus and select it"""
+        self.body.focus_set()
+        item = self.identify_row(event.y)
+        if not item:
+            return
+        depth = 0
+        parent = self.rows[item].parent
+        while parent:
+            depth += 1
+            parent = self.rows[parent].parent
+
+        left = depth * self.INDENT - self.x_offset
+        if self.rows[item].children and left <= event.x < left + self.INDENT:
+            self.set_open(item, not self.rows[item].open)
+            return
+
+        self.focus_item = item
+        if event.state & 0x0004:  # Control toggles a row in the selection
+            if item in self.selected:
+                self.selected.remove(item)
+            else:
+                self.selected.append(item)
+        else:
+            self.selected = [item]
+        self.body.event_generate('<<TreeviewSelect>>')
+        self.schedule_redraw()
+
+    def on_double_click(self, event):
+        """Open or close a row by double-clicking it"""
+        item = self.identify_row(event.y)
+        if item and self.rows[item].children:
+            self.set_open(item, not self.rows[item].open)
+
+    def on_wheel(self, event):
+        """Scroll three rows per wheel notch (Windows and macOS)"""
+        steps = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        self.yview('scroll', -3 * steps, 'units')
+
+    def on_heading_click(self, event):
+        """Run the command of the clicked heading"""
+        x = event.x + self.x_offset
+        for column, (left, right) in zip(self.columns, self.column_bounds()):
+            if left <= x < right and self.heading_options[column]['command']:
+                self.heading_options[column]['command']()
+
+    def move_focus(self, step: int):
+        """Move focus and selection up or down by step rows"""
+        position = self.index_of(self.focus_item) if self.focus_item else None
+        position = 0 if position is None else max(0, min(position + step, self.rows[''].size - 1))
+        for item, depth in islice(self.iter_rows(position), 1):
+            self.focus_item = item
+            self.selected = [item]
+            self.see(item)
+            self.body.event_generate('<<TreeviewSelect>>')
+        self.schedule_redraw()